@@ -0,0 +1,113 @@
+'''
+Пароли админов и сессионные токены.
+
+Пароли хранятся как scrypt с солью: "scrypt$<n>$<r>$<p>$<соль>$<хеш>". Старые несолёные sha256
+(64 hex-символа) ещё принимаются и при успешном входе перехешируются; так же перехешируются
+пароли со старыми параметрами scrypt после их увеличения (AUTH_SCRYPT_N).
+
+После входа выдаётся подписанный токен "<payload>.<подпись>" (HMAC-SHA256 на AUTH_TOKEN_SECRET):
+последующие запросы проверяют его без обращения к admin_users. Отзыв — смена секрета.
+'''
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger('auth')
+
+SCRYPT_N = int(os.environ.get('AUTH_SCRYPT_N', str(2 ** 14)))
+SCRYPT_R = int(os.environ.get('AUTH_SCRYPT_R', '8'))
+SCRYPT_P = int(os.environ.get('AUTH_SCRYPT_P', '1'))
+SALT_BYTES = 16
+TOKEN_TTL_HOURS = float(os.environ.get('AUTH_TOKEN_TTL_HOURS', '12'))
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _password_bytes(password: str) -> bytes:
+    # JSON допускает одиночные суррогаты ("\ud800"), которые строгий UTF-8 не кодирует
+    return password.encode('utf-8', 'surrogatepass')
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(_password_bytes(password), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}'
+
+
+def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+    '''(пароль верный, хеш пора пересчитать текущими параметрами)'''
+    if not stored:
+        # Та же работа, что и для существующего пользователя: время ответа не выдаёт логины
+        hash_password(password)
+        return False, False
+
+    if stored.startswith('scrypt$'):
+        try:
+            _, n, r, p, salt, digest = stored.split('$')
+            params = (int(n), int(r), int(p))
+            expected = _b64decode(digest)
+            actual = _scrypt(password, _b64decode(salt), *params)
+        except ValueError:
+            logger.warning('Malformed password hash')
+            return False, False
+        ok = hmac.compare_digest(actual, expected)
+        return ok, ok and params != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+    # Наследие: несолёный sha256
+    ok = hmac.compare_digest(hashlib.sha256(_password_bytes(password)).hexdigest().encode(), stored.lower().encode())
+    return ok, ok
+
+
+def _secret() -> Optional[bytes]:
+    secret = os.environ.get('AUTH_TOKEN_SECRET')
+    return secret.encode() if secret else None
+
+
+def _sign(secret: bytes, payload: str) -> str:
+    return _b64encode(hmac.new(secret, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(username: str, is_superadmin: bool, now: Optional[float] = None) -> Optional[str]:
+    '''Сессионный токен админа; None, если AUTH_TOKEN_SECRET не настроен'''
+    secret = _secret()
+    if secret is None:
+        logger.warning('AUTH_TOKEN_SECRET not configured, session token not issued')
+        return None
+    now = time.time() if now is None else now
+    claims = {'sub': username, 'sa': bool(is_superadmin), 'exp': int(now + TOKEN_TTL_HOURS * 3600)}
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    return f'{payload}.{_sign(secret, payload)}'
+
+
+def verify_token(token: Optional[str], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    '''Данные токена, если подпись верна и срок не истёк'''
+    secret = _secret()
+    if not token or secret is None or token.count('.') != 1:
+        return None
+    payload, signature = token.split('.')
+    # Байты, а не str: compare_digest на str с не-ASCII символами бросает TypeError
+    if not hmac.compare_digest(_sign(secret, payload).encode(), signature.encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get('exp', 0) <= (time.time() if now is None else now):
+        return None
+    return claims
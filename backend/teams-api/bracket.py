@@ -0,0 +1,333 @@
+'''
+Движок турнирной сетки: генерация single/double elimination из одобренных команд
+и продвижение победителей/проигравших при вводе результата.
+
+Каждый матч хранит, куда уходят победитель (next_match_id/next_match_slot) и проигравший
+(loser_next_match_id/loser_next_match_slot), поэтому результат обрабатывается за O(раундов):
+обновляется сам матч и два следующих. При исправлении уже сыгранного результата
+сбрасываются только зависящие от него матчи.
+'''
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+BRACKET_FORMATS = ('single', 'double')
+# Статусы, которые можно выставить без результата; 'finished' ставит только report_result
+SCHEDULE_STATUSES = ('upcoming', 'live')
+MAX_TEAMS = 1024
+
+# Значение слота при планировании: известная команда, пусто (bye) или исход другого матча
+Slot = Tuple[Any, ...]
+DEAD: Slot = ('dead',)
+
+
+class BracketError(ValueError):
+    '''Некорректный запрос к сетке'''
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@dataclass
+class PlannedMatch:
+    match_number: int
+    bracket_type: str
+    round_number: int
+    team1_id: Optional[int] = None
+    team2_id: Optional[int] = None
+    team1_placeholder: Optional[str] = None
+    team2_placeholder: Optional[str] = None
+    next_match_number: Optional[int] = None
+    next_match_slot: Optional[int] = None
+    loser_next_match_number: Optional[int] = None
+    loser_next_match_slot: Optional[int] = None
+
+
+def seed_positions(size: int) -> List[int]:
+    '''Порядок посева по слотам: 1-й сеяный встречается с последним, 2-й с предпоследним и т.д.'''
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for current in order for seed in (current, total - current)]
+    return order
+
+
+class _Planner:
+    def __init__(self) -> None:
+        self.matches: List[PlannedMatch] = []
+
+    def add(self, bracket_type: str, round_number: int, first: Slot, second: Slot) -> Tuple[Slot, Slot]:
+        '''Добавить матч; возвращает слоты победителя и проигравшего'''
+        # Матч против пустого слота не играется: соперник проходит дальше сам
+        if first == DEAD:
+            return second, DEAD
+        if second == DEAD:
+            return first, DEAD
+
+        match = PlannedMatch(len(self.matches) + 1, bracket_type, round_number)
+        for slot, value in ((1, first), (2, second)):
+            if value[0] == 'team':
+                setattr(match, f'team{slot}_id', value[1])
+                continue
+            _, source_number, outcome = value
+            source = self.matches[source_number - 1]
+            if outcome == 'winner':
+                source.next_match_number, source.next_match_slot = match.match_number, slot
+                setattr(match, f'team{slot}_placeholder', f'Победитель матча {source_number}')
+            else:
+                source.loser_next_match_number, source.loser_next_match_slot = match.match_number, slot
+                setattr(match, f'team{slot}_placeholder', f'Проигравший матча {source_number}')
+        self.matches.append(match)
+        return ('from', match.match_number, 'winner'), ('from', match.match_number, 'loser')
+
+
+def plan_bracket(team_ids: Sequence[int], bracket_format: str) -> List[PlannedMatch]:
+    '''
+    Построить сетку в памяти. team_ids — в порядке посева.
+    Недостающие до степени двойки места — bye у верхних сеяных.
+    Double elimination: верхняя сетка, нижняя сетка и один гранд-финал.
+    '''
+    if bracket_format not in BRACKET_FORMATS:
+        raise BracketError(f"format must be one of: {', '.join(BRACKET_FORMATS)}")
+    if len(team_ids) < 2:
+        raise BracketError('At least 2 teams are required')
+    if len(team_ids) > MAX_TEAMS:
+        raise BracketError(f'At most {MAX_TEAMS} teams are supported')
+    if len(set(team_ids)) != len(team_ids):
+        raise BracketError('Duplicate team ids')
+
+    size = 2
+    while size < len(team_ids):
+        size *= 2
+    seeds: List[Slot] = [
+        ('team', team_ids[seed - 1]) if seed <= len(team_ids) else DEAD
+        for seed in seed_positions(size)
+    ]
+
+    planner = _Planner()
+    upper: List[List[Tuple[Slot, Slot]]] = []
+    pairs = [(seeds[i], seeds[i + 1]) for i in range(0, size, 2)]
+    round_number = 1
+    while pairs:
+        results = [planner.add('upper', round_number, first, second) for first, second in pairs]
+        upper.append(results)
+        pairs = [(results[i][0], results[i + 1][0]) for i in range(0, len(results) - 1, 2)]
+        round_number += 1
+    upper_champion = upper[-1][0][0]
+
+    if bracket_format == 'single':
+        return planner.matches
+
+    rounds = len(upper)
+    if rounds == 1:
+        lower_champion = upper[0][0][1]
+    else:
+        first_losers = [loser for _, loser in upper[0]]
+        current = [
+            planner.add('lower', 1, first_losers[i], first_losers[i + 1])[0]
+            for i in range(0, len(first_losers), 2)
+        ]
+        lower_round = 1
+        for upper_index in range(1, rounds):
+            # Проигравшие верхней сетки падают вниз; порядок чередуется, чтобы реже были повторные встречи
+            dropped = [loser for _, loser in upper[upper_index]]
+            if upper_index % 2 == 1:
+                dropped.reverse()
+            lower_round += 1
+            current = [
+                planner.add('lower', lower_round, current[i], dropped[i])[0]
+                for i in range(len(current))
+            ]
+            if upper_index < rounds - 1:
+                lower_round += 1
+                current = [
+                    planner.add('lower', lower_round, current[i], current[i + 1])[0]
+                    for i in range(0, len(current), 2)
+                ]
+        lower_champion = current[0]
+
+    planner.add('grand_final', 1, upper_champion, lower_champion)
+    return planner.matches
+
+
+def generate(cursor, team_ids: Sequence[int], bracket_format: str) -> int:
+    '''Записать новую сетку вместо текущей; вызывается внутри транзакции'''
+    planned = plan_bracket(team_ids, bracket_format)
+    # Обычный курсор: строки-кортежи нужны только для сопоставления id
+    cursor = cursor.connection.cursor()
+
+    cursor.execute("DELETE FROM matches")
+    rows = execute_values(cursor, """
+        INSERT INTO matches (match_number, bracket_type, round_number, team1_id, team2_id,
+                             team1_placeholder, team2_placeholder, status)
+        VALUES %s
+        RETURNING id, match_number
+    """, [
+        (m.match_number, m.bracket_type, m.round_number, m.team1_id, m.team2_id,
+         m.team1_placeholder, m.team2_placeholder, 'upcoming')
+        for m in planned
+    ], page_size=len(planned), fetch=True)
+    ids = {match_number: match_id for match_id, match_number in rows}
+
+    links = [
+        (ids[m.match_number],
+         ids.get(m.next_match_number), m.next_match_slot,
+         ids.get(m.loser_next_match_number), m.loser_next_match_slot)
+        for m in planned
+        if m.next_match_number or m.loser_next_match_number
+    ]
+    if links:
+        execute_values(cursor, """
+            UPDATE matches m
+            SET next_match_id = v.next_match_id,
+                next_match_slot = v.next_match_slot,
+                loser_next_match_id = v.loser_next_match_id,
+                loser_next_match_slot = v.loser_next_match_slot
+            FROM (VALUES %s) AS v(id, next_match_id, next_match_slot, loser_next_match_id, loser_next_match_slot)
+            WHERE m.id = v.id
+        """, links, template='(%s::int, %s::int, %s::smallint, %s::int, %s::smallint)', page_size=len(links))
+    cursor.close()
+    return len(planned)
+
+
+class DbMatchStore:
+    '''Доступ к матчам для report_result; строки блокируются до конца транзакции'''
+
+    FIELDS = ('id, team1_id, team2_id, score1, score2, winner, status, '
+              'next_match_id, next_match_slot, loser_next_match_id, loser_next_match_slot')
+    UPDATABLE = {'team1_id', 'team2_id', 'score1', 'score2', 'winner', 'status', 'scheduled_time'}
+
+    def __init__(self, cursor) -> None:
+        self.cursor = cursor
+
+    def get(self, match_id: int) -> Optional[Dict[str, Any]]:
+        self.cursor.execute(f"SELECT {self.FIELDS} FROM matches WHERE id = %s FOR UPDATE", (match_id,))
+        row = self.cursor.fetchone()
+        return dict(row) if row else None
+
+    def update(self, match_id: int, **fields: Any) -> None:
+        columns = [column for column in fields if column in self.UPDATABLE]
+        assignments = ', '.join(f"{column} = %s" for column in columns)
+        self.cursor.execute(
+            f"UPDATE matches SET {assignments}, updated_at = NOW() WHERE id = %s",
+            [fields[column] for column in columns] + [match_id]
+        )
+
+
+class MemoryMatchStore:
+    '''Та же логика без БД: для бенчмарков и проверки сетки'''
+
+    def __init__(self, planned: Sequence[PlannedMatch]) -> None:
+        self.matches: Dict[int, Dict[str, Any]] = {
+            m.match_number: {
+                'id': m.match_number, 'team1_id': m.team1_id, 'team2_id': m.team2_id,
+                'score1': None, 'score2': None, 'winner': None, 'status': 'upcoming',
+                'next_match_id': m.next_match_number, 'next_match_slot': m.next_match_slot,
+                'loser_next_match_id': m.loser_next_match_number, 'loser_next_match_slot': m.loser_next_match_slot,
+            }
+            for m in planned
+        }
+
+    def get(self, match_id: int) -> Optional[Dict[str, Any]]:
+        match = self.matches.get(match_id)
+        return dict(match) if match else None
+
+    def update(self, match_id: int, **fields: Any) -> None:
+        self.matches[match_id].update(fields)
+
+
+def report_result(store, match_id: int, score1: Optional[int], score2: Optional[int],
+                  winner: Optional[int] = None) -> List[int]:
+    '''Записать результат и продвинуть команды; возвращает id всех изменённых матчей'''
+    if not _is_int(match_id):
+        raise BracketError('id must be an integer')
+    for name, score in (('score1', score1), ('score2', score2)):
+        if score is not None and (not _is_int(score) or score < 0):
+            raise BracketError(f'{name} must be a non-negative integer')
+    if winner is not None and not _is_int(winner):
+        raise BracketError('winner must be 1 or 2')
+    match = store.get(match_id)
+    if match is None:
+        raise BracketError('Match not found')
+    if match['team1_id'] is None or match['team2_id'] is None:
+        raise BracketError('Both teams must be known before reporting a result')
+    if winner is None:
+        if score1 is None or score2 is None or score1 == score2:
+            raise BracketError('winner is required when scores do not decide the match')
+        winner = 1 if score1 > score2 else 2
+    if winner not in (1, 2):
+        raise BracketError('winner must be 1 or 2')
+
+    touched = [match_id]
+    store.update(match_id, score1=score1, score2=score2, winner=winner, status='finished')
+    _place(store, match['next_match_id'], match['next_match_slot'], match[f'team{winner}_id'], touched)
+    _place(store, match['loser_next_match_id'], match['loser_next_match_slot'], match[f'team{3 - winner}_id'], touched)
+    return touched
+
+
+def update_schedule(store, match_id: int, status: str, scheduled_time: Optional[str]) -> None:
+    '''Статус и время начала матча без результата: сетка при этом не меняется'''
+    if not _is_int(match_id):
+        raise BracketError('id must be an integer')
+    if status not in SCHEDULE_STATUSES:
+        raise BracketError(f"status must be one of: {', '.join(SCHEDULE_STATUSES)}; report a result to finish the match")
+    if scheduled_time is not None:
+        try:
+            datetime.fromisoformat(scheduled_time)
+        except (TypeError, ValueError):
+            raise BracketError('scheduled_time must be an ISO 8601 date and time')
+    match = store.get(match_id)
+    if match is None:
+        raise BracketError('Match not found')
+    if match['winner'] is not None:
+        raise BracketError('Match already has a result: report a corrected result instead')
+    store.update(match_id, status=status, scheduled_time=scheduled_time)
+
+
+def clear(cursor) -> int:
+    '''Удалить сетку целиком; возвращает число удалённых матчей'''
+    cursor.execute("DELETE FROM matches")
+    return cursor.rowcount
+
+
+def _place(store, match_id: Optional[int], slot: Optional[int], team_id: Optional[int], touched: List[int]) -> None:
+    if match_id is None:
+        return
+    match = store.get(match_id)
+    if match is None or match[f'team{slot}_id'] == team_id:
+        return
+
+    fields: Dict[str, Any] = {f'team{slot}_id': team_id}
+    was_played = match['winner'] is not None
+    if was_played:
+        # Состав матча изменился — его результат недействителен, как и всё, что из него следует
+        fields.update(score1=None, score2=None, winner=None, status='upcoming')
+    store.update(match_id, **fields)
+    touched.append(match_id)
+
+    if was_played:
+        _place(store, match['next_match_id'], match['next_match_slot'], None, touched)
+        _place(store, match['loser_next_match_id'], match['loser_next_match_slot'], None, touched)
+
+
+def parse_team_ids(cursor, value: Any) -> List[int]:
+    '''team_ids из запроса: список id одобренных команд в порядке посева; пусто — все одобренные'''
+    if not value:
+        return approved_team_ids(cursor)
+    if not isinstance(value, list) or not all(_is_int(team_id) for team_id in value):
+        raise BracketError('team_ids must be a list of team ids')
+    cursor.execute("SELECT id FROM teams WHERE status = 'approved' AND id = ANY(%s)", (value,))
+    approved = {row['id'] for row in cursor.fetchall()}
+    unknown = [team_id for team_id in value if team_id not in approved]
+    if unknown:
+        raise BracketError(f"Not approved or unknown team ids: {', '.join(map(str, unknown[:20]))}")
+    return value
+
+
+def approved_team_ids(cursor) -> List[int]:
+    '''Одобренные команды в порядке регистрации — порядок посева по умолчанию'''
+    cursor.execute("SELECT id FROM teams WHERE status = 'approved' ORDER BY created_at, id")
+    return [row['id'] for row in cursor.fetchall()]
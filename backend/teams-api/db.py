@@ -0,0 +1,298 @@
+import os
+import re
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2 import pool as pg_pool
+
+# Пул переживает вызовы функции, пока инстанс "тёплый".
+# MIN — сколько соединений держать открытыми между вызовами, MAX — жёсткий предел
+POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+# Соединение, простоявшее дольше этого интервала, проверяется SELECT 1 перед выдачей
+HEALTHCHECK_AFTER = float(os.environ.get('DB_HEALTHCHECK_AFTER', '30'))
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+
+# Фиксированные запросы обработчиков, подготавливаются на сервере один раз на соединение
+STATEMENTS: Dict[str, str] = {
+    'settings_is_open': "SELECT is_open FROM registration_settings ORDER BY updated_at DESC LIMIT 1",
+    'settings_latest_id': "SELECT id FROM registration_settings ORDER BY updated_at DESC LIMIT 1",
+    'settings_update': """
+        UPDATE registration_settings
+        SET is_open = $1, updated_by = $2, updated_at = NOW()
+        WHERE id = $3
+    """,
+    'settings_insert': "INSERT INTO registration_settings (is_open, updated_by) VALUES ($1, $2)",
+    'matches_list': """
+        SELECT m.*, t1.team_name as team1_name, t2.team_name as team2_name
+        FROM matches m
+        LEFT JOIN teams t1 ON m.team1_id = t1.id
+        LEFT JOIN teams t2 ON m.team2_id = t2.id
+        ORDER BY m.bracket_type, m.round_number, m.match_number
+    """,
+    'matches_changed_since': """
+        SELECT m.*, t1.team_name as team1_name, t2.team_name as team2_name
+        FROM matches m
+        LEFT JOIN teams t1 ON m.team1_id = t1.id
+        LEFT JOIN teams t2 ON m.team2_id = t2.id
+        WHERE m.version > $1
+        ORDER BY m.bracket_type, m.round_number, m.match_number
+    """,
+    'matches_exist': "SELECT 1 FROM matches LIMIT 1",
+    # Счётчики из V0014: размер ответа зависит от числа статусов и раундов, а не команд
+    'tournament_stats': """
+        SELECT
+            (SELECT COALESCE(jsonb_object_agg(status, team_count), '{}'::jsonb)
+             FROM team_status_counts WHERE team_count <> 0) AS teams,
+            (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                        'bracket_type', bracket_type, 'round_number', round_number,
+                        'total', total, 'finished', finished
+                    ) ORDER BY bracket_type, round_number), '[]'::jsonb)
+             FROM match_round_stats WHERE total <> 0) AS rounds
+    """,
+    'team_by_auth_code': "SELECT * FROM teams WHERE auth_code_normalized = $1",
+    'table_version': "SELECT version, updated_at FROM table_versions WHERE table_name = $1",
+    'feed_versions': "SELECT table_name, version FROM table_versions WHERE table_name IN ('matches', 'matches_reset', 'teams')",
+    'admin_by_username': "SELECT * FROM admin_users WHERE username = $1",
+    'admin_password_update': "UPDATE admin_users SET password_hash = $1 WHERE id = $2",
+    'team_insert': """
+        INSERT INTO teams (team_name, captain_name, captain_telegram, members_count, members_info,
+                           auth_code, status)
+        VALUES ($1, $2, $3, $4, $5, $6, 'pending')
+        RETURNING id
+    """,
+    'outbox_insert': "INSERT INTO notification_outbox (team_id, telegram_username, message) VALUES ($1, $2, $3)",
+    'team_update_status': "UPDATE teams SET status = $1 WHERE id = $2",
+    'team_update': """
+        UPDATE teams SET team_name = $1, captain_name = $2, captain_telegram = $3,
+               members_count = $4, members_info = $5
+        WHERE id = $6
+    """,
+    'roster_conflicts': """
+        SELECT tm.telegram, tm.nickname, t.id AS team_id, t.team_name
+        FROM team_members tm
+        JOIN teams t ON t.id = tm.team_id
+        WHERE tm.telegram_normalized = ANY($1) AND tm.team_id <> $2 AND t.status <> 'rejected'
+        ORDER BY tm.telegram_normalized, t.id
+    """,
+    'players_search': """
+        SELECT tm.team_id, t.team_name, t.status, tm.member_position, tm.role, tm.nickname, tm.telegram
+        FROM team_members tm
+        JOIN teams t ON t.id = tm.team_id
+        WHERE tm.telegram_normalized LIKE $1 OR lower(tm.nickname) LIKE $1
+        ORDER BY tm.nickname, tm.team_id
+        LIMIT $2
+    """,
+    'pending_action_upsert': """
+        INSERT INTO pending_actions (team_id, action_type, action_data, status, created_at, expires_at)
+        VALUES ($1, $2, $3, 'pending', NOW(), NOW() + $4 * INTERVAL '1 hour')
+        ON CONFLICT (team_id, action_type) WHERE status = 'pending'
+        DO UPDATE SET action_data = EXCLUDED.action_data, created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+        RETURNING id, (xmax <> 0) AS replaced
+    """,
+    'pending_actions_list': """
+        SELECT p.id, p.team_id, t.team_name AS current_team_name, p.action_type, p.action_data,
+               p.created_at, p.expires_at
+        FROM pending_actions p
+        LEFT JOIN teams t ON t.id = p.team_id
+        WHERE p.status = 'pending' AND p.expires_at > NOW()
+        ORDER BY p.expires_at
+        LIMIT $1
+    """,
+    'pending_actions_claim': """
+        SELECT id, team_id, action_type, action_data, expires_at <= NOW() AS expired
+        FROM pending_actions
+        WHERE id = ANY($1) AND status = 'pending'
+        FOR UPDATE
+    """,
+    'pending_actions_resolve': """
+        UPDATE pending_actions SET status = $1, resolved_at = NOW()
+        WHERE id = ANY($2) AND status = 'pending'
+    """,
+    'pending_actions_expire': """
+        UPDATE pending_actions SET status = 'expired', resolved_at = NOW()
+        WHERE id IN (
+            SELECT id FROM pending_actions
+            WHERE status = 'pending' AND expires_at <= NOW()
+            ORDER BY expires_at
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+    """,
+    'team_delete': "DELETE FROM teams WHERE id = $1",
+    'team_delete_by_auth_code': "DELETE FROM teams WHERE id = $1 AND auth_code_normalized = $2",
+    # $1 — ключи "<правило>:<значение>", $2 — длины окон в секундах; время берётся с сервера БД,
+    # чтобы окна всех инстансов совпадали
+    'rate_limit_hit': """
+        WITH k AS (
+            SELECT k.bucket, k.window_seconds, now_epoch,
+                   (floor(now_epoch / k.window_seconds) * k.window_seconds)::bigint AS window_start
+            FROM unnest($1::text[], $2::int[]) AS k(bucket, window_seconds),
+                 LATERAL (SELECT extract(epoch FROM NOW())::float8 AS now_epoch) n
+        ), hit AS (
+            INSERT INTO rate_limits (bucket, window_start, hits, expires_at)
+            SELECT bucket, window_start, 1, to_timestamp(window_start + 2 * window_seconds)
+            FROM k
+            ON CONFLICT (bucket, window_start) DO UPDATE SET hits = rate_limits.hits + 1
+            RETURNING bucket, hits
+        )
+        SELECT hit.bucket,
+               hit.hits + COALESCE(prev.hits, 0) * (1 - (k.now_epoch - k.window_start) / k.window_seconds) AS weighted_hits,
+               k.window_start + k.window_seconds - k.now_epoch AS resets_in
+        FROM hit
+        JOIN k ON k.bucket = hit.bucket
+        LEFT JOIN rate_limits prev ON prev.bucket = k.bucket AND prev.window_start = k.window_start - k.window_seconds
+    """,
+    'rate_limits_purge': "DELETE FROM rate_limits WHERE expires_at < NOW()",
+    'idempotency_lookup': """
+        SELECT request_hash, status_code, response_body FROM idempotency_keys
+        WHERE idempotency_key = $1 AND expires_at > NOW()
+    """,
+    # Просроченный ключ занимается заново; живой — конфликт (повтор, выполненный параллельно)
+    'idempotency_store': """
+        INSERT INTO idempotency_keys (idempotency_key, request_hash, status_code, response_body, expires_at)
+        VALUES ($1, $2, $3, $4, NOW() + $5 * INTERVAL '1 hour')
+        ON CONFLICT (idempotency_key) DO UPDATE
+        SET request_hash = EXCLUDED.request_hash, status_code = EXCLUDED.status_code,
+            response_body = EXCLUDED.response_body, created_at = NOW(), expires_at = EXCLUDED.expires_at
+        WHERE idempotency_keys.expires_at <= NOW()
+        RETURNING idempotency_key
+    """,
+    'idempotency_purge': "DELETE FROM idempotency_keys WHERE expires_at < NOW()",
+}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    '''Соединение, которое помнит подготовленные запросы и время последнего использования'''
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared: set = set()
+        # Запросы, план которых устарел внутри явной транзакции: пересоздаются при следующем вызове
+        self.stale: set = set()
+        self.last_used: float = time.monotonic()
+        self.autocommit = True
+
+
+_pool: Optional[pg_pool.ThreadedConnectionPool] = None
+_pool_dsn: Optional[str] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(dsn: str) -> pg_pool.ThreadedConnectionPool:
+    global _pool, _pool_dsn
+    if _pool is not None and _pool_dsn == dsn and not _pool.closed:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_dsn != dsn or _pool.closed:
+            if _pool is not None and not _pool.closed:
+                _pool.closeall()
+            _pool = pg_pool.ThreadedConnectionPool(
+                POOL_MIN_SIZE,
+                POOL_MAX_SIZE,
+                dsn,
+                connection_factory=PooledConnection,
+                connect_timeout=CONNECT_TIMEOUT,
+            )
+            _pool_dsn = dsn
+    return _pool
+
+
+def _is_alive(conn: PooledConnection) -> bool:
+    if conn.closed:
+        return False
+    if time.monotonic() - conn.last_used < HEALTHCHECK_AFTER:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def get_connection(dsn: str) -> PooledConnection:
+    '''Выдать живое соединение из пула, переподключаясь при обрыве'''
+    pool = _get_pool(dsn)
+    # Одна попытка на каждое соединение пула плюс одно свежее
+    for _ in range(POOL_MAX_SIZE + 1):
+        conn = pool.getconn()
+        if _is_alive(conn):
+            return conn
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError('Could not obtain a healthy database connection')
+
+
+def release_connection(conn: PooledConnection) -> None:
+    '''Вернуть соединение в пул; сломанные соединения закрываются'''
+    if _pool is None or _pool.closed:
+        conn.close()
+        return
+    if not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+    broken = bool(conn.closed) or conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    if not broken:
+        conn.last_used = time.monotonic()
+    try:
+        _pool.putconn(conn, close=broken)
+    except pg_pool.PoolError:
+        conn.close()
+
+
+@contextmanager
+def transaction(conn: PooledConnection) -> Iterator[PooledConnection]:
+    '''Явная транзакция на соединении из пула (по умолчанию они в autocommit)'''
+    conn.autocommit = False
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+
+
+def execute(cursor, name: str, params: Sequence[Any] = ()) -> None:
+    '''Выполнить запрос из STATEMENTS через серверный prepared statement'''
+    conn = cursor.connection
+    prepared = getattr(conn, 'prepared', None)
+    if prepared is None:
+        # Соединение не из пула (например, в скриптах) — обычное выполнение
+        cursor.execute(_as_pyformat(STATEMENTS[name]), {f'p{i}': value for i, value in enumerate(params, 1)})
+        return
+
+    if name in conn.stale:
+        cursor.execute(f"DEALLOCATE {name}")
+        conn.stale.discard(name)
+        prepared.discard(name)
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} AS {STATEMENTS[name]}")
+        prepared.add(name)
+
+    placeholders = ', '.join(['%s'] * len(params))
+    sql = f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"
+    try:
+        cursor.execute(sql, params)
+    except psycopg2.errors.FeatureNotSupported:
+        # "cached plan must not change result type" после миграции схемы.
+        # Явная транзакция уже прервана: повтор в ней невозможен, запрос пересоздаётся при следующем вызове
+        if not conn.autocommit:
+            conn.stale.add(name)
+            raise
+        cursor.execute(f"DEALLOCATE {name}")
+        cursor.execute(f"PREPARE {name} AS {STATEMENTS[name]}")
+        cursor.execute(sql, params)
+
+
+def _as_pyformat(statement: str) -> str:
+    '''$n -> %(pn)s: параметр может встречаться в запросе несколько раз; литеральный % экранируется'''
+    return re.sub(r'\$(\d+)', r'%(p\1)s', statement.replace('%', '%%'))
@@ -0,0 +1,238 @@
+'''
+Экспорт команд и матчей в CSV/NDJSON.
+
+Команды выгружаются по строке на игрока: members_info разбирается модулем members.
+Строки идут в порядке id, чтобы выгрузку можно было резать keyset-страницами.
+
+Функция отдаёт ответ одним телом, поэтому по HTTP выгрузка постраничная: не больше
+EXPORT_PAGE_SIZE команд или матчей за запрос, курсор следующей страницы — в X-Next-Cursor,
+заголовок CSV — только на первой. Склеенные по порядку страницы дают весь файл.
+Без ограничения на тело выгрузка идёт потоком серверного курсора: python export.py teams csv > teams.csv
+
+Без dataset и format resource=export отвечает прежним JSON {success, csv, total}, как PHP-бэкенд:
+на него рассчитана кнопка выгрузки в админке.
+'''
+import os
+import io
+import csv
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+import db
+import metrics
+import responses
+from members import parse_members_info
+
+CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '1000'))
+PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', '2000'))
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+TEAM_COLUMNS = [
+    'team_id', 'team_name', 'captain_name', 'captain_telegram', 'status', 'created_at',
+    'member_position', 'member_role', 'player_name', 'player_telegram',
+]
+MATCH_COLUMNS = [
+    'id', 'match_number', 'bracket_type', 'round_number',
+    'team1_id', 'team1_name', 'team2_id', 'team2_name',
+    'score1', 'score2', 'winner', 'status', 'scheduled_time',
+]
+
+QUERIES = {
+    'teams': """
+        SELECT id, team_name, captain_name, captain_telegram, status, created_at, members_info
+        FROM teams
+    """,
+    'matches': """
+        SELECT m.id, m.match_number, m.bracket_type, m.round_number,
+               m.team1_id, t1.team_name as team1_name, m.team2_id, t2.team_name as team2_name,
+               m.score1, m.score2, m.winner, m.status, m.scheduled_time
+        FROM matches m
+        LEFT JOIN teams t1 ON m.team1_id = t1.id
+        LEFT JOIN teams t2 ON m.team2_id = t2.id
+    """,
+}
+KEY_COLUMNS = {'teams': 'id', 'matches': 'm.id'}
+COLUMNS = {'teams': TEAM_COLUMNS, 'matches': MATCH_COLUMNS}
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson; charset=utf-8'}
+
+
+LEGACY_HEADER = ['Team Name', 'Captain Name', 'Captain Telegram', 'Status', 'Created At', 'Members Info']
+
+
+class ExportError(ValueError):
+    '''Неизвестный набор данных или формат'''
+
+
+def validate(dataset: str, export_format: str) -> None:
+    if dataset not in QUERIES:
+        raise ExportError(f"dataset must be one of: {', '.join(QUERIES)}")
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+
+def parse_page(cursor_param: Optional[str], limit_param: Optional[str]) -> Tuple[int, int]:
+    '''Курсор (id последней выгруженной строки) и размер страницы из параметров запроса'''
+    try:
+        after = int(cursor_param) if cursor_param else 0
+    except ValueError:
+        raise ExportError('Invalid cursor')
+    if after < 0:
+        raise ExportError('Invalid cursor')
+    if not limit_param:
+        return after, PAGE_SIZE
+    try:
+        limit = int(limit_param)
+    except ValueError:
+        raise ExportError('limit must be an integer')
+    if limit < 1 or limit > PAGE_SIZE:
+        raise ExportError(f'limit must be between 1 and {PAGE_SIZE}')
+    return after, limit
+
+
+def select(dataset: str, paged: bool = False) -> str:
+    key = KEY_COLUMNS[dataset]
+    if paged:
+        return f"{QUERIES[dataset]} WHERE {key} > %s ORDER BY {key} LIMIT %s"
+    return f"{QUERIES[dataset]} ORDER BY {key}"
+
+
+def team_rows(team: Dict[str, Any]) -> List[Dict[str, Any]]:
+    '''Строка на игрока; команда без состава — одна строка с пустыми полями игрока'''
+    base = {
+        'team_id': team['id'],
+        'team_name': team['team_name'],
+        'captain_name': team['captain_name'],
+        'captain_telegram': team['captain_telegram'],
+        'status': team['status'],
+        'created_at': team['created_at'],
+    }
+    players = parse_members_info(team['members_info'])
+    if not players:
+        return [dict(base, member_position=None, member_role=None, player_name=None, player_telegram=None)]
+    return [
+        dict(base, member_position=position, member_role=player['role'],
+             player_name=player['player_name'], player_telegram=player['telegram'])
+        for position, player in enumerate(players, start=1)
+    ]
+
+
+def iter_chunks(conn, dataset: str, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    '''Пачки строк выгрузки; именованный курсор живёт только внутри транзакции'''
+    with db.transaction(conn):
+        cursor = conn.cursor(name=f'export_{dataset}', cursor_factory=RealDictCursor)
+        try:
+            cursor.itersize = chunk_size
+            cursor.execute(select(dataset))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if dataset == 'teams':
+                    yield [row for team in rows for row in team_rows(team)]
+                else:
+                    yield rows
+        finally:
+            cursor.close()
+
+
+def format_csv(rows: List[Dict[str, Any]], columns: List[str], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def format_ndjson(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    return ''.join(
+        responses.dumps({column: row.get(column) for column in columns}) + '\n'
+        for row in rows
+    )
+
+
+def format_rows(rows: List[Dict[str, Any]], dataset: str, export_format: str) -> str:
+    columns = COLUMNS[dataset]
+    with metrics.stage('serialize'):
+        if export_format == 'csv':
+            return format_csv(rows, columns, header=False)
+        return format_ndjson(rows, columns)
+
+
+def csv_header(dataset: str) -> str:
+    # BOM — чтобы Excel открыл кириллицу в UTF-8 без мастера импорта
+    return '\ufeff' + format_csv([], COLUMNS[dataset], header=True)
+
+
+def page(cursor, dataset: str, export_format: str, after: int = 0,
+         limit: int = PAGE_SIZE) -> Tuple[str, Optional[int]]:
+    '''Текст одной страницы выгрузки и курсор следующей (None, если это последняя)'''
+    validate(dataset, export_format)
+    # Одна лишняя строка показывает, есть ли следующая страница
+    cursor.execute(select(dataset, paged=True), (after, limit + 1))
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]['id']
+    if dataset == 'teams':
+        rows = [row for team in rows for row in team_rows(team)]
+
+    body = format_rows(rows, dataset, export_format)
+    if export_format == 'csv' and not after:
+        body = csv_header(dataset) + body
+    return body, next_cursor
+
+
+def stream(conn, dataset: str, export_format: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    '''Текст выгрузки по пачкам'''
+    validate(dataset, export_format)
+    if export_format == 'csv':
+        yield csv_header(dataset)
+    for rows in iter_chunks(conn, dataset, chunk_size):
+        yield format_rows(rows, dataset, export_format)
+
+
+def legacy_teams_csv(cursor) -> Dict[str, Any]:
+    '''Выгрузка в формате PHP-бэкенда: строка на команду, состав в одной колонке'''
+    cursor.execute("""
+        SELECT team_name, captain_name, captain_telegram, status, created_at, members_info
+        FROM teams
+        ORDER BY created_at DESC
+    """)
+    teams = cursor.fetchall()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(LEGACY_HEADER)
+    writer.writerows(
+        [team['team_name'], team['captain_name'], team['captain_telegram'], team['status'], team['created_at'],
+         (team['members_info'] or '').replace('\n', ' | ').replace(',', ';')]
+        for team in teams
+    )
+    return {'success': True, 'csv': buffer.getvalue().rstrip('\n'), 'total': len(teams)}
+
+
+def main() -> None:
+    if len(sys.argv) != 3:
+        sys.exit('Usage: python export.py <teams|matches> <csv|ndjson>')
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL not configured')
+    dataset, export_format = sys.argv[1], sys.argv[2]
+    try:
+        validate(dataset, export_format)
+    except ExportError as e:
+        sys.exit(str(e))
+
+    conn = db.get_connection(dsn)
+    try:
+        for chunk in stream(conn, dataset, export_format):
+            sys.stdout.write(chunk)
+    finally:
+        db.release_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+Idempotency-Key для POST регистрации команды.
+
+Повтор запроса (ретрай после таймаута, двойной клик) с тем же ключом возвращает сохранённый
+ответ: lookup — одна выборка по первичному ключу. Ответ сохраняется в той же транзакции, что и
+вставка команды; если параллельный повтор успел сохранить ключ раньше, транзакция откатывается
+(DuplicateRequest) и клиент получает ответ первого запроса.
+'''
+import os
+import json
+import random
+import hashlib
+from typing import Any, Dict, Optional
+
+import db
+import responses
+
+TTL_HOURS = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', '24'))
+MAX_KEY_LENGTH = 255
+PURGE_CHANCE = float(os.environ.get('IDEMPOTENCY_PURGE_CHANCE', '0.01'))
+IN_PROGRESS_RETRY_AFTER = 1
+
+
+class IdempotencyError(ValueError):
+    '''Некорректный ключ (400) или повтор ключа с другим телом запроса (422)'''
+
+
+class DuplicateRequest(Exception):
+    '''Ключ уже сохранён параллельным запросом; транзакция должна откатиться'''
+
+
+def validate_key(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    key = value.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f'Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters')
+    return key
+
+
+def request_hash(data: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def lookup(cursor, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    '''Сохранённый ответ для ключа или None'''
+    db.execute(cursor, 'idempotency_lookup', (key,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    if row['request_hash'] != fingerprint:
+        raise IdempotencyError('Idempotency-Key was already used with a different request')
+    return {
+        'statusCode': row['status_code'],
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Idempotent-Replayed',
+            'Idempotent-Replayed': 'true'
+        },
+        'isBase64Encoded': False,
+        'body': row['response_body']
+    }
+
+
+def in_progress_response() -> Dict[str, Any]:
+    '''Ключ занят запросом, ответ которого ещё не сохранён: клиенту стоит повторить позже'''
+    return {
+        'statusCode': 409,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Retry-After',
+            'Retry-After': str(IN_PROGRESS_RETRY_AFTER)
+        },
+        'isBase64Encoded': False,
+        'body': responses.dumps({'error': 'Request in progress', 'message': 'Запрос с этим ключом ещё выполняется'})
+    }
+
+
+def store(cursor, key: str, fingerprint: str, response: Dict[str, Any]) -> None:
+    '''Сохранить ответ внутри транзакции запроса; DuplicateRequest, если ключ уже занят'''
+    db.execute(cursor, 'idempotency_store', (key, fingerprint, response['statusCode'], response['body'], TTL_HOURS))
+    if cursor.fetchone() is None:
+        raise DuplicateRequest(key)
+    if random.random() < PURGE_CHANCE:
+        db.execute(cursor, 'idempotency_purge')
+
@@ -1,11 +1,29 @@
 import json
 import os
 import hashlib
+import hmac
+import random
 import secrets
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import time
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import auth
+import bracket
+import db
+import export
+import idempotency
+import listing
+import match_feed
+import members
+import metrics
+import moderation
+import outbox
+import pending_actions
+import ratelimit
+import responses
+import team_import
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -14,7 +32,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Returns: HTTP response с данными команд, настройками или результатом операции
     '''
     method: str = event.get('httpMethod', 'GET')
+    params = event.get('queryStringParameters') or {}
     
+    with metrics.request(method, params.get('resource')) as timing:
+        response = dispatch(event, method)
+        timing.status = response['statusCode']
+        return response
+
+def dispatch(event: Dict[str, Any], method: str) -> Dict[str, Any]:
     # Handle CORS OPTIONS
     if method == 'OPTIONS':
         return {
@@ -22,45 +47,151 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, PATCH, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, If-None-Match, Idempotency-Key',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
         }
     
+    params = event.get('queryStringParameters') or {}
+    
+    # Метрики инстанса отдаются без обращения к БД
+    if method == 'GET' and params.get('resource') == 'metrics':
+        return metrics_response(event)
+    
+    # Тело разбирается один раз; обработчики получают готовый dict
+    data = None
+    if method in ('POST', 'PUT', 'PATCH'):
+        try:
+            data = parse_body(event)
+        except ValueError:
+            return responses.json_response(400, {'error': 'Invalid JSON body'})
+    
+    # Админские маршруты: токен проверяется по подписи, без запроса к admin_users
+    if requires_admin(method, params, data) and not is_admin_request(event):
+        return responses.json_response(401, {'error': 'Unauthorized'})
+    
+    # Лимиты частоты регистраций и поиска по коду: счётчик инстанса проверяется до подключения к БД
+    limit_keys = ratelimit.request_keys(event, method, params, data)
+    retry_after = ratelimit.check_local(limit_keys)
+    if retry_after is not None:
+        return rate_limited_response(retry_after)
+    
     # Подключение к БД
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'isBase64Encoded': False,
-            'body': json.dumps({'error': 'DATABASE_URL not configured'})
-        }
+        return responses.json_response(500, {'error': 'DATABASE_URL not configured'})
     
-    conn = psycopg2.connect(dsn)
-    conn.autocommit = True
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    with metrics.stage('connect'):
+        conn = db.get_connection(dsn)
+    cursor = conn.cursor(cursor_factory=metrics.TimedCursor)
     
     try:
+        if limit_keys:
+            retry_after = ratelimit.check_shared(cursor, limit_keys)
+            if retry_after is not None:
+                return rate_limited_response(retry_after)
+        
         if method == 'GET':
             return handle_get(event, cursor)
         elif method == 'POST':
-            return handle_post(event, cursor, conn)
+            return handle_post(event, data, cursor, conn)
         elif method in ['PUT', 'PATCH']:
-            return handle_put(event, cursor)
+            return handle_put(event, data, cursor, conn)
         elif method == 'DELETE':
             return handle_delete(event, cursor)
         else:
-            return {
-                'statusCode': 405,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'isBase64Encoded': False,
-                'body': json.dumps({'error': 'Method not allowed'})
-            }
+            return responses.json_response(405, {'error': 'Method not allowed'})
     finally:
         cursor.close()
-        conn.close()
+        db.release_connection(conn)
+
+def parse_body(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''JSON-объект из тела запроса; ValueError, если это не JSON или не объект'''
+    data = json.loads(event.get('body') or '{}')
+    if not isinstance(data, dict):
+        raise ValueError('JSON body must be an object')
+    return data
+
+def rate_limited_response(retry_after: int) -> Dict[str, Any]:
+    return {
+        'statusCode': 429,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Retry-After',
+            'Retry-After': str(retry_after)
+        },
+        'isBase64Encoded': False,
+        'body': responses.dumps({
+            'error': 'Too many requests',
+            'message': 'Слишком много запросов. Попробуйте позже.',
+            'retry_after': retry_after
+        })
+    }
+
+ADMIN_GET_RESOURCES = ('pending_actions', 'export')
+ADMIN_POST_RESOURCES = ('settings', 'bracket', 'import')
+ADMIN_PUT_RESOURCES = ('match', 'pending_actions')
+
+def requires_admin(method: str, params: Dict[str, Any], data: Optional[Dict[str, Any]]) -> bool:
+    if method == 'GET':
+        return params.get('resource') in ADMIN_GET_RESOURCES or params.get('view') == 'admin'
+    data = data or {}
+    if method == 'POST':
+        return data.get('resource') in ADMIN_POST_RESOURCES
+    if method in ('PUT', 'PATCH'):
+        return data.get('resource') in ADMIN_PUT_RESOURCES or 'updates' in data or 'status' in data
+    if method == 'DELETE':
+        # Капитан удаляет свою команду по коду регистрации, любую другую — только админ
+        return not params.get('auth_code')
+    return False
+
+def is_admin_request(event: Dict[str, Any]) -> bool:
+    '''X-Auth-Token — сессионный токен после входа или сервисный ADMIN_API_TOKEN'''
+    provided = get_header(event, 'X-Auth-Token')
+    if not provided:
+        return False
+    if auth.verify_token(provided) is not None:
+        return True
+    expected = os.environ.get('ADMIN_API_TOKEN')
+    # compare_digest на str принимает только ASCII; байты — любые заголовки
+    return bool(expected and hmac.compare_digest(provided.encode(), expected.encode()))
+
+def metrics_response(event: Dict[str, Any]) -> Dict[str, Any]:
+    if not is_admin_request(event):
+        return responses.json_response(401, {'error': 'Unauthorized'})
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', 'Cache-Control': 'no-store'},
+        'isBase64Encoded': False,
+        'body': responses.dumps({'success': True, 'metrics': metrics.snapshot()})
+    }
+
+# Кэш registration_settings.is_open на инстанс функции; другие инстансы увидят изменение через TTL
+SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', '5'))
+_settings_cache: Dict[str, Any] = {'loaded': False, 'is_open': None, 'expires_at': 0.0}
+
+def get_registration_open(cursor) -> Optional[bool]:
+    '''Текущее значение is_open; None, если настроек ещё нет'''
+    if _settings_cache['loaded'] and time.monotonic() < _settings_cache['expires_at']:
+        return _settings_cache['is_open']
+    
+    db.execute(cursor, 'settings_is_open')
+    row = cursor.fetchone()
+    is_open = bool(row['is_open']) if row else None
+    cache_registration_open(is_open)
+    return is_open
+
+def cache_registration_open(is_open: Optional[bool]) -> None:
+    if is_open is not None and not isinstance(is_open, bool):
+        raise TypeError('is_open must be a bool')
+    _settings_cache.update(loaded=True, is_open=is_open, expires_at=time.monotonic() + SETTINGS_CACHE_TTL)
+
+def normalize_auth_code(auth_code: str) -> str:
+    '''Канонический вид кода: REG-AB12-CD34 -> AB12CD34 (как normalize_auth_code в БД, V0004)'''
+    return auth_code.upper().replace('REG', '').replace('-', '').replace(' ', '')
 
 def handle_get(event: Dict[str, Any], cursor) -> Dict[str, Any]:
     params = event.get('queryStringParameters') or {}
@@ -69,188 +200,417 @@ def handle_get(event: Dict[str, Any], cursor) -> Dict[str, Any]:
     
     # Получить настройки регистрации
     if resource == 'settings':
-        cursor.execute("SELECT is_open FROM registration_settings ORDER BY updated_at DESC LIMIT 1")
+        stored = get_registration_open(cursor)
+        is_open = stored if stored is not None else True
+        
+        return responses.json_response(200, {'is_open': is_open})
+    
+    # Публичная статистика турнира: команды по статусам и прогресс матчей по раундам
+    if resource == 'stats':
+        db.execute(cursor, 'tournament_stats')
         row = cursor.fetchone()
-        is_open = row['is_open'] if row else True
+        rounds = row['rounds']
+        return responses.json_response(200, {
+            'success': True,
+            'teams': {'total': sum(row['teams'].values()), 'by_status': row['teams']},
+            'matches': {
+                'total': sum(item['total'] for item in rounds),
+                'finished': sum(item['finished'] for item in rounds),
+                'rounds': rounds
+            }
+        })
+    
+    # Получить матчи: полный снимок или изменения после since, с ожиданием до wait секунд
+    if resource == 'matches':
+        try:
+            since = match_feed.parse_cursor(params.get('since'))
+            wait = match_feed.parse_wait(params.get('wait'))
+        except match_feed.FeedError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        body, versions = match_feed.read(cursor, since, wait)
+        etag = f'"matches-{versions["matches"]}-{versions["teams"]}-{"full" if since is None else params["since"]}"'
+        if not_modified(event, etag):
+            return {
+                'statusCode': 304,
+                'headers': {'Access-Control-Allow-Origin': '*', 'Access-Control-Expose-Headers': 'ETag', 'ETag': etag, 'Cache-Control': 'no-cache'},
+                'isBase64Encoded': False,
+                'body': ''
+            }
         
         return {
             'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'ETag',
+                'ETag': etag,
+                'Cache-Control': 'no-cache'
+            },
             'isBase64Encoded': False,
-            'body': json.dumps({'is_open': is_open})
+            'body': body
         }
     
-    # Получить матчи
-    if resource == 'matches':
-        cursor.execute("""
-            SELECT m.*, t1.team_name as team1_name, t2.team_name as team2_name
-            FROM matches m
-            LEFT JOIN teams t1 ON m.team1_id = t1.id
-            LEFT JOIN teams t2 ON m.team2_id = t2.id
-            ORDER BY m.bracket_type, m.round_number, m.match_number
-        """)
-        matches = cursor.fetchall()
+    # Очередь правок команд на подтверждение (старые первыми)
+    if resource == 'pending_actions':
+        try:
+            limit = listing.parse_limit(params.get('limit')) or listing.MAX_PAGE_SIZE
+        except listing.ListingError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        db.execute(cursor, 'pending_actions_list', (limit,))
+        return responses.json_response(200, {'success': True, 'actions': cursor.fetchall()})
+    
+    # Поиск игроков по нику или Telegram (префикс) среди всех составов
+    if resource == 'players':
+        query = (params.get('q') or '').strip()
+        if len(query.lstrip('@')) < 2:
+            return responses.json_response(400, {'error': 'q must be at least 2 characters'})
+        
+        try:
+            limit = listing.parse_limit(params.get('limit')) or members.MAX_SEARCH_RESULTS
+        except listing.ListingError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        return responses.json_response(200, {'success': True, 'players': members.search_players(cursor, query, limit)})
+    
+    # Выгрузка команд (строка на игрока) или матчей в CSV/NDJSON
+    if resource == 'export':
+        if params.get('dataset') is None and params.get('format') is None:
+            # Прежний контракт админки: JSON с CSV внутри
+            return responses.json_response(200, export.legacy_teams_csv(cursor))
+        
+        dataset = params.get('dataset', 'teams')
+        export_format = params.get('format', 'csv')
+        try:
+            export.validate(dataset, export_format)
+            after, limit = export.parse_page(params.get('cursor'), params.get('limit'))
+        except export.ExportError as e:
+            return responses.json_response(400, {'error': str(e)})
         
+        # Тело ответа функции — одна строка, поэтому выгрузка отдаётся страницами
+        body, next_cursor = export.page(cursor, dataset, export_format, after, limit)
+        filename = f"{dataset}.{export_format}"
+        headers = {
+            'Content-Type': export.CONTENT_TYPES[export_format],
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Content-Disposition, X-Next-Cursor'
+        }
+        if next_cursor is not None:
+            headers['X-Next-Cursor'] = str(next_cursor)
         return {
             'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'headers': headers,
             'isBase64Encoded': False,
-            'body': json.dumps({'success': True, 'matches': matches}, default=str)
+            'body': body
         }
     
     # Поиск команды по коду
     if auth_code:
-        code_clean = auth_code.upper().replace('-', '').replace(' ', '').replace('REG', '')
-        
-        cursor.execute("""
-            SELECT * FROM teams 
-            WHERE REPLACE(REPLACE(REPLACE(UPPER(auth_code), 'REG', ''), '-', ''), ' ', '') = %s
-        """, (code_clean,))
+        db.execute(cursor, 'team_by_auth_code', (normalize_auth_code(auth_code),))
         team = cursor.fetchone()
         
+        return responses.json_response(200, {'team': team, 'success': team is not None})
+    
+    # Получить список команд (проекция, фильтр по статусу, keyset-пагинация)
+    view = 'admin' if params.get('view') == 'admin' else 'public'
+    try:
+        fields = listing.resolve_fields(view, params.get('fields'))
+        limit = listing.parse_limit(params.get('limit'))
+        after = listing.decode_cursor(params['cursor']) if params.get('cursor') else None
+    except listing.ListingError as e:
+        return responses.json_response(400, {'error': str(e)})
+    
+    # Версия таблицы меняется триггером при любой записи в teams (V0005)
+    db.execute(cursor, 'table_version', ('teams',))
+    version_row = cursor.fetchone()
+    version = version_row['version'] if version_row else 0
+    query_key = '|'.join([view, ','.join(fields), params.get('status') or '', str(limit or ''), params.get('cursor') or ''])
+    etag = f'"teams-{version}-{hashlib.md5(query_key.encode()).hexdigest()[:12]}"'
+    cache_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if version_row:
+        # Только для информации: запись в пределах секунды не меняет Last-Modified, проверка — по ETag
+        last_modified = version_row['updated_at'].astimezone(timezone.utc)
+        cache_headers['Last-Modified'] = format_datetime(last_modified, usegmt=True)
+    
+    if not_modified(event, etag):
         return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'statusCode': 304,
+            'headers': {'Access-Control-Allow-Origin': '*', 'Access-Control-Expose-Headers': 'ETag, Last-Modified', **cache_headers},
             'isBase64Encoded': False,
-            'body': json.dumps({'team': team, 'success': team is not None}, default=str)
+            'body': ''
         }
     
-    # Получить все команды
-    cursor.execute("SELECT * FROM teams ORDER BY created_at DESC")
-    teams = cursor.fetchall()
+    try:
+        teams, next_cursor = listing.fetch_teams_page(cursor, fields, params.get('status'), limit, after)
+    except listing.ListingError as e:
+        return responses.json_response(400, {'error': str(e)})
+    
+    with metrics.stage('serialize'):
+        body = responses.dumps({'teams': teams, 'next_cursor': next_cursor})
     
     return {
         'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag, Last-Modified',
+            **cache_headers
+        },
         'isBase64Encoded': False,
-        'body': json.dumps({'teams': teams}, default=str)
+        'body': body
     }
 
-def handle_post(event: Dict[str, Any], cursor, conn) -> Dict[str, Any]:
-    body_str = event.get('body', '{}')
-    data = json.loads(body_str) if body_str else {}
+def roster_conflict_response(conflicts) -> Dict[str, Any]:
+    return responses.json_response(409, {
+        'error': 'Player already registered',
+        'message': 'Некоторые игроки уже заявлены в других командах',
+        'conflicts': conflicts
+    })
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    '''Заголовок запроса без учёта регистра'''
+    headers = event.get('headers') or {}
+    name_lower = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name_lower:
+            return value
+    return None
+
+def not_modified(event: Dict[str, Any], etag: str) -> bool:
+    '''Условный GET по If-None-Match; If-Modified-Since не учитывается: у него секундная точность'''
+    if_none_match = get_header(event, 'If-None-Match')
+    if if_none_match is None:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+def handle_post(event: Dict[str, Any], data: Dict[str, Any], cursor, conn) -> Dict[str, Any]:
+    metrics.set_resource(data.get('resource'))
     resource = data.get('resource')
     
     # Аутентификация админа
     if resource == 'auth':
         username = data.get('username', '')
         password = data.get('password', '')
+        if not isinstance(username, str) or not isinstance(password, str):
+            return responses.json_response(400, {'success': False, 'error': 'username and password must be strings'})
         
-        cursor.execute("SELECT * FROM admin_users WHERE username = %s", (username,))
+        db.execute(cursor, 'admin_by_username', (username,))
         user = cursor.fetchone()
         
-        if user and hashlib.sha256(password.encode()).hexdigest() == user['password_hash']:
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'isBase64Encoded': False,
-                'body': json.dumps({
-                    'success': True,
-                    'username': user['username'],
-                    'is_superadmin': user['is_superadmin']
-                })
-            }
+        valid, needs_rehash = auth.verify_password(password, user['password_hash'] if user else None)
+        if valid and user['is_active'] is not False:
+            # Старый sha256 или устаревшие параметры scrypt заменяются при входе
+            if needs_rehash:
+                db.execute(cursor, 'admin_password_update', (auth.hash_password(password), user['id']))
+            return responses.json_response(200, {
+                'success': True,
+                'username': user['username'],
+                'is_superadmin': user['is_superadmin'],
+                'token': auth.issue_token(user['username'], user['is_superadmin']),
+                'expires_in': int(auth.TOKEN_TTL_HOURS * 3600)
+            })
         else:
-            return {
-                'statusCode': 401,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'isBase64Encoded': False,
-                'body': json.dumps({'success': False, 'error': 'Неверный логин или пароль'})
-            }
+            return responses.json_response(401, {'success': False, 'error': 'Неверный логин или пароль'})
     
     # Обновить настройки регистрации
     if resource == 'settings':
         is_open = data.get('is_open', True)
         updated_by = data.get('updated_by', 'admin')
+        # Строка "false" истинна в Python и открыла бы регистрацию через кэш
+        if not isinstance(is_open, bool):
+            return responses.json_response(400, {'error': 'is_open must be a boolean'})
         
-        cursor.execute("SELECT id FROM registration_settings ORDER BY updated_at DESC LIMIT 1")
+        db.execute(cursor, 'settings_latest_id')
         existing = cursor.fetchone()
         
         if existing:
-            cursor.execute("""
-                UPDATE registration_settings 
-                SET is_open = %s, updated_by = %s, updated_at = NOW() 
-                WHERE id = %s
-            """, (is_open, updated_by, existing['id']))
+            db.execute(cursor, 'settings_update', (is_open, updated_by, existing['id']))
         else:
-            cursor.execute("""
-                INSERT INTO registration_settings (is_open, updated_by) 
-                VALUES (%s, %s)
-            """, (is_open, updated_by))
+            db.execute(cursor, 'settings_insert', (is_open, updated_by))
         
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'isBase64Encoded': False,
-            'body': json.dumps({'success': True, 'is_open': is_open})
-        }
+        # Write-through: этот инстанс сразу видит новое значение
+        cache_registration_open(is_open)
+        
+        return responses.json_response(200, {'success': True, 'is_open': is_open})
+    
+    # Сгенерировать турнирную сетку из одобренных команд
+    if resource == 'bracket':
+        if data.get('clear'):
+            with db.transaction(conn):
+                deleted = bracket.clear(cursor)
+            return responses.json_response(200, {'success': True, 'matches_deleted': deleted})
+        
+        db.execute(cursor, 'matches_exist')
+        if cursor.fetchone() and not data.get('replace'):
+            return responses.json_response(409, {'error': 'Bracket already exists', 'message': 'Передайте replace: true, чтобы пересоздать сетку'})
+        
+        try:
+            with db.transaction(conn):
+                team_ids = bracket.parse_team_ids(cursor, data.get('team_ids'))
+                if data.get('shuffle'):
+                    # Случайный посев вместо порядка регистрации / переданного team_ids
+                    team_ids = random.sample(team_ids, len(team_ids))
+                matches_count = bracket.generate(cursor, team_ids, data.get('format', 'double'))
+        except bracket.BracketError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        return responses.json_response(200, {'success': True, 'teams_count': len(team_ids), 'matches_count': matches_count})
+    
+    # Массовый импорт команд с отчётом об ошибках по строкам
+    if resource == 'import':
+        try:
+            team_import.check_rows(data.get('teams'))
+        except team_import.TeamImportError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        with db.transaction(conn):
+            report = team_import.import_teams(
+                cursor,
+                data['teams'],
+                notify=bool(data.get('notify')),
+                dry_run=bool(data.get('dry_run'))
+            )
+        
+        return responses.json_response(200, {'success': not report['errors'], **report})
+    
+    # Повтор с тем же Idempotency-Key (ретрай после таймаута) получает исходный ответ
+    try:
+        idempotency_key = idempotency.validate_key(get_header(event, 'Idempotency-Key'))
+    except idempotency.IdempotencyError as e:
+        return responses.json_response(400, {'error': str(e)})
+    if idempotency_key:
+        fingerprint = idempotency.request_hash(data)
+        try:
+            replay = idempotency.lookup(cursor, idempotency_key, fingerprint)
+        except idempotency.IdempotencyError as e:
+            return responses.json_response(422, {'error': str(e)})
+        if replay:
+            return replay
+    
+    # Игрок не может быть заявлен сразу в нескольких командах
+    conflicts = members.find_roster_conflicts(cursor, data.get('members_info'))
+    if conflicts:
+        return roster_conflict_response(conflicts)
     
     # Создать команду
     auth_code = f"REG-{secrets.token_hex(2).upper()}-{secrets.token_hex(2).upper()}"
     
-    cursor.execute("""
-        INSERT INTO teams (team_name, captain_name, captain_telegram, members_count, members_info, auth_code, status)
-        VALUES (%s, %s, %s, %s, %s, %s, 'pending')
-        RETURNING id
-    """, (
-        data.get('team_name'),
-        data.get('captain_name'),
-        data.get('captain_telegram'),
-        data.get('members_count'),
-        data.get('members_info'),
-        auth_code
-    ))
+    try:
+        with db.transaction(conn):
+            db.execute(cursor, 'team_insert', (
+                data.get('team_name'),
+                data.get('captain_name'),
+                data.get('captain_telegram'),
+                data.get('members_count'),
+                data.get('members_info'),
+                auth_code
+            ))
+            
+            team_id = cursor.fetchone()['id']
+            
+            # Уведомление в Telegram отправит outbox_worker VPS-бота после коммита
+            if data.get('captain_telegram'):
+                outbox.enqueue(cursor, team_id, data['captain_telegram'], outbox.registration_message(auth_code))
+            
+            response = responses.json_response(200, {'success': True, 'auth_code': auth_code, 'team_id': team_id})
+            if idempotency_key:
+                idempotency.store(cursor, idempotency_key, fingerprint, response)
+    except idempotency.DuplicateRequest:
+        # Параллельный повтор успел раньше: вставка откатилась, отдаём его ответ
+        try:
+            replay = idempotency.lookup(cursor, idempotency_key, fingerprint)
+        except idempotency.IdempotencyError as e:
+            return responses.json_response(422, {'error': str(e)})
+        return replay or idempotency.in_progress_response()
     
-    team_id = cursor.fetchone()['id']
+    return response
+
+def handle_put(event: Dict[str, Any], data: Dict[str, Any], cursor, conn) -> Dict[str, Any]:
+    metrics.set_resource(data.get('resource'))
     
-    # Отправить уведомление через Telegram
-    send_telegram_notification(team_id, auth_code, data.get('captain_telegram'))
+    # Результат матча: победитель и проигравший сразу продвигаются по сетке
+    if data.get('resource') == 'match':
+        # 0 в форме админки означает «нет победителя»
+        winner = data.get('winner') or None
+        try:
+            with db.transaction(conn):
+                store = bracket.DbMatchStore(cursor)
+                if winner is None and data.get('status', 'finished') != 'finished':
+                    # Без результата меняются только статус и время начала
+                    bracket.update_schedule(store, data.get('id'), data['status'], data.get('scheduled_time') or None)
+                    updated_ids = [data['id']]
+                else:
+                    updated_ids = bracket.report_result(
+                        store,
+                        data.get('id'),
+                        data.get('score1'),
+                        data.get('score2'),
+                        winner
+                    )
+        except bracket.BracketError as e:
+            return responses.json_response(404 if str(e) == 'Match not found' else 400, {'error': str(e)})
+        
+        return responses.json_response(200, {'success': True, 'updated_match_ids': updated_ids})
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'isBase64Encoded': False,
-        'body': json.dumps({'success': True, 'auth_code': auth_code, 'team_id': team_id})
-    }
-
-def handle_put(event: Dict[str, Any], cursor) -> Dict[str, Any]:
-    body_str = event.get('body', '{}')
-    data = json.loads(body_str) if body_str else {}
+    # Админ подтверждает или отклоняет правки из очереди пачкой
+    if data.get('resource') == 'pending_actions':
+        try:
+            approve_ids = pending_actions.parse_ids(data.get('approve'), 'approve')
+            reject_ids = pending_actions.parse_ids(data.get('reject'), 'reject')
+            with db.transaction(conn):
+                results = pending_actions.resolve(cursor, approve_ids, reject_ids)
+        except pending_actions.PendingActionError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        return responses.json_response(200, {'success': all(result['success'] for result in results), 'results': results})
+    
+    # Админ обновляет статусы пачкой: один UPDATE и одна пачка уведомлений
+    if 'updates' in data:
+        metrics.set_resource('updates')
+        try:
+            updates, results = moderation.parse_updates(data['updates'])
+        except moderation.ModerationError as e:
+            return responses.json_response(400, {'error': str(e)})
+        
+        with db.transaction(conn):
+            results = moderation.apply(cursor, updates) + results
+        
+        return responses.json_response(200, {
+            'success': all(result['success'] for result in results),
+            'updated': sum(1 for result in results if result['success']),
+            'results': results
+        })
     
     # Админ обновляет статус
     if 'status' in data:
-        cursor.execute("UPDATE teams SET status = %s WHERE id = %s", (data['status'], data['id']))
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'isBase64Encoded': False,
-            'body': json.dumps({'success': True})
-        }
-    
-    # Проверка открытости регистрации
-    cursor.execute("SELECT is_open FROM registration_settings ORDER BY updated_at DESC LIMIT 1")
-    row = cursor.fetchone()
-    
-    if not row or not row['is_open']:
-        return {
-            'statusCode': 403,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'isBase64Encoded': False,
-            'body': json.dumps({
-                'error': 'Registration closed',
-                'message': 'Регистрация завершена. Редактирование команд больше не доступно.'
-            })
-        }
+        metrics.set_resource('status')
+        db.execute(cursor, 'team_update_status', (data['status'], data['id']))
+        return responses.json_response(200, {'success': True})
     
     # Обновление данных команды
     members_info = data.get('members_info', '')
     members_count = len([line for line in members_info.split('\n') if line.strip()])
     
-    cursor.execute("""
-        UPDATE teams SET team_name = %s, captain_name = %s, captain_telegram = %s,
-               members_count = %s, members_info = %s
-        WHERE id = %s
-    """, (
+    conflicts = members.find_roster_conflicts(cursor, members_info, exclude_team_id=data.get('id'))
+    if conflicts:
+        return roster_conflict_response(conflicts)
+    
+    # После закрытия регистрации правка уходит админу на подтверждение
+    if not get_registration_open(cursor):
+        if not data.get('id'):
+            return responses.json_response(400, {'error': 'Missing id'})
+        
+        action = pending_actions.submit_update(cursor, data['id'], data)
+        return responses.json_response(202, {
+            'success': True,
+            'queued': True,
+            'action_id': action['id'],
+            'message': 'Регистрация завершена. Изменения отправлены администратору на подтверждение.'
+        })
+    
+    db.execute(cursor, 'team_update', (
         data.get('team_name'),
         data.get('captain_name'),
         data.get('captain_telegram'),
@@ -259,69 +619,28 @@ def handle_put(event: Dict[str, Any], cursor) -> Dict[str, Any]:
         data.get('id')
     ))
     
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'isBase64Encoded': False,
-        'body': json.dumps({'success': True})
-    }
+    return responses.json_response(200, {'success': True})
 
 def handle_delete(event: Dict[str, Any], cursor) -> Dict[str, Any]:
     params = event.get('queryStringParameters') or {}
     team_id = params.get('id')
     
     if not team_id:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'isBase64Encoded': False,
-            'body': json.dumps({'error': 'Missing id parameter'})
-        }
+        return responses.json_response(400, {'error': 'Missing id parameter'})
     
     # Проверка открытости регистрации
-    cursor.execute("SELECT is_open FROM registration_settings ORDER BY updated_at DESC LIMIT 1")
-    row = cursor.fetchone()
-    
-    if not row or not row['is_open']:
-        return {
-            'statusCode': 403,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'isBase64Encoded': False,
-            'body': json.dumps({
-                'error': 'Registration closed',
-                'message': 'Регистрация завершена. Удаление команд больше не доступно.'
-            })
-        }
-    
-    cursor.execute("DELETE FROM teams WHERE id = %s", (team_id,))
-    
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-        'isBase64Encoded': False,
-        'body': json.dumps({'success': True})
-    }
-
-def send_telegram_notification(team_id: int, auth_code: str, telegram_username: str):
-    """Отправить код регистрации в Telegram"""
-    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    if not bot_token or not telegram_username:
-        return
-    
-    import urllib.request
-    import urllib.parse
+    if not get_registration_open(cursor):
+        return responses.json_response(403, {
+            'error': 'Registration closed',
+            'message': 'Регистрация завершена. Удаление команд больше не доступно.'
+        })
     
-    username_clean = telegram_username.replace('@', '')
-    message = f"✅ Команда зарегистрирована!\n\n🔑 Код для редактирования: {auth_code}\n\nСохраните этот код для изменения данных команды."
+    auth_code = params.get('auth_code')
+    if auth_code:
+        db.execute(cursor, 'team_delete_by_auth_code', (team_id, normalize_auth_code(auth_code)))
+        if cursor.rowcount == 0:
+            return responses.json_response(404, {'error': 'Team not found'})
+    else:
+        db.execute(cursor, 'team_delete', (team_id,))
     
-    try:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        data = urllib.parse.urlencode({
-            'chat_id': f'@{username_clean}',
-            'text': message
-        }).encode()
-        
-        req = urllib.request.Request(url, data=data)
-        urllib.request.urlopen(req, timeout=5)
-    except:
-        pass
+    return responses.json_response(200, {'success': True})
@@ -0,0 +1,120 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2 import sql
+
+import metrics
+
+# auth_code не входит ни в одну проекцию: коды выдаются только поштучно по auth_code
+PUBLIC_FIELDS: Tuple[str, ...] = (
+    'id', 'team_name', 'captain_name', 'members_count', 'members_info', 'status',
+    'current_status', 'bracket_url', 'created_at',
+)
+PUBLIC_DEFAULT_FIELDS: Tuple[str, ...] = (
+    'id', 'team_name', 'captain_name', 'members_count', 'members_info', 'status', 'created_at',
+)
+ADMIN_FIELDS: Tuple[str, ...] = PUBLIC_FIELDS + (
+    'captain_telegram', 'admin_comment', 'updated_at', 'status_updated_at',
+)
+ADMIN_DEFAULT_FIELDS: Tuple[str, ...] = ADMIN_FIELDS
+
+TEAM_STATUSES = ('pending', 'approved', 'rejected')
+# Админка запрашивает ?status=all: без фильтра, как до появления параметра
+NO_STATUS_FILTER = ('', 'all')
+MAX_PAGE_SIZE = 500
+
+
+class ListingError(ValueError):
+    '''Некорректные параметры запроса списка команд'''
+
+
+def resolve_fields(view: str, fields_param: Optional[str]) -> List[str]:
+    '''Проекция по view и fields=; неизвестные или закрытые поля — ошибка'''
+    allowed = ADMIN_FIELDS if view == 'admin' else PUBLIC_FIELDS
+    defaults = ADMIN_DEFAULT_FIELDS if view == 'admin' else PUBLIC_DEFAULT_FIELDS
+    if not fields_param:
+        return list(defaults)
+
+    requested = [field.strip() for field in fields_param.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ListingError(f"Unknown or restricted fields: {', '.join(unknown)}")
+    # id и created_at нужны для курсора, поэтому всегда присутствуют
+    for required in ('created_at', 'id'):
+        if required not in requested:
+            requested.insert(0, required)
+    return requested
+
+
+def parse_limit(limit_param: Optional[str]) -> Optional[int]:
+    if limit_param is None or limit_param == '':
+        return None
+    try:
+        limit = int(limit_param)
+    except ValueError:
+        raise ListingError('limit must be an integer')
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ListingError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def encode_cursor(created_at: datetime, team_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{team_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor_param: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor_param + '=' * (-len(cursor_param) % 4)
+        created_at, team_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(team_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ListingError('Invalid cursor')
+
+
+def fetch_teams_page(
+    cursor,
+    fields: Sequence[str],
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    '''
+    Keyset-пагинация по (created_at, id) в порядке убывания.
+    Возвращает строки страницы и курсор следующей страницы (None, если это последняя).
+    '''
+    if status in NO_STATUS_FILTER:
+        status = None
+    if status is not None and status not in TEAM_STATUSES:
+        raise ListingError('Unknown status')
+
+    conditions = []
+    params: List[Any] = []
+    if status is not None:
+        conditions.append(sql.SQL("status = %s"))
+        params.append(status)
+    if after is not None:
+        conditions.append(sql.SQL("(created_at, id) < (%s, %s)"))
+        params.extend(after)
+
+    query = sql.SQL("SELECT {fields} FROM teams {where} ORDER BY created_at DESC, id DESC").format(
+        fields=sql.SQL(', ').join(sql.Identifier(field) for field in fields),
+        where=sql.SQL('WHERE ') + sql.SQL(' AND ').join(conditions) if conditions else sql.SQL(''),
+    )
+    if limit is not None:
+        # Одна лишняя строка показывает, есть ли следующая страница
+        query = query + sql.SQL(" LIMIT %s")
+        params.append(limit + 1)
+
+    # Кортежи вместо RealDictRow: имена колонок — это запрошенные поля
+    with cursor.connection.cursor(cursor_factory=metrics.TimedTupleCursor) as rows_cursor:
+        rows_cursor.execute(query, params)
+        rows = [dict(zip(fields, row)) for row in rows_cursor.fetchall()]
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['created_at'], last['id'])
+    return rows, next_cursor
@@ -0,0 +1,142 @@
+'''
+Лента матчей для зрителей: полный снимок сетки или только изменения после курсора.
+
+Курсор — "<версия matches>.<версия teams>" из table_versions (V0005, V0009). Каждая
+изменённая строка matches получает версию своей транзакции, поэтому изменения после курсора —
+это WHERE version > N по индексу. Если с тех пор удаляли матчи (пересоздание сетки) или менялись
+команды (названия в JOIN), вместо изменений отдаётся полный снимок.
+
+Полный снимок сериализуется один раз на пару версий и держится в памяти инстанса.
+Long-poll (wait=<секунды>) ждёт NOTIFY matches_changed на том же соединении.
+'''
+import os
+import select
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import db
+import metrics
+import responses
+
+LONG_POLL_MAX = float(os.environ.get('MATCHES_LONG_POLL_MAX', '25'))
+NOTIFY_CHANNEL = 'matches_changed'
+
+Cursor = Tuple[int, int]
+
+_snapshot: Dict[str, Any] = {'key': None, 'body': None}
+
+
+class FeedError(ValueError):
+    '''Некорректные параметры ленты'''
+
+
+def parse_cursor(value: Optional[str]) -> Optional[Cursor]:
+    if not value:
+        return None
+    try:
+        matches_version, teams_version = value.split('.')
+        return int(matches_version), int(teams_version)
+    except ValueError:
+        raise FeedError('Invalid since cursor')
+
+
+def format_cursor(versions: Dict[str, int]) -> str:
+    return f"{versions['matches']}.{versions['teams']}"
+
+
+def parse_wait(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        wait = float(value)
+    except ValueError:
+        raise FeedError('wait must be a number of seconds')
+    return max(0.0, min(wait, LONG_POLL_MAX))
+
+
+def current_versions(cursor) -> Dict[str, int]:
+    db.execute(cursor, 'feed_versions')
+    versions = {'matches': 0, 'matches_reset': 0, 'teams': 0}
+    versions.update({row['table_name']: row['version'] for row in cursor.fetchall()})
+    return versions
+
+
+def needs_snapshot(since: Optional[Cursor], versions: Dict[str, int]) -> bool:
+    if since is None:
+        return True
+    matches_version, teams_version = since
+    return (
+        teams_version != versions['teams']
+        or matches_version < versions['matches_reset']
+        or matches_version > versions['matches']
+    )
+
+
+def snapshot_body(cursor, versions: Dict[str, int]) -> str:
+    '''Полная сетка; JOIN выполняется только при смене версии matches или teams'''
+    key = (versions['matches'], versions['teams'])
+    if _snapshot['key'] != key:
+        with cursor.connection.cursor(cursor_factory=metrics.TimedTupleCursor) as rows_cursor:
+            db.execute(rows_cursor, 'matches_list')
+            matches = responses.fetch_dicts(rows_cursor)
+        with metrics.stage('serialize'):
+            body = responses.dumps({
+                'success': True,
+                'full': True,
+                'cursor': format_cursor(versions),
+                'matches': matches
+            })
+        _snapshot.update(key=key, body=body)
+    return _snapshot['body']
+
+
+def changes_body(cursor, since: Cursor, versions: Dict[str, int]) -> str:
+    matches = []
+    if since[0] < versions['matches']:
+        db.execute(cursor, 'matches_changed_since', (since[0],))
+        matches = cursor.fetchall()
+    return responses.dumps({
+        'success': True,
+        'full': False,
+        'cursor': format_cursor(versions),
+        'matches': matches
+    })
+
+
+def wait_for_change(cursor, since: Cursor, timeout: float) -> Dict[str, int]:
+    '''Ждать изменения после курсора не дольше timeout; возвращает актуальные версии'''
+    conn = cursor.connection
+    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+    try:
+        # Проверка после LISTEN: коммит между ними не потеряется
+        versions = current_versions(cursor)
+        deadline = time.monotonic() + timeout
+        while not needs_snapshot(since, versions) and since[0] >= versions['matches']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Ожидание — отдельный этап, чтобы не искажать время обработки
+            with metrics.stage('long_poll'):
+                ready = select.select([conn], [], [], remaining)
+            if ready == ([], [], []):
+                break
+            conn.poll()
+            if conn.notifies:
+                conn.notifies.clear()
+                versions = current_versions(cursor)
+        return versions
+    finally:
+        cursor.execute(f"UNLISTEN {NOTIFY_CHANNEL}")
+        conn.notifies.clear()
+
+
+def read(cursor, since: Optional[Cursor], wait: float = 0.0) -> Tuple[str, Dict[str, int]]:
+    '''Тело ответа и версии, по которым оно построено'''
+    if since is not None and wait > 0:
+        versions = wait_for_change(cursor, since, wait)
+    else:
+        versions = current_versions(cursor)
+
+    if needs_snapshot(since, versions):
+        return snapshot_body(cursor, versions), versions
+    return changes_body(cursor, since, versions), versions
@@ -0,0 +1,62 @@
+'''
+Разбор members_info: фронтенд хранит состав строками вида
+"Топ: Ник - Телеграм: @username", по одной строке на игрока (5–7 строк).
+
+Та же разбивка хранится в team_members (V0010, заполняется триггерами на teams):
+по ней ищутся игроки и проверяется, не заявлен ли игрок уже в другой команде.
+'''
+from typing import Any, Dict, List, Optional
+
+import db
+
+TELEGRAM_SEPARATOR = ' - Телеграм:'
+# Ограничение teams_members_count_check (V0003)
+MIN_MEMBERS = 5
+MAX_MEMBERS = 7
+MAX_SEARCH_RESULTS = 50
+
+
+def parse_member_line(line: str) -> Dict[str, Optional[str]]:
+    player, _, telegram = line.partition(TELEGRAM_SEPARATOR)
+    role, separator, player_name = player.partition(':')
+    if not separator:
+        role, player_name = '', player
+    return {
+        'role': role.strip(),
+        'player_name': player_name.strip(),
+        'telegram': telegram.strip() or None,
+    }
+
+
+def parse_members_info(members_info: Optional[str]) -> List[Dict[str, Optional[str]]]:
+    '''Игроки по порядку строк; пустые строки пропускаются'''
+    if not members_info:
+        return []
+    return [parse_member_line(line) for line in members_info.split('\n') if line.strip()]
+
+
+def normalize_telegram(telegram: Optional[str]) -> Optional[str]:
+    '''@User -> user, как normalize_telegram() в БД'''
+    value = (telegram or '').strip().lstrip('@').lower()
+    return value or None
+
+
+def find_roster_conflicts(cursor, members_info: Optional[str], exclude_team_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    '''Игроки состава, уже заявленные в других (не отклонённых) командах'''
+    telegrams = sorted({
+        normalized
+        for player in parse_members_info(members_info)
+        for normalized in [normalize_telegram(player['telegram'])]
+        if normalized
+    })
+    if not telegrams:
+        return []
+    db.execute(cursor, 'roster_conflicts', (telegrams, exclude_team_id or 0))
+    return cursor.fetchall()
+
+
+def search_players(cursor, query: str, limit: int = MAX_SEARCH_RESULTS) -> List[Dict[str, Any]]:
+    '''Игроки, у которых ник или telegram начинается с query'''
+    prefix = (normalize_telegram(query) or '').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    db.execute(cursor, 'players_search', (prefix + '%', min(limit, MAX_SEARCH_RESULTS)))
+    return cursor.fetchall()
@@ -0,0 +1,222 @@
+'''
+Метрики задержек teams-api: время запроса по маршрутам и разбивка по этапам
+(подключение к БД, запросы, сериализация JSON, Telegram).
+
+Гистограммы с фиксированными логарифмическими корзинами: запись — bisect и инкремент,
+память не растёт с числом запросов. Перцентили оцениваются по границам корзин
+(погрешность не больше шага корзины, ~12%). Метрики живут в памяти инстанса функции
+и отдаются через GET ?resource=metrics.
+'''
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from psycopg2.extensions import cursor as TupleCursor
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger('metrics')
+
+SLOW_QUERY_MS = float(os.environ.get('METRICS_SLOW_QUERY_MS', '200'))
+
+# 0.05 мс … ~90 с, шаг 12%
+BUCKET_BOUNDS: List[float] = []
+_bound = 0.05
+while _bound < 90_000:
+    BUCKET_BOUNDS.append(round(_bound, 4))
+    _bound *= 1.12
+
+# Неизвестные resource схлопываются, чтобы число гистограмм было ограничено
+KNOWN_RESOURCES = (
+    'teams', 'settings', 'auth', 'matches', 'bracket', 'match', 'export', 'import', 'players',
+    'pending_actions', 'metrics', 'stats', 'status', 'updates',
+)
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max, 3),
+        }
+
+
+class _Request:
+    __slots__ = ('route', 'stages', 'status')
+
+    def __init__(self, route: str) -> None:
+        self.route = route
+        self.stages: Dict[str, float] = {}
+        self.status = 200
+
+
+_lock = threading.Lock()
+_routes: Dict[str, Dict[str, Histogram]] = {}
+_stages: Dict[str, Histogram] = {}
+_errors: Dict[str, int] = {}
+_slow_queries = 0
+_started_at = time.time()
+_local = threading.local()
+
+
+def route_name(method: str, resource: Optional[str]) -> str:
+    resource = resource or 'teams'
+    return f"{method} {resource if resource in KNOWN_RESOURCES else 'other'}"
+
+
+@contextmanager
+def request(method: str, resource: Optional[str]) -> Iterator[_Request]:
+    '''Обёртка запроса: общее время и суммы этапов пишутся в гистограммы маршрута'''
+    current = _Request(route_name(method, resource))
+    _local.request = current
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.status = 500
+        raise
+    finally:
+        _local.request = None
+        _record_request(current, (time.perf_counter() - started) * 1000)
+
+
+def set_resource(resource: Optional[str]) -> None:
+    '''Уточнить маршрут, когда resource пришёл в теле POST/PUT'''
+    current = getattr(_local, 'request', None)
+    if current is not None and resource:
+        current.route = route_name(current.route.split(' ', 1)[0], resource)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, (time.perf_counter() - started) * 1000)
+
+
+def add_stage(name: str, elapsed_ms: float) -> None:
+    current = getattr(_local, 'request', None)
+    if current is not None:
+        current.stages[name] = current.stages.get(name, 0.0) + elapsed_ms
+    else:
+        # Вне запроса (скрипты, бенчмарки) — сразу в общую гистограмму этапа
+        with _lock:
+            _stages.setdefault(name, Histogram()).record(elapsed_ms)
+
+
+def _record_request(current: _Request, total_ms: float) -> None:
+    accounted = sum(current.stages.values())
+    with _lock:
+        histograms = _routes.setdefault(current.route, {})
+        histograms.setdefault('total', Histogram()).record(total_ms)
+        for name, elapsed_ms in current.stages.items():
+            histograms.setdefault(name, Histogram()).record(elapsed_ms)
+            _stages.setdefault(name, Histogram()).record(elapsed_ms)
+        # Остальное — код обработчиков: валидация, формирование ответа
+        histograms.setdefault('other', Histogram()).record(max(total_ms - accounted, 0.0))
+        if current.status >= 500:
+            _errors[current.route] = _errors.get(current.route, 0) + 1
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            'uptime_s': round(time.time() - _started_at, 1),
+            'slow_queries': _slow_queries,
+            'slow_query_threshold_ms': SLOW_QUERY_MS,
+            'routes': {
+                route: {
+                    **histograms['total'].summary(),
+                    'errors': _errors.get(route, 0),
+                    'stages': {
+                        name: histogram.summary()
+                        for name, histogram in histograms.items() if name != 'total'
+                    },
+                }
+                for route, histograms in sorted(_routes.items())
+            },
+            'stages': {name: histogram.summary() for name, histogram in sorted(_stages.items())},
+        }
+
+
+def _record_query(cursor, query: Any, elapsed_ms: float) -> None:
+    global _slow_queries
+    add_stage('db', elapsed_ms)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        with _lock:
+            _slow_queries += 1
+        if hasattr(query, 'as_string'):
+            query = query.as_string(cursor)
+        text = query.decode(errors='replace') if isinstance(query, bytes) else str(query)
+        if text.startswith('EXECUTE '):
+            # Для prepared statement достаточно имени — параметры могут содержать личные данные
+            text = text.split('(', 1)[0]
+        logger.warning('Slow query %.1f ms: %s', elapsed_ms, ' '.join(text.split())[:300])
+
+
+class _Timed:
+    '''Пишет время каждого запроса в этап db и логирует медленные'''
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record_query(self, query, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_query(self, query, (time.perf_counter() - started) * 1000)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _record_query(self, sql, (time.perf_counter() - started) * 1000)
+
+
+class TimedCursor(_Timed, RealDictCursor):
+    pass
+
+
+class TimedTupleCursor(_Timed, TupleCursor):
+    '''Строки — кортежи: для больших выборок, которые сразу сериализуются (см. responses.fetch_dicts)'''
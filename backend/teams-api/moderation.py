@@ -0,0 +1,92 @@
+'''
+Пакетная модерация: смена статусов многих команд одним UPDATE ... FROM (VALUES ...)
+в одной транзакции и одна пачка уведомлений капитанам в outbox.
+'''
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+import outbox
+from listing import TEAM_STATUSES
+
+MAX_BATCH_SIZE = int(os.environ.get('MODERATION_MAX_BATCH', '500'))
+
+# Уведомляем только о решении модератора
+NOTIFY_STATUSES = ('approved', 'rejected')
+
+Update = Tuple[int, str, Optional[str]]
+
+
+class ModerationError(ValueError):
+    '''Запрос целиком некорректен'''
+
+
+def parse_updates(items: Any) -> Tuple[List[Update], List[Dict[str, Any]]]:
+    '''Разобрать список {id, status, admin_comment}; возвращает валидные обновления и ошибки по id'''
+    if not isinstance(items, list) or not items:
+        raise ModerationError('updates must be a non-empty list')
+    if len(items) > MAX_BATCH_SIZE:
+        raise ModerationError(f'At most {MAX_BATCH_SIZE} updates per request')
+
+    updates: List[Update] = []
+    errors: List[Dict[str, Any]] = []
+    seen = set()
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        team_id = item.get('id')
+        if not isinstance(team_id, int) or isinstance(team_id, bool):
+            errors.append({'id': team_id, 'success': False, 'error': 'Invalid id'})
+        elif team_id in seen:
+            errors.append({'id': team_id, 'success': False, 'error': 'Duplicate id'})
+        elif item.get('status') not in TEAM_STATUSES:
+            errors.append({'id': team_id, 'success': False, 'error': 'Unknown status'})
+        else:
+            seen.add(team_id)
+            comment = item.get('admin_comment')
+            updates.append((team_id, item['status'], None if comment is None else str(comment)))
+    return updates, errors
+
+
+def status_message(team_name: str, status: str, admin_comment: Optional[str]) -> str:
+    if status == 'approved':
+        message = f"✅ Команда «{team_name}» одобрена и допущена к турниру!"
+    else:
+        message = f"❌ Команда «{team_name}» отклонена."
+    if admin_comment:
+        message += f"\n\nКомментарий: {admin_comment}"
+    return message
+
+
+def apply(cursor, updates: List[Update]) -> List[Dict[str, Any]]:
+    '''Применить обновления и поставить уведомления; вызывается внутри транзакции'''
+    if not updates:
+        return []
+
+    # prev — та же строка до обновления: уведомляем только если статус действительно сменился
+    rows = execute_values(cursor, """
+        UPDATE teams t
+        SET status = v.status,
+            admin_comment = COALESCE(v.admin_comment, t.admin_comment),
+            status_updated_at = NOW()
+        FROM (VALUES %s) AS v(id, status, admin_comment), teams prev
+        WHERE t.id = v.id AND prev.id = v.id
+        RETURNING t.id, t.team_name, t.captain_telegram, t.status, t.admin_comment, prev.status AS previous_status
+    """, updates, template='(%s::int, %s, %s::text)', page_size=len(updates), fetch=True)
+
+    updated = {row['id']: row for row in rows}
+    notifications = [
+        (row['id'], row['captain_telegram'], status_message(row['team_name'], row['status'], row['admin_comment']))
+        for row in rows
+        if row['captain_telegram'] and row['status'] != row['previous_status'] and row['status'] in NOTIFY_STATUSES
+    ]
+    outbox.enqueue_many(cursor, notifications)
+    notified = {team_id for team_id, _, _ in notifications}
+
+    results = []
+    for team_id, status, _ in updates:
+        if team_id in updated:
+            results.append({'id': team_id, 'success': True, 'status': status, 'notified': team_id in notified})
+        else:
+            results.append({'id': team_id, 'success': False, 'error': 'Team not found'})
+    return results
@@ -0,0 +1,40 @@
+'''
+Outbox уведомлений Telegram.
+
+handle_post кладёт сообщение в notification_outbox в той же транзакции, что и INSERT команды,
+а отправляет его фоновый поток VPS-бота (telegram-bot-vps/outbox_worker.py) с ретраями.
+Так время регистрации не зависит от доступности Telegram API.
+
+В очередь пишется username капитана без @: chat_id бот найдёт в telegram_users при отправке.
+'''
+from typing import List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+import db
+
+
+def registration_message(auth_code: str) -> str:
+    return (
+        f"✅ Команда зарегистрирована!\n\n🔑 Код для редактирования: {auth_code}\n\n"
+        "Сохраните этот код для изменения данных команды."
+    )
+
+
+def recipient(telegram_username: str) -> str:
+    return telegram_username.strip().lstrip('@')
+
+
+def enqueue(cursor, team_id: Optional[int], telegram_username: str, message: str) -> None:
+    '''Поставить сообщение в очередь; вызывается внутри транзакции записи команды'''
+    db.execute(cursor, 'outbox_insert', (team_id, recipient(telegram_username), message))
+
+
+def enqueue_many(cursor, messages: List[Tuple[Optional[int], str, str]]) -> None:
+    '''То же для пачки (team_id, telegram_username, message) — один INSERT'''
+    if not messages:
+        return
+    execute_values(cursor, "INSERT INTO notification_outbox (team_id, telegram_username, message) VALUES %s", [
+        (team_id, recipient(telegram_username), message)
+        for team_id, telegram_username, message in messages
+    ], page_size=len(messages))
@@ -0,0 +1,145 @@
+'''
+Очередь правок команд на подтверждение (таблица pending_actions).
+
+Когда регистрация закрыта, handle_put не применяет правку состава, а ставит её в очередь.
+На команду хранится одна ожидающая правка: повторная отправка перезаписывает её (V0011).
+Админ подтверждает или отклоняет правки пачкой; просроченные (expires_at) переводит
+в 'expired' сборщик — python pending_actions.py.
+'''
+import os
+import sys
+import time
+import logging
+from typing import Any, Dict, List
+
+from psycopg2.extras import Json, execute_values
+
+import db
+from members import MAX_MEMBERS, MIN_MEMBERS, parse_members_info
+
+logger = logging.getLogger('pending_actions')
+
+ACTION_TTL_HOURS = float(os.environ.get('PENDING_ACTION_TTL_HOURS', '24'))
+MAX_BATCH_SIZE = int(os.environ.get('PENDING_ACTIONS_MAX_BATCH', '500'))
+SWEEP_BATCH_SIZE = int(os.environ.get('PENDING_SWEEP_BATCH_SIZE', '1000'))
+SWEEP_INTERVAL = float(os.environ.get('PENDING_SWEEP_INTERVAL', '60'))
+
+UPDATE_FIELDS = ('team_name', 'captain_name', 'captain_telegram', 'members_info')
+
+
+class PendingActionError(ValueError):
+    '''Некорректный запрос к очереди'''
+
+
+def submit_update(cursor, team_id: Any, data: Dict[str, Any]) -> Dict[str, Any]:
+    '''Поставить правку команды в очередь; возвращает {id, replaced}'''
+    action_data = {field: data.get(field) for field in UPDATE_FIELDS}
+    db.execute(cursor, 'pending_action_upsert', (team_id, 'update', Json(action_data), ACTION_TTL_HOURS))
+    row = cursor.fetchone()
+    return {'id': row['id'], 'replaced': row['replaced']}
+
+
+def parse_ids(value: Any, field: str) -> List[int]:
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        raise PendingActionError(f'{field} must be a list of action ids')
+    return list(dict.fromkeys(value))
+
+
+def resolve(cursor, approve_ids: List[int], reject_ids: List[int]) -> List[Dict[str, Any]]:
+    '''Подтвердить и отклонить правки; вызывается внутри транзакции. Результат по каждому id'''
+    if not approve_ids and not reject_ids:
+        raise PendingActionError('Nothing to approve or reject')
+    if len(approve_ids) + len(reject_ids) > MAX_BATCH_SIZE:
+        raise PendingActionError(f'At most {MAX_BATCH_SIZE} actions per request')
+    if set(approve_ids) & set(reject_ids):
+        raise PendingActionError('An action cannot be approved and rejected at once')
+
+    requested = approve_ids + reject_ids
+    db.execute(cursor, 'pending_actions_claim', (requested,))
+    claimed = {row['id']: row for row in cursor.fetchall()}
+
+    results: Dict[int, Dict[str, Any]] = {}
+    updates = []
+    approved: List[int] = []
+    expired: List[int] = []
+    for action_id in requested:
+        row = claimed.get(action_id)
+        if row is None:
+            results[action_id] = {'id': action_id, 'success': False, 'error': 'Action not found or already resolved'}
+        elif row['expired']:
+            expired.append(action_id)
+            results[action_id] = {'id': action_id, 'success': False, 'error': 'Action expired'}
+        elif action_id in reject_ids:
+            results[action_id] = {'id': action_id, 'success': True, 'status': 'rejected'}
+        elif row['action_type'] != 'update':
+            results[action_id] = {'id': action_id, 'success': False, 'error': 'Unsupported action type'}
+        else:
+            data = row['action_data'] or {}
+            members_count = len(parse_members_info(data.get('members_info')))
+            if not MIN_MEMBERS <= members_count <= MAX_MEMBERS:
+                results[action_id] = {
+                    'id': action_id, 'success': False,
+                    'error': f'Team must have {MIN_MEMBERS}-{MAX_MEMBERS} members, got {members_count}'
+                }
+                continue
+            updates.append((row['team_id'], data.get('team_name'), data.get('captain_name'),
+                            data.get('captain_telegram'), members_count, data.get('members_info')))
+            approved.append(action_id)
+            results[action_id] = {'id': action_id, 'success': True, 'status': 'approved', 'team_id': row['team_id']}
+
+    if updates:
+        # Правки разных команд — одним UPDATE; пустые поля правки не затирают текущие значения
+        execute_values(cursor, """
+            UPDATE teams t
+            SET team_name = COALESCE(v.team_name, t.team_name),
+                captain_name = COALESCE(v.captain_name, t.captain_name),
+                captain_telegram = COALESCE(v.captain_telegram, t.captain_telegram),
+                members_count = v.members_count,
+                members_info = v.members_info,
+                updated_at = NOW()
+            FROM (VALUES %s) AS v(team_id, team_name, captain_name, captain_telegram, members_count, members_info)
+            WHERE t.id = v.team_id
+        """, updates, template='(%s::int, %s, %s, %s, %s::int, %s)', page_size=len(updates))
+
+    rejected = [action_id for action_id in reject_ids if results[action_id]['success']]
+    for status, ids in (('approved', approved), ('rejected', rejected), ('expired', expired)):
+        if ids:
+            db.execute(cursor, 'pending_actions_resolve', (status, ids))
+    return [results[action_id] for action_id in requested]
+
+
+def expire(cursor, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    '''Перевести просроченные правки в expired; возвращает число строк'''
+    db.execute(cursor, 'pending_actions_expire', (batch_size,))
+    return cursor.rowcount
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL must be configured')
+
+    while True:
+        conn = db.get_connection(dsn)
+        try:
+            cursor = conn.cursor()
+            expired = expire(cursor)
+            cursor.close()
+        except Exception:
+            logger.exception('Pending actions sweep failed')
+            expired = 0
+        finally:
+            db.release_connection(conn)
+
+        if expired:
+            logger.info('Expired %d pending actions', expired)
+        # Полная пачка — просроченных может быть больше, продолжаем сразу
+        if expired < SWEEP_BATCH_SIZE:
+            time.sleep(SWEEP_INTERVAL)
+
+
+if __name__ == '__main__':
+    main()
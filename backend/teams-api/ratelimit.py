@@ -0,0 +1,162 @@
+'''
+Ограничение частоты регистраций и поиска по auth_code.
+
+Скользящее окно в виде двух счётчиков: текущее окно плюс доля предыдущего, пропорциональная
+непрошедшей части окна. Проверка в два слоя:
+  - в памяти инстанса — до подключения к БД: поток с одного адреса отсекается, не занимая
+    соединение, а ключи, уже заблокированные общим счётчиком, помнятся до конца блокировки;
+  - общий счётчик в UNLOGGED-таблице rate_limits (V0012) — один запрос на все ключи, видит
+    обращения ко всем инстансам функции.
+
+Лимиты задаются переменными окружения вида "10/3600" (запросов / секунд).
+'''
+import os
+import math
+import time
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import db
+
+
+def _parse_rule(value: str) -> Tuple[int, int]:
+    limit, window = value.split('/')
+    return int(limit), int(window)
+
+
+RULES: Dict[str, Tuple[int, int]] = {
+    'register_ip': _parse_rule(os.environ.get('RATE_LIMIT_REGISTER_IP', '10/3600')),
+    'register_telegram': _parse_rule(os.environ.get('RATE_LIMIT_REGISTER_TELEGRAM', '3/3600')),
+    'auth_code_ip': _parse_rule(os.environ.get('RATE_LIMIT_AUTH_CODE_IP', '20/600')),
+}
+ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+LOCAL_MAX_KEYS = int(os.environ.get('RATE_LIMIT_LOCAL_KEYS', '10000'))
+# Доля проверок, после которых из rate_limits удаляются отжившие окна
+PURGE_CHANCE = float(os.environ.get('RATE_LIMIT_PURGE_CHANCE', '0.01'))
+
+Key = Tuple[str, str]
+
+
+class _Window:
+    __slots__ = ('start', 'current', 'previous')
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.current = 0
+        self.previous = 0
+
+
+class LocalLimiter:
+    '''Счётчики инстанса; число ключей ограничено, вытесняются давно не встречавшиеся'''
+
+    def __init__(self, max_keys: int = LOCAL_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._windows: 'OrderedDict[Key, _Window]' = OrderedDict()
+        self._blocked: Dict[Key, float] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: Key, now: Optional[float] = None) -> Optional[int]:
+        '''Учесть обращение; возвращает Retry-After в секундах, если лимит превышен'''
+        limit, window = RULES[key[0]]
+        now = time.time() if now is None else now
+        start = int(now // window * window)
+        with self._lock:
+            blocked_until = self._blocked.get(key)
+            if blocked_until is not None:
+                if blocked_until > now:
+                    return math.ceil(blocked_until - now)
+                del self._blocked[key]
+
+            state = self._windows.get(key)
+            if state is None:
+                state = self._windows[key] = _Window(start)
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+                if state.start != start:
+                    state.previous = state.current if start - state.start == window else 0
+                    state.current = 0
+                    state.start = start
+
+            if weighted_hits(state.current + 1, state.previous, now - start, window) > limit:
+                return retry_after(now, start, window)
+            state.current += 1
+            return None
+
+    def block(self, key: Key, seconds: int, now: Optional[float] = None) -> None:
+        '''Запомнить блокировку от общего счётчика: следующие запросы не дойдут до БД'''
+        now = time.time() if now is None else now
+        with self._lock:
+            if len(self._blocked) >= self.max_keys:
+                self._blocked = {k: until for k, until in self._blocked.items() if until > now}
+            self._blocked[key] = now + seconds
+
+
+def weighted_hits(current: float, previous: float, elapsed: float, window: int) -> float:
+    return current + previous * (1 - elapsed / window)
+
+
+def retry_after(now: float, window_start: float, window: int) -> int:
+    return max(1, math.ceil(window_start + window - now))
+
+
+local = LocalLimiter()
+
+
+def client_ip(event: Dict[str, Any]) -> str:
+    '''Адрес клиента из контекста API Gateway; заголовки — только вне шлюза (локальный запуск)'''
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    if identity.get('sourceIp'):
+        return identity['sourceIp']
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    forwarded = headers.get('x-forwarded-for') or headers.get('x-real-ip') or ''
+    return forwarded.split(',')[0].strip() or 'unknown'
+
+
+def request_keys(event: Dict[str, Any], method: str, params: Dict[str, Any],
+                 data: Optional[Dict[str, Any]]) -> List[Key]:
+    '''Ключи лимитов запроса; пустой список — запрос не ограничивается'''
+    if not ENABLED:
+        return []
+    if method == 'GET' and params.get('auth_code') and not params.get('resource'):
+        return [('auth_code_ip', client_ip(event))]
+    if method == 'POST' and data is not None and not data.get('resource'):
+        keys = [('register_ip', client_ip(event))]
+        telegram = (data.get('captain_telegram') or '').strip().lstrip('@').lower()
+        if telegram:
+            keys.append(('register_telegram', telegram))
+        return keys
+    return []
+
+
+def check_local(keys: List[Key]) -> Optional[int]:
+    '''Проверка до подключения к БД; Retry-After или None'''
+    for key in keys:
+        wait = local.hit(key)
+        if wait is not None:
+            return wait
+    return None
+
+
+def check_shared(cursor, keys: List[Key]) -> Optional[int]:
+    '''Общий счётчик всех инстансов; превышение запоминается локально'''
+    rules = [RULES[rule] for rule, _ in keys]
+    db.execute(cursor, 'rate_limit_hit', (
+        [f'{rule}:{value}' for rule, value in keys],
+        [window for _, window in rules],
+    ))
+    rows = {row['bucket']: row for row in cursor.fetchall()}
+    if random.random() < PURGE_CHANCE:
+        db.execute(cursor, 'rate_limits_purge')
+
+    wait = None
+    for key, (limit, _) in zip(keys, rules):
+        row = rows[f'{key[0]}:{key[1]}']
+        if row['weighted_hits'] > limit:
+            seconds = max(1, math.ceil(row['resets_in']))
+            local.block(key, seconds)
+            wait = max(wait or 0, seconds)
+    return wait
@@ -0,0 +1,60 @@
+'''
+Сборка JSON-ответов teams-api.
+
+orjson (если установлен) сериализует datetime, date и UUID без Python-обработчика и в разы
+быстрее json.dumps(default=str); без него — stdlib с тем же результатом: компактный JSON в UTF-8,
+даты в ISO 8601 (2024-05-01T12:30:00), Decimal строкой, как раньше.
+
+Для больших выборок (список команд, сетка) — tuple-курсор и fetch_dicts: имена колонок берутся
+из description каждого результата (после миграции SELECT * меняет набор колонок), строка
+собирается через dict(zip(...)), а не RealDictRow.
+'''
+import json
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Общие для всех ответов заголовки; словари не изменяются, поэтому разделяются между ответами
+JSON_HEADERS: Dict[str, str] = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+CORS_HEADERS: Dict[str, str] = {'Access-Control-Allow-Origin': '*'}
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    # Decimal и прочее — строкой, как прежний default=str
+    return str(value)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(payload: Any) -> str:
+        return orjson.dumps(payload, default=_default, option=_OPTIONS).decode()
+else:
+    def dumps(payload: Any) -> str:
+        return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def json_response(status: int, payload: Any) -> Dict[str, Any]:
+    return {
+        'statusCode': status,
+        'headers': JSON_HEADERS,
+        'isBase64Encoded': False,
+        'body': dumps(payload)
+    }
+
+
+def columns(cursor) -> Tuple[str, ...]:
+    '''Имена колонок текущего результата'''
+    return tuple(column.name for column in cursor.description)
+
+
+def fetch_dicts(cursor) -> List[Dict[str, Any]]:
+    '''Все строки tuple-курсора как обычные dict'''
+    names = columns(cursor)
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
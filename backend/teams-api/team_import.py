@@ -0,0 +1,217 @@
+'''
+Массовый импорт команд (переезд турнира с другой платформы).
+
+Строки проверяются в Python (обязательные поля, 5–7 игроков по V0003, статус), коды
+регистрации генерируются одним вызовом secrets, валидные строки загружаются через COPY
+во временную таблицу и переносятся в teams одним INSERT ... SELECT. Невалидные строки
+не мешают остальным и возвращаются в отчёте с номером строки.
+
+Из консоли: python team_import.py teams.csv [--notify] — CSV с заголовком
+team_name,captain_name,captain_telegram,members_info,status
+'''
+import io
+import os
+import csv
+import sys
+import json
+import secrets
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+import db
+import outbox
+from listing import TEAM_STATUSES
+from members import MAX_MEMBERS, MIN_MEMBERS, parse_members_info
+
+MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', '5000'))
+MAX_TEXT_LENGTH = 255
+
+COPY_COLUMNS = ('row_number', 'team_name', 'captain_name', 'captain_telegram', 'members_count',
+                'members_info', 'status', 'auth_code', 'auth_code_normalized')
+
+
+class TeamImportError(ValueError):
+    '''Запрос импорта целиком некорректен'''
+
+
+def check_rows(rows: Any) -> None:
+    if not isinstance(rows, list) or not rows:
+        raise TeamImportError('teams must be a non-empty list')
+    if len(rows) > MAX_ROWS:
+        raise TeamImportError(f'At most {MAX_ROWS} teams per request')
+
+
+def validate_row(row: Any) -> Tuple[Optional[Tuple[Any, ...]], List[str]]:
+    '''Проверить строку; возвращает (team_name, captain_name, captain_telegram, members_count, members_info, status) или ошибки'''
+    if not isinstance(row, dict):
+        return None, ['Row must be an object']
+
+    errors = []
+    values = {}
+    for field in ('team_name', 'captain_name', 'captain_telegram'):
+        value = row.get(field)
+        value = value.strip() if isinstance(value, str) else value
+        if value is not None and not isinstance(value, str):
+            errors.append(f'{field} must be a string')
+        elif value and len(value) > MAX_TEXT_LENGTH:
+            errors.append(f'{field} is longer than {MAX_TEXT_LENGTH} characters')
+        values[field] = value or None
+    for field in ('team_name', 'captain_name'):
+        if values[field] is None and f'{field} must be a string' not in errors:
+            errors.append(f'{field} is required')
+
+    members_info = row.get('members_info')
+    if isinstance(members_info, list):
+        members_info = '\n'.join(str(line) for line in members_info)
+    if members_info is not None and not isinstance(members_info, str):
+        errors.append('members_info must be a string or a list of lines')
+        members_info = None
+    members_count = len(parse_members_info(members_info))
+    if not MIN_MEMBERS <= members_count <= MAX_MEMBERS:
+        errors.append(f'Team must have {MIN_MEMBERS}-{MAX_MEMBERS} members, got {members_count}')
+
+    status = row.get('status') or 'pending'
+    if status not in TEAM_STATUSES:
+        errors.append('Unknown status')
+
+    if errors:
+        return None, errors
+    return (values['team_name'], values['captain_name'], values['captain_telegram'],
+            members_count, members_info, status), []
+
+
+def generate_auth_codes(count: int, taken: Sequence[str] = ()) -> List[str]:
+    '''Коды REG-XXXX-XXXX из одного вызова token_hex; уникальны в пачке и не совпадают с taken'''
+    used = set(taken)
+    codes: List[str] = []
+    while len(codes) < count:
+        missing = count - len(codes)
+        randomness = secrets.token_hex(4 * missing).upper()
+        for i in range(missing):
+            chunk = randomness[i * 8:(i + 1) * 8]
+            if chunk not in used:
+                used.add(chunk)
+                codes.append(f'REG-{chunk[:4]}-{chunk[4:]}')
+    return codes
+
+
+def normalize_code(auth_code: str) -> str:
+    return auth_code.replace('REG-', '').replace('-', '')
+
+
+def _copy_rows(cursor, rows: List[Tuple[Any, ...]]) -> None:
+    buffer = io.StringIO()
+    # Пустое поле без кавычек COPY читает как NULL
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY team_import ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def import_teams(cursor, rows: Sequence[Any], notify: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+    '''Импортировать строки; вызывается внутри транзакции. Отчёт: созданные команды и ошибки по строкам'''
+    valid: List[Tuple[int, Tuple[Any, ...]]] = []
+    errors: List[Dict[str, Any]] = []
+    for row_number, row in enumerate(rows, start=1):
+        values, row_errors = validate_row(row)
+        if row_errors:
+            errors.append({'row': row_number, 'errors': row_errors})
+        else:
+            valid.append((row_number, values))
+
+    report: Dict[str, Any] = {'valid': len(valid), 'imported': 0, 'teams': [], 'errors': errors}
+    if dry_run or not valid:
+        return report
+
+    cursor.execute("""
+        CREATE TEMP TABLE team_import (
+            row_number INTEGER NOT NULL,
+            team_name VARCHAR(255) NOT NULL,
+            captain_name VARCHAR(255) NOT NULL,
+            captain_telegram VARCHAR(255),
+            members_count INTEGER NOT NULL,
+            members_info TEXT,
+            status VARCHAR(50) NOT NULL,
+            auth_code VARCHAR(20) NOT NULL,
+            auth_code_normalized VARCHAR(20) NOT NULL
+        ) ON COMMIT DROP
+    """)
+    codes = generate_auth_codes(len(valid))
+    _copy_rows(cursor, [
+        (row_number, *values, code, normalize_code(code))
+        for (row_number, values), code in zip(valid, codes)
+    ])
+
+    # Совпадения с уже выданными кодами практически невозможны, но код обязан находить одну команду
+    cursor.execute("""
+        SELECT i.row_number FROM team_import i
+        JOIN teams t ON t.auth_code_normalized = i.auth_code_normalized
+    """)
+    clashes = [row['row_number'] for row in cursor.fetchall()]
+    if clashes:
+        replacements = generate_auth_codes(len(clashes), taken=[normalize_code(code) for code in codes])
+        cursor.executemany(
+            "UPDATE team_import SET auth_code = %s, auth_code_normalized = %s WHERE row_number = %s",
+            [(code, normalize_code(code), row_number)
+             for code, row_number in zip(replacements, clashes)]
+        )
+
+    cursor.execute("""
+        WITH inserted AS (
+            INSERT INTO teams (team_name, captain_name, captain_telegram, members_count, members_info,
+                               status, auth_code)
+            SELECT team_name, captain_name, captain_telegram, members_count, members_info,
+                   status, auth_code
+            FROM team_import
+            ORDER BY row_number
+            RETURNING id, auth_code_normalized
+        )
+        SELECT i.row_number, inserted.id, i.auth_code, i.captain_telegram
+        FROM inserted JOIN team_import i USING (auth_code_normalized)
+        ORDER BY i.row_number
+    """)
+    created = cursor.fetchall()
+
+    if notify:
+        outbox.enqueue_many(cursor, [
+            (team['id'], team['captain_telegram'], outbox.registration_message(team['auth_code']))
+            for team in created
+            if team['captain_telegram']
+        ])
+
+    report['imported'] = len(created)
+    report['teams'] = [
+        {'row': team['row_number'], 'team_id': team['id'], 'auth_code': team['auth_code']}
+        for team in created
+    ]
+    return report
+
+
+def main() -> None:
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) != 1:
+        sys.exit('Usage: python team_import.py <teams.csv> [--notify] [--dry-run]')
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL not configured')
+
+    with open(args[0], newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+
+    conn = db.get_connection(dsn)
+    try:
+        with db.transaction(conn):
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            report = import_teams(cursor, rows, notify='--notify' in sys.argv, dry_run='--dry-run' in sys.argv)
+            cursor.close()
+    finally:
+        db.release_connection(conn)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
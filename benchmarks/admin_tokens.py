@@ -0,0 +1,45 @@
+'''
+Бенчмарк проверки админского доступа (backend/teams-api/auth.py): токенов в секунду против
+проверки пароля на каждый запрос (scrypt с текущими параметрами и прежний несолёный sha256).
+
+Запуск: python benchmarks/admin_tokens.py [секунд на замер, по умолчанию 1]
+'''
+import os
+import sys
+import time
+import hashlib
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'teams-api'))
+os.environ.setdefault('AUTH_TOKEN_SECRET', 'bench-secret')
+
+import auth  # noqa: E402
+
+
+def rate(func: Callable[[], object], seconds: float) -> float:
+    '''Вызовов в секунду'''
+    func()
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        func()
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    token = auth.issue_token('@admin', True)
+    password_hash = auth.hash_password('correct horse')
+    legacy_hash = hashlib.sha256(b'correct horse').hexdigest()
+    assert auth.verify_token(token) and auth.verify_password('correct horse', password_hash)[0]
+
+    print(f'scrypt n={auth.SCRYPT_N} r={auth.SCRYPT_R} p={auth.SCRYPT_P}')
+    print(f"  verify_token:          {rate(lambda: auth.verify_token(token), seconds):>12,.0f} /s")
+    print(f"  issue_token:           {rate(lambda: auth.issue_token('@admin', True), seconds):>12,.0f} /s")
+    print(f"  verify_password scrypt:{rate(lambda: auth.verify_password('correct horse', password_hash), seconds):>12,.1f} /s")
+    print(f"  legacy sha256:         {rate(lambda: auth.verify_password('correct horse', legacy_hash), seconds):>12,.0f} /s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+'''
+Бенчмарк поиска команды по коду регистрации: старый скан с REPLACE/UPPER
+против индекса по auth_code_normalized (V0004, индекс — V0015).
+
+Запуск: BENCH_DATABASE_URL=postgresql://... python benchmarks/auth_code_lookup.py [1000 100000 1000000]
+Таблицы создаются во временной схеме bench_auth_code и удаляются после прогона.
+'''
+import os
+import sys
+import time
+import random
+import statistics
+from typing import List
+
+import psycopg2
+
+SCHEMA = 'bench_auth_code'
+LOOKUPS = int(os.environ.get('BENCH_LOOKUPS', '200'))
+
+LEGACY_QUERY = f"""
+    SELECT * FROM {SCHEMA}.teams
+    WHERE REPLACE(REPLACE(REPLACE(UPPER(auth_code), 'REG', ''), '-', ''), ' ', '') = %s
+"""
+INDEXED_QUERY = f"SELECT * FROM {SCHEMA}.teams WHERE auth_code_normalized = %s"
+
+
+def seed(cursor, size: int) -> None:
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(f"""
+        CREATE TABLE {SCHEMA}.teams (
+            id SERIAL PRIMARY KEY,
+            team_name VARCHAR(255) NOT NULL,
+            members_info TEXT,
+            auth_code VARCHAR(20) NOT NULL,
+            auth_code_normalized VARCHAR(20)
+        )
+    """)
+    # Коды вида REG-XXXX-XXXX, как генерирует handle_post
+    cursor.execute(f"""
+        INSERT INTO {SCHEMA}.teams (team_name, members_info, auth_code)
+        SELECT 'Team ' || g,
+               'Топ: player' || g || ' - Телеграм: tg' || g,
+               'REG-' || UPPER(SUBSTRING(md5(g::text) FROM 1 FOR 4)) || '-' || UPPER(SUBSTRING(md5(g::text) FROM 5 FOR 4))
+        FROM generate_series(1, %s) AS g
+    """, (size,))
+    with open(os.path.join(os.path.dirname(__file__), '..', 'db_migrations', 'V0004__add_auth_code_normalized.sql')) as f:
+        cursor.execute(f"SET search_path = {SCHEMA}")
+        cursor.execute(f.read())
+        cursor.execute("RESET search_path")
+    # В V0015 индекс строится CONCURRENTLY; здесь таблица временная, хватит обычного построения
+    cursor.execute(f"CREATE INDEX idx_teams_auth_code_normalized ON {SCHEMA}.teams(auth_code_normalized)")
+    cursor.execute(f"ANALYZE {SCHEMA}.teams")
+
+
+def measure(cursor, query: str, codes: List[str]) -> List[float]:
+    timings = []
+    for code in codes:
+        started = time.perf_counter()
+        cursor.execute(query, (code,))
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, timings: List[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"{label}: median {statistics.median(ordered):.3f} ms, p95 {p95:.3f} ms"
+
+
+def main() -> None:
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        sys.exit('BENCH_DATABASE_URL not configured')
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        for size in sizes:
+            seed(cursor, size)
+            cursor.execute(f"SELECT auth_code FROM {SCHEMA}.teams ORDER BY random() LIMIT %s", (LOOKUPS,))
+            # Коды вводятся как попало: нижний регистр, пробелы, без префикса
+            codes = [
+                random.choice([code, code.lower(), code.replace('-', ' '), code[4:]])
+                .upper().replace('REG', '').replace('-', '').replace(' ', '')
+                for (code,) in cursor.fetchall()
+            ]
+            # Старый запрос слишком медленный, чтобы гонять его на всех кодах
+            legacy = measure(cursor, LEGACY_QUERY, codes[:max(1, min(len(codes), 20_000_000 // size))])
+            indexed = measure(cursor, INDEXED_QUERY, codes)
+            print(f"{size} команд")
+            print('  ' + report('REPLACE/UPPER скан', legacy))
+            print('  ' + report('индекс auth_code_normalized', indexed))
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
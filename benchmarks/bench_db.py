@@ -0,0 +1,101 @@
+'''
+Общая подготовка БД для нагрузочных бенчмарков: отдельная база из database_dump.sql
+с применёнными миграциями и синтетическими командами/матчами.
+
+BENCH_DATABASE_URL указывает на сервер (обычно на базу postgres); бенчмарк создаёт
+рядом базу BENCH_DATABASE_NAME (по умолчанию bench_team_registration) и пересоздаёт её
+при каждом запуске. Боевую базу сюда не указывать.
+'''
+import os
+import sys
+import statistics
+from typing import Dict, List
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'db_migrations'))
+
+import migrate  # noqa: E402
+
+SCHEMA = 't_p68536388_team_registration_si'
+DATABASE_NAME = os.environ.get('BENCH_DATABASE_NAME', 'bench_team_registration')
+# Миграции до V0003 включительно уже отражены в дампе
+DUMP_BASELINE = 3
+ROLES = ('Топ', 'Лес', 'Мид', 'АДК', 'Саппорт', 'Запасной 1', 'Запасной 2')
+
+
+def server_dsn() -> str:
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        sys.exit('BENCH_DATABASE_URL not configured')
+    return dsn
+
+
+def create_database() -> str:
+    '''Пересоздать базу бенчмарка; возвращает её DSN'''
+    admin_dsn = server_dsn()
+    conn = psycopg2.connect(admin_dsn)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {DATABASE_NAME} WITH (FORCE)")
+        cursor.execute(f"CREATE DATABASE {DATABASE_NAME}")
+        cursor.execute(f"ALTER DATABASE {DATABASE_NAME} SET search_path = {SCHEMA}")
+    conn.close()
+
+    bench_dsn = make_dsn(**{**parse_dsn(admin_dsn), 'dbname': DATABASE_NAME})
+    conn = psycopg2.connect(bench_dsn)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        with open(os.path.join(ROOT, 'database_dump.sql'), encoding='utf-8') as f:
+            cursor.execute(f.read())
+        cursor.execute(f"SET search_path = {SCHEMA}")
+        # Дамп отстаёт от боевой схемы: handle_post не передаёт captain_email,
+        # а бот делает upsert telegram_users по username
+        cursor.execute("ALTER TABLE teams ALTER COLUMN captain_email DROP NOT NULL")
+        cursor.execute("ALTER TABLE telegram_users ADD CONSTRAINT telegram_users_username_key UNIQUE (username)")
+    migrate.migrate(conn, migrate.discover(), baseline=DUMP_BASELINE)
+    conn.close()
+    return bench_dsn
+
+
+def seed_teams(dsn: str, count: int, approved_share: float = 0.5) -> List[str]:
+    '''Синтетические команды (5–7 игроков, уникальные Telegram); возвращает их коды регистрации'''
+    conn = psycopg2.connect(dsn)
+    with conn, conn.cursor() as cursor:
+        roster = " || E'\\n' || ".join(
+            f"'{role}: player' || g || '_{n} - Телеграм: @p' || g || '_{n}'" for n, role in enumerate(ROLES[:5])
+        )
+        cursor.execute(f"""
+            INSERT INTO teams (team_name, captain_name, captain_telegram, members_count, members_info,
+                               status, auth_code, created_at)
+            SELECT 'Team ' || g, 'Captain ' || g, '@captain' || g, 5, {roster},
+                   CASE WHEN g <= %s THEN 'approved' ELSE 'pending' END,
+                   'REG-' || UPPER(SUBSTRING(md5(g::text) FROM 1 FOR 4)) || '-' || UPPER(SUBSTRING(md5(g::text) FROM 5 FOR 4)),
+                   NOW() - (g || ' seconds')::interval
+            FROM generate_series(1, %s) AS g
+        """, (int(count * approved_share), count))
+        cursor.execute("ANALYZE")
+        cursor.execute("SELECT auth_code FROM teams WHERE team_name LIKE 'Team %%'")
+        codes = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return codes
+
+
+def percentiles(timings_ms: List[float]) -> Dict[str, float]:
+    if not timings_ms:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    ordered = sorted(timings_ms)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+    return {'p50': statistics.median(ordered), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+
+
+def report(label: str, timings_ms: List[float], elapsed_s: float, errors: int = 0) -> str:
+    stats = percentiles(timings_ms)
+    throughput = len(timings_ms) / elapsed_s if elapsed_s else 0.0
+    return (
+        f"{label}: {len(timings_ms)} запросов, {throughput:,.0f} req/s, "
+        f"p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms, p99 {stats['p99']:.2f} ms, "
+        f"max {stats['max']:.2f} ms, ошибок {errors}"
+    )
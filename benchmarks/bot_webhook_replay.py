@@ -0,0 +1,128 @@
+'''
+Replay webhook-обновлений в telegram-bot-vps/bot.py с заглушкой Telegram Bot API.
+
+Заглушка — локальный HTTP-сервер, отвечающий {"ok": true} на любой метод (с задержкой
+BENCH_TELEGRAM_LATENCY_MS, по умолчанию 50 мс — как до api.telegram.org с VPS). Обновления
+(/start, /help, /myteam капитанов из базы, обычный текст) отправляются в /webhook через
+Flask test client. Меряется:
+  - задержка ответа webhook (очередь обновлений должна отвечать сразу);
+  - сквозная пропускная способность: до обработки всех обновлений и отправки всех ответов.
+
+Запуск:
+  BENCH_DATABASE_URL=postgresql://postgres@localhost/postgres \\
+      python benchmarks/bot_webhook_replay.py [--updates 2000] [--teams 500]
+
+Лимиты TelegramClient поднимаются через TELEGRAM_*_RATE, чтобы мерить бота, а не ожидание
+токенов; для прогона с боевыми лимитами задайте их явно.
+'''
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'telegram-bot-vps'))
+
+import bench_db  # noqa: E402
+
+BOT_TOKEN = '123456:bench'
+TELEGRAM_LATENCY = float(os.environ.get('BENCH_TELEGRAM_LATENCY_MS', '50')) / 1000
+COMMAND_WEIGHTS = (('/myteam', 50), ('/start', 20), ('/help', 15), ('text', 15))
+
+
+class TelegramStub(BaseHTTPRequestHandler):
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if TELEGRAM_LATENCY:
+            time.sleep(TELEGRAM_LATENCY)
+        with TelegramStub.lock:
+            TelegramStub.calls += 1
+            message_id = TelegramStub.calls
+        body = json.dumps({'ok': True, 'result': {'message_id': message_id}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def make_updates(count: int, teams: int) -> List[Dict[str, Any]]:
+    updates = []
+    for update_id in range(1, count + 1):
+        command = random.choices([name for name, _ in COMMAND_WEIGHTS], [weight for _, weight in COMMAND_WEIGHTS])[0]
+        captain = random.randint(1, teams)
+        # Капитаны из seed_teams (@captainN); чат у каждого свой, как в личке с ботом
+        updates.append({
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'chat': {'id': 1_000_000 + captain, 'type': 'private'},
+                'from': {'id': 1_000_000 + captain, 'username': f'captain{captain}', 'first_name': f'Captain {captain}'},
+                'text': 'Привет!' if command == 'text' else command,
+            }
+        })
+    return updates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=2000, help='обновлений в прогоне')
+    parser.add_argument('--teams', type=int, default=500, help='синтетических команд в базе')
+    args = parser.parse_args()
+
+    print(f'Подготовка базы {bench_db.DATABASE_NAME}: {args.teams} команд…')
+    dsn = bench_db.create_database()
+    bench_db.seed_teams(dsn, args.teams)
+
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), TelegramStub)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': BOT_TOKEN,
+        'DATABASE_URL': dsn,
+    })
+    for name in ('TELEGRAM_GLOBAL_RATE', 'TELEGRAM_CHAT_RATE', 'TELEGRAM_GROUP_RATE'):
+        os.environ.setdefault(name, '100000')
+
+    import bot  # noqa: E402  — после окружения: конфигурация читается при импорте
+
+    bot.telegram.base_url = f'http://127.0.0.1:{stub.server_address[1]}/bot{BOT_TOKEN}'
+    client = bot.app.test_client()
+    updates = make_updates(args.updates, args.teams)
+    print(f"{args.updates} обновлений, {bot.UPDATE_WORKERS} потоков обработки, "
+          f"задержка Telegram {TELEGRAM_LATENCY * 1000:.0f} мс")
+
+    ack_timings: List[float] = []
+    rejected = 0
+    started = time.perf_counter()
+    for update in updates:
+        request_started = time.perf_counter()
+        response = client.post('/webhook', json=update)
+        ack_timings.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code != 200:
+            rejected += 1
+    acked = time.perf_counter() - started
+
+    bot.update_queue._queue.join()
+    processed = time.perf_counter() - started
+    bot.user_writer.flush()
+
+    print(bench_db.report('webhook ack', ack_timings, acked, rejected))
+    print(f'сквозная обработка: {len(updates) - rejected} обновлений за {processed:.2f} s, '
+          f'{(len(updates) - rejected) / processed:,.0f} updates/s, вызовов Telegram {TelegramStub.calls}')
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+'''
+Бенчмарк движка сетки (backend/teams-api/bracket.py): построение сетки,
+проигрыш всех матчей и исправление результата первого раунда после финала.
+
+Запуск: python benchmarks/bracket_engine.py [8 64 1024]
+Работает в памяти (MemoryMatchStore): число изменённых матчей на результат
+совпадает с числом UPDATE, которое сделает DbMatchStore.
+'''
+import os
+import sys
+import time
+import random
+import statistics
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'teams-api'))
+
+import bracket  # noqa: E402
+
+
+def play_all(store: bracket.MemoryMatchStore) -> List[tuple]:
+    '''Сыграть все матчи по порядку номеров; возвращает (мс, изменено матчей) на каждый результат'''
+    samples = []
+    for match_id in sorted(store.matches):
+        match = store.matches[match_id]
+        if match['team1_id'] is None or match['team2_id'] is None:
+            continue
+        score1, score2 = random.choice([(2, 0), (2, 1), (1, 2), (0, 2)])
+        started = time.perf_counter()
+        touched = bracket.report_result(store, match_id, score1, score2)
+        samples.append(((time.perf_counter() - started) * 1000, len(touched)))
+    return samples
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [8, 64, 1024]
+    random.seed(42)
+
+    for bracket_format in bracket.BRACKET_FORMATS:
+        for size in sizes:
+            team_ids = list(range(1, size + 1))
+            started = time.perf_counter()
+            planned = bracket.plan_bracket(team_ids, bracket_format)
+            plan_ms = (time.perf_counter() - started) * 1000
+
+            store = bracket.MemoryMatchStore(planned)
+            samples = play_all(store)
+            timings = [ms for ms, _ in samples]
+            touched = [count for _, count in samples]
+
+            # Исправление первого матча сбрасывает только зависящую от него ветку
+            first = planned[0].match_number
+            result = store.matches[first]
+            started = time.perf_counter()
+            reset = bracket.report_result(store, first, result['score2'], result['score1'])
+            correction_ms = (time.perf_counter() - started) * 1000
+
+            print(f"{bracket_format}, {size} команд: {len(planned)} матчей")
+            print(f"  построение: {plan_ms:.3f} ms")
+            print(f"  результат: median {statistics.median(timings):.4f} ms, "
+                  f"изменено матчей median {statistics.median(touched):.0f}, max {max(touched)}")
+            print(f"  исправление матча 1 после финала: {correction_ms:.4f} ms, изменено матчей {len(reset)}")
+
+
+if __name__ == '__main__':
+    main()
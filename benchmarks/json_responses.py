@@ -0,0 +1,117 @@
+'''
+Микробенчмарк сборки JSON-ответов: прежний путь (RealDictCursor + json.dumps(default=str)
++ новый словарь заголовков) против responses (tuple-курсор + dict(zip) + orjson,
+общие заголовки).
+
+Запуск: python benchmarks/json_responses.py [500 5000]
+С BENCH_DATABASE_URL дополнительно меряется выборка из Postgres (база bench_db.py)
+вместе с сериализацией — как в GET списка команд.
+'''
+import os
+import sys
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'teams-api'))
+
+import responses  # noqa: E402
+
+FIELDS = ('id', 'team_name', 'captain_name', 'members_count', 'members_info', 'status', 'created_at')
+
+
+def make_rows(size: int) -> List[Dict[str, Any]]:
+    started = datetime(2025, 3, 1, 12, 0, 0)
+    return [
+        {
+            'id': i,
+            'team_name': f'Команда {i}',
+            'captain_name': f'Капитан {i}',
+            'members_count': 5,
+            'members_info': '\n'.join(f'Игрок: player{i}_{n} - Телеграм: @p{i}_{n}' for n in range(5)),
+            'status': 'approved',
+            'created_at': started + timedelta(seconds=i),
+        }
+        for i in range(size)
+    ]
+
+
+def old_response(teams: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'isBase64Encoded': False,
+        'body': json.dumps({'teams': teams, 'next_cursor': None}, default=str)
+    }
+
+
+def stdlib_dumps(payload: Any) -> str:
+    return json.dumps(payload, default=responses._default, ensure_ascii=False, separators=(',', ':'))
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.5) -> float:
+    '''Среднее время вызова в мс'''
+    func()
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / calls * 1000
+
+
+def bench_serialize(size: int) -> None:
+    teams = make_rows(size)
+    old = measure(lambda: old_response(teams))
+    fallback = measure(lambda: stdlib_dumps({'teams': teams, 'next_cursor': None}))
+    line = f'  serialize {size:>6}: json.dumps(default=str) {old:8.2f} ms, stdlib fallback {fallback:8.2f} ms'
+    if responses.orjson is not None:
+        fast = measure(lambda: responses.json_response(200, {'teams': teams, 'next_cursor': None}))
+        line += f', orjson {fast:8.2f} ms (x{old / fast:.1f})'
+    print(line)
+
+
+def bench_fetch(dsn: str, size: int) -> None:
+    import psycopg2
+
+    query = f"SELECT {', '.join(FIELDS)} FROM teams ORDER BY created_at DESC, id DESC LIMIT {size}"
+    conn = psycopg2.connect(dsn)
+
+    def old_path() -> None:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query)
+            old_response(cursor.fetchall())
+
+    def new_path() -> None:
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            responses.json_response(200, {'teams': [dict(zip(FIELDS, row)) for row in cursor.fetchall()], 'next_cursor': None})
+
+    old, new = measure(old_path), measure(new_path)
+    print(f'  fetch+serialize {size:>6}: RealDictCursor+json {old:8.2f} ms, tuple+responses {new:8.2f} ms (x{old / new:.1f})')
+    conn.close()
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50, 500, 5000]
+    print(f"orjson: {'да' if responses.orjson is not None else 'нет, только stdlib'}")
+    for size in sizes:
+        bench_serialize(size)
+
+    if os.environ.get('BENCH_DATABASE_URL'):
+        import bench_db
+
+        dsn = bench_db.create_database()
+        bench_db.seed_teams(dsn, max(sizes))
+        for size in sizes:
+            bench_fetch(dsn, size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+'''
+Бенчмарк массового импорта (backend/teams-api/team_import.py): команд в секунду
+для валидации + COPY + INSERT ... SELECT против построчного INSERT, как в handle_post.
+
+Запуск: BENCH_DATABASE_URL=postgresql://... python benchmarks/team_import.py [1000 10000 100000]
+Таблица teams создаётся во временной схеме bench_team_import и удаляется после прогона.
+'''
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'teams-api'))
+
+import team_import  # noqa: E402
+
+SCHEMA = 'bench_team_import'
+ROLES = ('Топ', 'Лес', 'Мид', 'АДК', 'Саппорт', 'Запасной 1')
+
+
+def make_rows(size: int):
+    return [
+        {
+            'team_name': f'Team {i}',
+            'captain_name': f'Captain {i}',
+            'captain_telegram': f'@captain{i}',
+            'members_info': '\n'.join(f'{role}: player{i}_{n} - Телеграм: @p{i}_{n}'
+                                      for n, role in enumerate(ROLES[:5 + i % 2])),
+        }
+        for i in range(size)
+    ]
+
+
+def reset(cursor) -> None:
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(f"""
+        CREATE TABLE {SCHEMA}.teams (
+            id SERIAL PRIMARY KEY,
+            team_name VARCHAR(255) NOT NULL,
+            captain_name VARCHAR(255) NOT NULL,
+            captain_telegram VARCHAR(255),
+            members_count INTEGER NOT NULL CHECK (members_count >= 5 AND members_count <= 7),
+            members_info TEXT,
+            status VARCHAR(50) DEFAULT 'pending',
+            auth_code VARCHAR(20) NOT NULL,
+            auth_code_normalized VARCHAR(20),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"CREATE INDEX ON {SCHEMA}.teams(auth_code_normalized)")
+
+
+def bench_bulk(conn, rows) -> float:
+    started = time.perf_counter()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    report = team_import.import_teams(cursor, rows)
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    assert report['imported'] == len(rows), report['errors'][:3]
+    return elapsed
+
+
+def bench_row_by_row(conn, rows) -> float:
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    for row, code in zip(rows, team_import.generate_auth_codes(len(rows))):
+        cursor.execute("""
+            INSERT INTO teams (team_name, captain_name, captain_telegram, members_count, members_info,
+                               auth_code, auth_code_normalized, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending') RETURNING id
+        """, (row['team_name'], row['captain_name'], row['captain_telegram'],
+              len(row['members_info'].split('\n')), row['members_info'], code, team_import.normalize_code(code)))
+        cursor.fetchone()
+        conn.commit()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        sys.exit('BENCH_DATABASE_URL not configured')
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+
+    conn = psycopg2.connect(dsn)
+    cursor = conn.cursor()
+    try:
+        for size in sizes:
+            rows = make_rows(size)
+            reset(cursor)
+            cursor.execute(f"SET search_path = {SCHEMA}")
+            conn.commit()
+            bulk = bench_bulk(conn, rows)
+            print(f"{size} команд")
+            print(f"  импорт COPY: {bulk:.3f} s, {size / bulk:,.0f} команд/с")
+            # Построчный вариант на больших объёмах слишком долгий
+            if size <= 10_000:
+                single = bench_row_by_row(conn, rows)
+                print(f"  построчный INSERT + COMMIT: {single:.3f} s, {size / single:,.0f} команд/с")
+    finally:
+        conn.rollback()
+        cursor.execute("RESET search_path")
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+'''
+Нагрузочный прогон teams-api в процессе: index.handler вызывается напрямую из потоков
+против локальной Postgres (см. bench_db.py), без сети и API Gateway — видно время
+самого обработчика и БД.
+
+Сценарии:
+  registration — всплеск регистраций (POST с уникальными составами)
+  login        — вход капитанов по auth_code
+  bracket      — зрители опрашивают сетку (since-курсор, иногда полный снимок),
+                 админ вносит результаты (~2% запросов)
+  listing      — публичный список команд
+  mixed        — всё вместе в пропорциях дня турнира
+
+Запуск:
+  BENCH_DATABASE_URL=postgresql://postgres@localhost/postgres \\
+      python benchmarks/teams_api_load.py [--teams 1000] [--requests 2000] [--concurrency 4] [сценарии...]
+
+Конкурентность по умолчанию равна DB_POOL_MAX_SIZE пула функции: больше потоков упрётся
+в ожидание соединения, а не в обработчик. После прогона печатается снимок metrics —
+разбивка по этапам (connect/db/serialize).
+'''
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'teams-api'))
+
+import bench_db  # noqa: E402
+
+SCENARIOS = ('registration', 'login', 'bracket', 'listing', 'mixed')
+MIXED_WEIGHTS = (('bracket', 70), ('login', 15), ('listing', 10), ('registration', 5))
+RESULT_SHARE = 0.02
+FULL_SNAPSHOT_SHARE = 0.05
+
+Request = Tuple[str, Optional[Dict[str, str]], Optional[Dict[str, Any]]]
+
+
+class Workload:
+    '''Генераторы запросов; общее состояние (счётчики, курсоры, матчи) защищено блокировкой'''
+
+    def __init__(self, dsn: str, auth_codes: List[str]) -> None:
+        self.auth_codes = auth_codes
+        self.lock = threading.Lock()
+        self.registrations = 0
+        self.feed_cursor: Optional[str] = None
+        conn = psycopg2.connect(dsn)
+        with conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT id FROM matches
+                WHERE team1_id IS NOT NULL AND team2_id IS NOT NULL AND winner IS NULL
+                ORDER BY id
+            """)
+            self.playable = [row[0] for row in cursor.fetchall()]
+        conn.close()
+
+    def registration(self) -> Request:
+        with self.lock:
+            self.registrations += 1
+            n = self.registrations
+        members_info = '\n'.join(
+            f'{role}: burst{n}_{i} - Телеграм: @burst{n}_{i}' for i, role in enumerate(bench_db.ROLES[:5])
+        )
+        return 'POST', None, {
+            'team_name': f'Burst {n}',
+            'captain_name': f'Captain burst {n}',
+            'captain_telegram': f'@burst{n}_0',
+            'members_count': 5,
+            'members_info': members_info,
+        }
+
+    def login(self) -> Request:
+        return 'GET', {'auth_code': random.choice(self.auth_codes)}, None
+
+    def bracket(self) -> Request:
+        if random.random() < RESULT_SHARE:
+            with self.lock:
+                match_id = self.playable.pop() if self.playable else None
+            if match_id is not None:
+                score1, score2 = random.choice(((2, 0), (2, 1), (0, 2), (1, 2)))
+                return 'PUT', None, {'resource': 'match', 'id': match_id, 'score1': score1, 'score2': score2}
+        if self.feed_cursor is None or random.random() < FULL_SNAPSHOT_SHARE:
+            return 'GET', {'resource': 'matches'}, None
+        return 'GET', {'resource': 'matches', 'since': self.feed_cursor}, None
+
+    def listing(self) -> Request:
+        return 'GET', {'limit': '50'}, None
+
+    def mixed(self) -> Request:
+        scenario = random.choices([name for name, _ in MIXED_WEIGHTS], [weight for _, weight in MIXED_WEIGHTS])[0]
+        return getattr(self, scenario)()
+
+    def observe(self, response: Dict[str, Any]) -> None:
+        '''Зрители продолжают с курсора из последнего ответа ленты'''
+        if response['statusCode'] == 200 and response['headers'].get('ETag', '').startswith('"matches-'):
+            self.feed_cursor = json.loads(response['body'])['cursor']
+
+
+def call(handler: Callable, method: str, params: Optional[Dict[str, str]], body: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    event: Dict[str, Any] = {'httpMethod': method, 'queryStringParameters': params, 'headers': {}}
+    if body is not None and body.get('resource'):
+        # Генерация сетки и результаты матчей — админские маршруты
+        event['headers']['X-Auth-Token'] = os.environ['ADMIN_API_TOKEN']
+    if body is not None:
+        event['body'] = json.dumps(body)
+    return handler(event, None)
+
+
+def run(handler: Callable, workload: Workload, scenario: str, total: int, concurrency: int) -> str:
+    make_request = getattr(workload, scenario)
+    timings: List[float] = []
+    statuses: Dict[int, int] = {}
+    # Ошибки по типу и сообщению: прогон, где всё падает, не должен выглядеть просто медленным
+    exceptions: Dict[str, int] = {}
+    errors = 0
+    guard = threading.Lock()
+
+    def one(_: int) -> None:
+        nonlocal errors
+        method, params, body = make_request()
+        started = time.perf_counter()
+        try:
+            response = call(handler, method, params, body)
+        except Exception as e:
+            key = f'{type(e).__name__}: {e}'.strip()[:200]
+            with guard:
+                errors += 1
+                exceptions[key] = exceptions.get(key, 0) + 1
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        workload.observe(response)
+        with guard:
+            timings.append(elapsed_ms)
+            statuses[response['statusCode']] = statuses.get(response['statusCode'], 0) + 1
+            if response['statusCode'] >= 500:
+                errors += 1
+                key = f"HTTP {response['statusCode']}: {response.get('body', '')}"[:200]
+                exceptions[key] = exceptions.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    codes = ', '.join(f'{code}×{count}' for code, count in sorted(statuses.items()))
+    result = f"{bench_db.report(scenario, timings, elapsed, errors)} [{codes}]"
+    for message, count in sorted(exceptions.items(), key=lambda item: -item[1])[:5]:
+        result += f"\n    {count}× {message}"
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS))
+    parser.add_argument('--teams', type=int, default=1000, help='синтетических команд в базе')
+    parser.add_argument('--requests', type=int, default=2000, help='запросов на сценарий')
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('DB_POOL_MAX_SIZE', '4')))
+    parser.add_argument('--format', default='double', choices=('single', 'double'), help='формат сетки')
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}; choose from {', '.join(SCENARIOS)}")
+
+    print(f'Подготовка базы {bench_db.DATABASE_NAME}: {args.teams} команд…')
+    dsn = bench_db.create_database()
+    auth_codes = bench_db.seed_teams(dsn, args.teams)
+    os.environ['DATABASE_URL'] = dsn
+    # Все запросы идут с одного "адреса" — лимиты частоты мерим отдельно, если задать RATE_LIMIT_ENABLED=1
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    os.environ.setdefault('ADMIN_API_TOKEN', secrets.token_hex(16))
+
+    import index  # noqa: E402  — после DATABASE_URL: пул создаётся при первом запросе
+    import metrics  # noqa: E402
+
+    response = call(index.handler, 'POST', None, {'resource': 'bracket', 'format': args.format})
+    if response['statusCode'] != 200:
+        sys.exit(f"Bracket generation failed: {response['body']}")
+    print(f"Сетка: {json.loads(response['body'])['matches_count']} матчей; "
+          f"{args.requests} запросов на сценарий, {args.concurrency} потоков")
+
+    workload = Workload(dsn, auth_codes)
+    # Прогрев: подготовленные выражения и кеш настроек на соединениях пула
+    for scenario in ('login', 'listing', 'bracket'):
+        run(index.handler, workload, scenario, args.concurrency * 4, args.concurrency)
+
+    for scenario in args.scenarios:
+        print(run(index.handler, workload, scenario, args.requests, args.concurrency))
+
+    print(json.dumps(metrics.snapshot()['stages'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+-- Нормализованный код регистрации: поиск команды по коду через индекс вместо полного скана.
+-- Колонку заполняет триггер, а не приложение: строки из PHP-бэкенда, ботов, DEFAULT и ручных
+-- правок auth_code тоже находятся по коду.
+-- Индекс по колонке строится в V0015 через CREATE INDEX CONCURRENTLY, вне этой транзакции
+ALTER TABLE teams ADD COLUMN IF NOT EXISTS auth_code_normalized VARCHAR(20);
+
+-- Та же нормализация, что normalize_auth_code в teams-api: REG-AB12-CD34 -> AB12CD34
+CREATE OR REPLACE FUNCTION normalize_auth_code(code TEXT) RETURNS TEXT AS $$
+    SELECT REPLACE(REPLACE(REPLACE(UPPER(code), 'REG', ''), '-', ''), ' ', '')
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION sync_auth_code_normalized() RETURNS trigger AS $$
+BEGIN
+    NEW.auth_code_normalized := normalize_auth_code(NEW.auth_code);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS teams_auth_code_normalized ON teams;
+CREATE TRIGGER teams_auth_code_normalized
+BEFORE INSERT OR UPDATE OF auth_code, auth_code_normalized ON teams
+FOR EACH ROW EXECUTE FUNCTION sync_auth_code_normalized();
+
+UPDATE teams
+SET auth_code_normalized = normalize_auth_code(auth_code)
+WHERE auth_code_normalized IS DISTINCT FROM normalize_auth_code(auth_code);
@@ -0,0 +1,26 @@
+-- Дешёвая версия таблицы для ETag/Last-Modified: увеличивается триггером на каждую запись
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO table_versions (table_name) VALUES ('teams') ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = table_versions.version + 1, updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS teams_bump_version ON teams;
+CREATE TRIGGER teams_bump_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON teams
+FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- Keyset-пагинация списка команд по (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_teams_created_at_id ON teams(created_at DESC, id DESC);
@@ -0,0 +1,3 @@
+-- Последняя запись настроек регистрации берётся одним проходом по индексу.
+-- CONCURRENTLY: migrate.py выполняет файл вне транзакции и печатает время построения
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registration_settings_updated_at ON registration_settings(updated_at DESC);
@@ -0,0 +1,25 @@
+-- Очередь исходящих уведомлений Telegram (transactional outbox).
+-- Пишет teams-api, отправляет поток outbox_worker в VPS-боте: chat_id получателя
+-- он берёт из telegram_users по telegram_username
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    team_id INTEGER,
+    telegram_username VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Аренда воркера: до этого момента строку со статусом 'sending' никто другой не возьмёт
+    locked_until TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- Воркер выбирает только готовые к отправке сообщения
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending
+ON notification_outbox(next_attempt_at) WHERE status = 'pending';
+
+-- Аренды упавших воркеров, которые пора забрать заново
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_sending
+ON notification_outbox(locked_until) WHERE status = 'sending';
@@ -0,0 +1,5 @@
+-- Куда уходят победитель и проигравший матча: продвижение по сетке без пересчёта всей сетки
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS next_match_id INTEGER REFERENCES matches(id) ON DELETE SET NULL;
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS next_match_slot SMALLINT CHECK (next_match_slot IN (1, 2));
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS loser_next_match_id INTEGER REFERENCES matches(id) ON DELETE SET NULL;
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS loser_next_match_slot SMALLINT CHECK (loser_next_match_slot IN (1, 2));
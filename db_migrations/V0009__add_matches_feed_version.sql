@@ -0,0 +1,55 @@
+-- Версия строки матча для инкрементальной ленты (resource=matches&since=...).
+-- Все строки одной транзакции получают одну версию — очередное значение table_versions('matches').
+-- UPDATE строки table_versions держит блокировку до COMMIT, поэтому версии фиксируются по порядку
+-- и клиент с курсором N не пропустит транзакцию, закоммиченную позже с версией <= N.
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+INSERT INTO table_versions (table_name) VALUES ('matches') ON CONFLICT (table_name) DO NOTHING;
+INSERT INTO table_versions (table_name) VALUES ('matches_reset') ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION next_matches_version() RETURNS BIGINT AS $$
+DECLARE
+    current_version BIGINT;
+BEGIN
+    current_version := NULLIF(current_setting('matches.txn_version', true), '')::BIGINT;
+    IF current_version IS NULL THEN
+        UPDATE table_versions
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE table_name = 'matches'
+        RETURNING version INTO current_version;
+        PERFORM set_config('matches.txn_version', current_version::text, true);
+        -- Доставляется после COMMIT: будит long-poll запросы ленты
+        PERFORM pg_notify('matches_changed', current_version::text);
+    END IF;
+    RETURN current_version;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION set_match_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := next_matches_version();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Удалённые строки по курсору не найти: клиент с более старым курсором получит полный снимок
+CREATE OR REPLACE FUNCTION mark_matches_reset() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions
+    SET version = next_matches_version(), updated_at = CURRENT_TIMESTAMP
+    WHERE table_name = 'matches_reset';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS matches_set_version ON matches;
+CREATE TRIGGER matches_set_version
+BEFORE INSERT OR UPDATE ON matches
+FOR EACH ROW EXECUTE FUNCTION set_match_version();
+
+DROP TRIGGER IF EXISTS matches_mark_reset ON matches;
+CREATE TRIGGER matches_mark_reset
+AFTER DELETE OR TRUNCATE ON matches
+FOR EACH STATEMENT EXECUTE FUNCTION mark_matches_reset();
+
+CREATE INDEX IF NOT EXISTS idx_matches_version ON matches(version);
@@ -0,0 +1,82 @@
+-- Разобранный состав команд: строка на игрока из members_info ("Роль: Ник - Телеграм: @user").
+-- Заполняется триггерами на teams, поэтому синхронен при любой записи (API, импорт, боты).
+CREATE TABLE IF NOT EXISTS team_members (
+    team_id INTEGER NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    member_position SMALLINT NOT NULL,
+    role TEXT NOT NULL DEFAULT '',
+    nickname TEXT NOT NULL DEFAULT '',
+    telegram TEXT,
+    -- Username в Telegram регистронезависим: храним без @ в нижнем регистре
+    telegram_normalized TEXT,
+    PRIMARY KEY (team_id, member_position)
+);
+
+-- text_pattern_ops обслуживает и равенство (проверка дублей), и поиск по префиксу
+CREATE INDEX IF NOT EXISTS idx_team_members_telegram ON team_members(telegram_normalized text_pattern_ops)
+WHERE telegram_normalized IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_team_members_nickname ON team_members(lower(nickname) text_pattern_ops);
+
+-- Тот же разбор, что members.parse_members_info в teams-api
+CREATE OR REPLACE FUNCTION parse_members_info(members_info TEXT)
+RETURNS TABLE (member_position INTEGER, role TEXT, nickname TEXT, telegram TEXT) AS $$
+    SELECT (row_number() OVER (ORDER BY line.n))::INTEGER,
+           CASE WHEN strpos(parts.player, ':') > 0 THEN btrim(split_part(parts.player, ':', 1), E' \t\r') ELSE '' END,
+           btrim(CASE WHEN strpos(parts.player, ':') > 0
+                      THEN substr(parts.player, strpos(parts.player, ':') + 1)
+                      ELSE parts.player END, E' \t\r'),
+           NULLIF(btrim(parts.telegram, E' \t\r'), '')
+    FROM regexp_split_to_table(members_info, E'\n') WITH ORDINALITY AS line(text, n),
+         LATERAL (
+             SELECT split_part(line.text, ' - Телеграм:', 1) AS player,
+                    CASE WHEN strpos(line.text, ' - Телеграм:') > 0
+                         THEN substr(line.text, strpos(line.text, ' - Телеграм:') + length(' - Телеграм:'))
+                    END AS telegram
+         ) parts
+    WHERE btrim(line.text, E' \t\r') <> ''
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION normalize_telegram(telegram TEXT) RETURNS TEXT AS $$
+    SELECT NULLIF(lower(ltrim(btrim(telegram), '@')), '')
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Statement-триггеры с таблицами переходов: массовый импорт разбирается одним INSERT ... SELECT
+CREATE OR REPLACE FUNCTION sync_team_members() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM team_members tm
+        USING new_teams n JOIN old_teams o ON o.id = n.id
+        WHERE tm.team_id = n.id AND n.members_info IS DISTINCT FROM o.members_info;
+
+        INSERT INTO team_members (team_id, member_position, role, nickname, telegram, telegram_normalized)
+        SELECT n.id, p.member_position, p.role, p.nickname, p.telegram, normalize_telegram(p.telegram)
+        FROM new_teams n JOIN old_teams o ON o.id = n.id
+        CROSS JOIN LATERAL parse_members_info(n.members_info) p
+        WHERE n.members_info IS DISTINCT FROM o.members_info;
+    ELSE
+        INSERT INTO team_members (team_id, member_position, role, nickname, telegram, telegram_normalized)
+        SELECT n.id, p.member_position, p.role, p.nickname, p.telegram, normalize_telegram(p.telegram)
+        FROM new_teams n
+        CROSS JOIN LATERAL parse_members_info(n.members_info) p;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS teams_sync_members_insert ON teams;
+CREATE TRIGGER teams_sync_members_insert
+AFTER INSERT ON teams
+REFERENCING NEW TABLE AS new_teams
+FOR EACH STATEMENT EXECUTE FUNCTION sync_team_members();
+
+DROP TRIGGER IF EXISTS teams_sync_members_update ON teams;
+CREATE TRIGGER teams_sync_members_update
+AFTER UPDATE ON teams
+REFERENCING OLD TABLE AS old_teams NEW TABLE AS new_teams
+FOR EACH STATEMENT EXECUTE FUNCTION sync_team_members();
+
+-- Заполнение по уже зарегистрированным командам
+INSERT INTO team_members (team_id, member_position, role, nickname, telegram, telegram_normalized)
+SELECT t.id, p.member_position, p.role, p.nickname, p.telegram, normalize_telegram(p.telegram)
+FROM teams t
+CROSS JOIN LATERAL parse_members_info(t.members_info) p
+ON CONFLICT (team_id, member_position) DO NOTHING;
@@ -0,0 +1,26 @@
+-- Очередь правок команд после закрытия регистрации: одна ожидающая правка на команду и тип,
+-- повторные запросы перезаписывают её (ON CONFLICT по частичному уникальному индексу).
+ALTER TABLE pending_actions ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP;
+
+-- Уже накопившиеся дубли: оставляем последнюю правку
+UPDATE pending_actions p
+SET status = 'superseded', resolved_at = CURRENT_TIMESTAMP
+WHERE p.status = 'pending'
+  AND EXISTS (
+      SELECT 1 FROM pending_actions newer
+      WHERE newer.team_id = p.team_id
+        AND newer.action_type = p.action_type
+        AND newer.status = 'pending'
+        AND (newer.created_at, newer.id) > (p.created_at, p.id)
+  );
+
+ALTER TABLE pending_actions DROP CONSTRAINT IF EXISTS pending_actions_status_check;
+ALTER TABLE pending_actions ADD CONSTRAINT pending_actions_status_check
+CHECK (status IN ('pending', 'approved', 'rejected', 'expired', 'superseded'));
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pending_actions_one_pending
+ON pending_actions(team_id, action_type) WHERE status = 'pending';
+
+-- Сборщик просроченных и список для модерации читают только ожидающие строки
+CREATE INDEX IF NOT EXISTS idx_pending_actions_pending_expires
+ON pending_actions(expires_at) WHERE status = 'pending';
@@ -0,0 +1,12 @@
+-- Общие счётчики лимитов частоты (ratelimit.py в teams-api): строка на ключ и окно.
+-- UNLOGGED: без WAL запись дешевле, а потеря счётчиков при сбое сервера допустима.
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+    bucket TEXT NOT NULL,
+    window_start BIGINT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    -- Окно нужно ещё одно окно после своего конца как "предыдущее"
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (bucket, window_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits(expires_at);
@@ -0,0 +1,13 @@
+-- Ответы на POST регистрации по заголовку Idempotency-Key: повтор запроса в пределах TTL
+-- получает исходный auth_code/team_id без второй вставки и уведомления (idempotency.py в teams-api).
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key TEXT PRIMARY KEY,
+    -- sha256 тела запроса: тот же ключ с другими данными — ошибка клиента
+    request_hash TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    response_body TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
@@ -0,0 +1,130 @@
+-- Счётчики для публичной статистики (GET ?resource=stats): команды по статусам и прогресс
+-- матчей по раундам. Поддерживаются statement-триггерами с таблицами переходов: вставка,
+-- правка или удаление любого числа строк — одно изменение счётчика на затронутый ключ.
+CREATE TABLE IF NOT EXISTS team_status_counts (
+    status TEXT PRIMARY KEY,
+    team_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS match_round_stats (
+    bracket_type TEXT NOT NULL,
+    round_number INTEGER NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    finished BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bracket_type, round_number)
+);
+
+-- Ветки разделены по TG_OP: таблицы переходов объявлены не у всех триггеров.
+-- ORDER BY задаёт одинаковый порядок блокировки строк счётчиков в параллельных транзакциях
+CREATE OR REPLACE FUNCTION sync_team_status_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO team_status_counts AS c (status, team_count)
+        SELECT COALESCE(status, 'unknown'), COUNT(*) FROM new_teams GROUP BY 1 ORDER BY 1
+        ON CONFLICT (status) DO UPDATE SET team_count = c.team_count + EXCLUDED.team_count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO team_status_counts AS c (status, team_count)
+        SELECT status, SUM(n) FROM (
+            SELECT COALESCE(status, 'unknown') AS status, 1 AS n FROM new_teams
+            UNION ALL
+            SELECT COALESCE(status, 'unknown'), -1 FROM old_teams
+        ) changes
+        GROUP BY status HAVING SUM(n) <> 0 ORDER BY status
+        ON CONFLICT (status) DO UPDATE SET team_count = c.team_count + EXCLUDED.team_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO team_status_counts AS c (status, team_count)
+        SELECT COALESCE(status, 'unknown'), -COUNT(*) FROM old_teams GROUP BY 1 ORDER BY 1
+        ON CONFLICT (status) DO UPDATE SET team_count = c.team_count + EXCLUDED.team_count;
+    ELSE
+        UPDATE team_status_counts SET team_count = 0 WHERE team_count <> 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_match_round_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO match_round_stats AS s (bracket_type, round_number, total, finished)
+        SELECT bracket_type, round_number, COUNT(*), COUNT(winner)
+        FROM new_matches GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (bracket_type, round_number) DO UPDATE
+        SET total = s.total + EXCLUDED.total, finished = s.finished + EXCLUDED.finished;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Результат матча: раунд тот же, меняется только finished
+        INSERT INTO match_round_stats AS s (bracket_type, round_number, total, finished)
+        SELECT bracket_type, round_number, SUM(total), SUM(finished) FROM (
+            SELECT bracket_type, round_number, 1 AS total, (winner IS NOT NULL)::int AS finished FROM new_matches
+            UNION ALL
+            SELECT bracket_type, round_number, -1, -(winner IS NOT NULL)::int FROM old_matches
+        ) changes
+        GROUP BY 1, 2 HAVING SUM(total) <> 0 OR SUM(finished) <> 0 ORDER BY 1, 2
+        ON CONFLICT (bracket_type, round_number) DO UPDATE
+        SET total = s.total + EXCLUDED.total, finished = s.finished + EXCLUDED.finished;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO match_round_stats AS s (bracket_type, round_number, total, finished)
+        SELECT bracket_type, round_number, -COUNT(*), -COUNT(winner)
+        FROM old_matches GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (bracket_type, round_number) DO UPDATE
+        SET total = s.total + EXCLUDED.total, finished = s.finished + EXCLUDED.finished;
+    ELSE
+        DELETE FROM match_round_stats;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS teams_status_counts_insert ON teams;
+CREATE TRIGGER teams_status_counts_insert
+AFTER INSERT ON teams
+REFERENCING NEW TABLE AS new_teams
+FOR EACH STATEMENT EXECUTE FUNCTION sync_team_status_counts();
+
+DROP TRIGGER IF EXISTS teams_status_counts_update ON teams;
+CREATE TRIGGER teams_status_counts_update
+AFTER UPDATE ON teams
+REFERENCING OLD TABLE AS old_teams NEW TABLE AS new_teams
+FOR EACH STATEMENT EXECUTE FUNCTION sync_team_status_counts();
+
+DROP TRIGGER IF EXISTS teams_status_counts_delete ON teams;
+CREATE TRIGGER teams_status_counts_delete
+AFTER DELETE ON teams
+REFERENCING OLD TABLE AS old_teams
+FOR EACH STATEMENT EXECUTE FUNCTION sync_team_status_counts();
+
+DROP TRIGGER IF EXISTS teams_status_counts_truncate ON teams;
+CREATE TRIGGER teams_status_counts_truncate
+AFTER TRUNCATE ON teams
+FOR EACH STATEMENT EXECUTE FUNCTION sync_team_status_counts();
+
+DROP TRIGGER IF EXISTS matches_round_stats_insert ON matches;
+CREATE TRIGGER matches_round_stats_insert
+AFTER INSERT ON matches
+REFERENCING NEW TABLE AS new_matches
+FOR EACH STATEMENT EXECUTE FUNCTION sync_match_round_stats();
+
+DROP TRIGGER IF EXISTS matches_round_stats_update ON matches;
+CREATE TRIGGER matches_round_stats_update
+AFTER UPDATE ON matches
+REFERENCING OLD TABLE AS old_matches NEW TABLE AS new_matches
+FOR EACH STATEMENT EXECUTE FUNCTION sync_match_round_stats();
+
+DROP TRIGGER IF EXISTS matches_round_stats_delete ON matches;
+CREATE TRIGGER matches_round_stats_delete
+AFTER DELETE ON matches
+REFERENCING OLD TABLE AS old_matches
+FOR EACH STATEMENT EXECUTE FUNCTION sync_match_round_stats();
+
+DROP TRIGGER IF EXISTS matches_round_stats_truncate ON matches;
+CREATE TRIGGER matches_round_stats_truncate
+AFTER TRUNCATE ON matches
+FOR EACH STATEMENT EXECUTE FUNCTION sync_match_round_stats();
+
+-- Начальные значения по уже существующим данным
+TRUNCATE team_status_counts, match_round_stats;
+
+INSERT INTO team_status_counts (status, team_count)
+SELECT COALESCE(status, 'unknown'), COUNT(*) FROM teams GROUP BY 1;
+
+INSERT INTO match_round_stats (bracket_type, round_number, total, finished)
+SELECT bracket_type, round_number, COUNT(*), COUNT(winner) FROM matches GROUP BY 1, 2;
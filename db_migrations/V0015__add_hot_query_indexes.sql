@@ -0,0 +1,18 @@
+-- Индексы для горячих запросов, которых нет в базе, развёрнутой из database_dump.sql.
+-- CONCURRENTLY не блокирует запись в таблицу на время построения; migrate.py выполняет
+-- такой файл вне транзакции, по одному оператору, и печатает время построения каждого индекса.
+-- Индекс по registration_settings.updated_at строится так же, в V0006.
+
+-- Поиск команды по коду регистрации: WHERE auth_code_normalized = %s.
+-- Колонку и заполняющий её триггер создаёт V0004
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_teams_auth_code_normalized ON teams(auth_code_normalized);
+
+-- Бот (/myteam): WHERE captain_telegram = %s
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_teams_captain_telegram ON teams(captain_telegram);
+
+-- Список команд с фильтром по статусу: WHERE status = %s ORDER BY created_at DESC, id DESC.
+-- Заменяет idx_teams_status из V0001, которого в дампе нет
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_teams_status_created_at ON teams(status, created_at DESC, id DESC);
+
+-- Сетка и лента матчей: ORDER BY bracket_type, round_number, match_number
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_matches_bracket_order ON matches(bracket_type, round_number, match_number);
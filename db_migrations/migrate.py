@@ -0,0 +1,271 @@
+'''
+Применение миграций V<версия>__<описание>.sql по порядку версий.
+
+История — таблица schema_migrations (имя файла, версия, контрольная сумма, время выполнения).
+Две версии с одним номером — ошибка, кроме исторических пар V0001/V0002 из LEGACY_DUPLICATES:
+они применяются в порядке имён файлов. Файлы без схемы в именах таблиц выполняются
+с search_path = --schema, поэтому квалифицированные и неквалифицированные файлы равноценны.
+
+Обычный файл выполняется одной транзакцией вместе с записью в историю. Файл с
+CREATE INDEX CONCURRENTLY выполняется по одному оператору вне транзакции (иначе Postgres
+его не примет); для каждого индекса печатается время построения, а невалидный индекс,
+оставшийся от прерванной сборки, пересоздаётся.
+
+Запуск:
+  DATABASE_URL=postgresql://... python db_migrations/migrate.py [--dry-run]
+  python db_migrations/migrate.py --baseline 14   # база уже в актуальном состоянии: только отметить
+'''
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+from typing import Dict, List, NamedTuple, Optional
+
+import psycopg2
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+SCHEMA = 't_p68536388_team_registration_si'
+FILENAME_RE = re.compile(r'^V(\d+)__(\w+)\.sql$')
+# Дубли номеров, появившиеся до runner'а; новые коллизии не допускаются
+LEGACY_DUPLICATES = {
+    1: {'V0001__add_is_superadmin_to_admin_users.sql', 'V0001__create_teams_table.sql'},
+    2: {'V0002__add_telegram_to_teams.sql', 'V0002__open_registration.sql'},
+}
+CONCURRENT_INDEX_RE = re.compile(
+    r'^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.I
+)
+
+
+class MigrationError(RuntimeError):
+    '''Коллизия версий, неверное имя файла или ошибка выполнения'''
+
+
+class Migration(NamedTuple):
+    version: int
+    filename: str
+    sql: str
+    checksum: str
+
+    @property
+    def concurrent(self) -> bool:
+        return any(concurrent_index(statement) for statement in split_statements(self.sql))
+
+
+def discover(directory: str = DIRECTORY) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.sql'):
+            continue
+        match = FILENAME_RE.match(filename)
+        if not match:
+            raise MigrationError(f'Unexpected migration file name: {filename}')
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            sql = f.read()
+        migrations.append(Migration(int(match.group(1)), filename, sql, hashlib.sha256(sql.encode()).hexdigest()))
+
+    by_version: Dict[int, List[str]] = {}
+    for migration in migrations:
+        by_version.setdefault(migration.version, []).append(migration.filename)
+    for version, filenames in sorted(by_version.items()):
+        if len(filenames) > 1 and set(filenames) != LEGACY_DUPLICATES.get(version):
+            raise MigrationError(f"Version collision V{version:04d}: {', '.join(filenames)}")
+
+    return sorted(migrations, key=lambda migration: (migration.version, migration.filename))
+
+
+def split_statements(sql: str) -> List[str]:
+    '''Разбить файл на операторы по ";" вне строк, комментариев и $$-блоков'''
+    statements = []
+    current: List[str] = []
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = len(sql) if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+            continue
+        if sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = len(sql) if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+            continue
+        if char in ("'", '"'):
+            end = i + 1
+            while end < len(sql):
+                if sql[end] == char:
+                    if sql[end + 1:end + 2] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        dollar = re.match(r'\$(\w*)\$', sql[i:])
+        if dollar:
+            tag = dollar.group(0)
+            end = sql.find(tag, i + len(tag))
+            end = len(sql) if end == -1 else end + len(tag)
+            current.append(sql[i:end])
+            i = end
+            continue
+        if char == ';':
+            statements.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append(''.join(current))
+    return [statement.strip() for statement in statements if _strip_comments(statement).strip()]
+
+
+def _strip_comments(statement: str) -> str:
+    return re.sub(r'--[^\n]*|/\*.*?\*/', '', statement, flags=re.S)
+
+
+def concurrent_index(statement: str) -> Optional[str]:
+    '''Имя индекса, если оператор — CREATE INDEX CONCURRENTLY'''
+    match = CONCURRENT_INDEX_RE.match(_strip_comments(statement))
+    return match.group(1) if match else None
+
+
+def ensure_history(cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            filename TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            execution_ms INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+
+def applied_checksums(cursor) -> Dict[str, str]:
+    cursor.execute("SELECT filename, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def record(cursor, migration: Migration, execution_ms: int) -> None:
+    cursor.execute("""
+        INSERT INTO schema_migrations (filename, version, checksum, execution_ms)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (filename) DO UPDATE SET checksum = EXCLUDED.checksum, applied_at = NOW(),
+                                            execution_ms = EXCLUDED.execution_ms
+    """, (migration.filename, migration.version, migration.checksum, execution_ms))
+
+
+def drop_invalid_index(cursor, name: str) -> bool:
+    '''Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс, который IF NOT EXISTS пропустит'''
+    cursor.execute("""
+        SELECT n.nspname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = current_schema() AND NOT i.indisvalid
+    """, (name,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{row[0]}"."{name}"')
+    return True
+
+
+def apply_concurrent(conn, migration: Migration) -> None:
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        for statement in split_statements(migration.sql):
+            index = concurrent_index(statement)
+            if index and drop_invalid_index(cursor, index):
+                print(f'    {index}: dropped invalid index left by an interrupted build')
+            started = time.perf_counter()
+            cursor.execute(statement)
+            if index:
+                print(f'    {index}: {time.perf_counter() - started:.3f} s')
+
+
+def migrate(conn, migrations: List[Migration], baseline: Optional[int] = None, dry_run: bool = False) -> int:
+    '''Применить неприменённые миграции; возвращает их число'''
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        ensure_history(cursor)
+        done = applied_checksums(cursor)
+
+    count = 0
+    for migration in migrations:
+        if migration.filename in done:
+            if done[migration.filename] != migration.checksum:
+                print(f'  warning: {migration.filename} changed after it was applied')
+            continue
+
+        if baseline is not None and migration.version <= baseline:
+            print(f'  baseline {migration.filename}')
+            if not dry_run:
+                with conn.cursor() as cursor:
+                    record(cursor, migration, 0)
+            continue
+
+        mode = 'outside a transaction' if migration.concurrent else 'in a transaction'
+        print(f'  apply {migration.filename} ({mode})')
+        count += 1
+        if dry_run:
+            continue
+
+        started = time.perf_counter()
+        try:
+            if migration.concurrent:
+                apply_concurrent(conn, migration)
+                with conn.cursor() as cursor:
+                    record(cursor, migration, int((time.perf_counter() - started) * 1000))
+            else:
+                conn.autocommit = False
+                with conn.cursor() as cursor:
+                    cursor.execute(migration.sql)
+                    record(cursor, migration, int((time.perf_counter() - started) * 1000))
+                conn.commit()
+        except psycopg2.Error as e:
+            if not conn.autocommit:
+                conn.rollback()
+            raise MigrationError(f'{migration.filename}: {e}'.strip()) from e
+        finally:
+            conn.autocommit = True
+        print(f'    done in {time.perf_counter() - started:.3f} s')
+    return count
+
+
+def connect(dsn: str, schema: str = SCHEMA):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f'SET search_path TO "{schema}"')
+    return conn
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--schema', default=SCHEMA)
+    parser.add_argument('--baseline', type=int, help='отметить версии до этой включительно как применённые')
+    parser.add_argument('--dry-run', action='store_true', help='только показать план')
+    args = parser.parse_args()
+    if not args.dsn:
+        sys.exit('DATABASE_URL or --dsn must be configured')
+
+    try:
+        migrations = discover()
+        conn = connect(args.dsn, args.schema)
+        try:
+            count = migrate(conn, migrations, args.baseline, args.dry_run)
+        finally:
+            conn.close()
+    except MigrationError as e:
+        sys.exit(f'Migration failed: {e}')
+    print(f"{'Would apply' if args.dry_run else 'Applied'} {count} migration(s)")
+
+
+if __name__ == '__main__':
+    main()
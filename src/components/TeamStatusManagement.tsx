@@ -6,7 +6,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import Icon from '@/components/ui/icon';
 import { useToast } from '@/hooks/use-toast';
-import { API_CONFIG } from '@/config/api';
+import { API_CONFIG, adminHeaders } from '@/config/api';
 import {
   Select,
   SelectContent,
@@ -85,7 +85,7 @@ export default function TeamStatusManagement({ adminToken }: TeamStatusManagemen
 
   const loadTeams = async () => {
     try {
-      const response = await fetch(`${API_URL}?status=all`);
+      const response = await fetch(`${API_URL}?status=all&view=admin`, { headers: adminHeaders() });
       const data = await response.json();
       setTeams(data.teams || []);
       
@@ -107,10 +107,10 @@ export default function TeamStatusManagement({ adminToken }: TeamStatusManagemen
     try {
       const response = await fetch(API_URL, {
         method: 'PUT',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
           'X-Admin-Token': adminToken
-        },
+        }),
         body: JSON.stringify({
           resource: 'team_status',
           team_id: teamId,
@@ -140,10 +140,10 @@ export default function TeamStatusManagement({ adminToken }: TeamStatusManagemen
     try {
       const response = await fetch(API_URL, {
         method: 'PUT',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
           'X-Admin-Token': adminToken
-        },
+        }),
         body: JSON.stringify({
           resource: 'bracket_url',
           bracket_url: bracketUrl
@@ -217,10 +217,10 @@ export default function TeamStatusManagement({ adminToken }: TeamStatusManagemen
     try {
       const response = await fetch(API_URL, {
         method: 'PUT',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
           'X-Admin-Token': adminToken
-        },
+        }),
         body: JSON.stringify({
           resource: 'team_edit',
           id: editingTeam.id,
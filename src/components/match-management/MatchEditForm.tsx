@@ -38,6 +38,7 @@ export default function MatchEditForm({
       <div className="space-y-2">
         <Label>Команда 1</Label>
         <Select
+          disabled
           value={selectedMatch.team1_id?.toString() || ''}
           onValueChange={(value) =>
             onUpdateMatch({ ...selectedMatch, team1_id: parseInt(value) })
@@ -59,6 +60,7 @@ export default function MatchEditForm({
       <div className="space-y-2">
         <Label>Команда 2</Label>
         <Select
+          disabled
           value={selectedMatch.team2_id?.toString() || ''}
           onValueChange={(value) =>
             onUpdateMatch({ ...selectedMatch, team2_id: parseInt(value) })
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useToast } from '@/hooks/use-toast';
-import { API_CONFIG } from '@/config/api';
+import { API_CONFIG, adminHeaders } from '@/config/api';
 import { Match, Team } from './types';
 
 const API_URL = API_CONFIG.TEAMS_URL;
@@ -57,7 +57,7 @@ export function useMatchManagement() {
   const handleExportTeams = async () => {
     setExportingTeams(true);
     try {
-      const response = await fetch(`${API_URL}?resource=export`);
+      const response = await fetch(`${API_URL}?resource=export`, { headers: adminHeaders() });
       const data = await response.json();
       
       if (data.success) {
@@ -114,9 +114,9 @@ export function useMatchManagement() {
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({
           resource: 'bulk_create',
           team_names: teamNames,
@@ -156,11 +156,11 @@ export function useMatchManagement() {
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({
-          resource: 'generate_bracket',
+          resource: 'bracket',
         }),
       });
 
@@ -169,13 +169,13 @@ export function useMatchManagement() {
       if (data.success) {
         toast({
           title: 'Успешно',
-          description: `Создано матчей: ${data.matches_created}`,
+          description: `Создано матчей: ${data.matches_count}`,
         });
         loadMatches();
       } else {
         toast({
           title: 'Ошибка',
-          description: data.message || 'Не удалось создать сетку',
+          description: data.message || data.error || 'Не удалось создать сетку',
           variant: 'destructive',
         });
       }
@@ -199,11 +199,12 @@ export function useMatchManagement() {
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({
-          resource: 'clear_bracket',
+          resource: 'bracket',
+          clear: true,
         }),
       });
 
@@ -218,7 +219,7 @@ export function useMatchManagement() {
       } else {
         toast({
           title: 'Ошибка',
-          description: data.message || 'Не удалось очистить сетку',
+          description: data.message || data.error || 'Не удалось очистить сетку',
           variant: 'destructive',
         });
       }
@@ -242,11 +243,13 @@ export function useMatchManagement() {
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({
-          resource: 'shuffle_and_generate',
+          resource: 'bracket',
+          replace: true,
+          shuffle: true,
         }),
       });
 
@@ -255,13 +258,13 @@ export function useMatchManagement() {
       if (data.success) {
         toast({
           title: 'Успешно',
-          description: `Команды перемешаны. Создано матчей: ${data.matches_created}`,
+          description: `Команды перемешаны. Создано матчей: ${data.matches_count}`,
         });
         loadMatches();
       } else {
         toast({
           title: 'Ошибка',
-          description: data.message || 'Не удалось перемешать команды',
+          description: data.message || data.error || 'Не удалось перемешать команды',
           variant: 'destructive',
         });
       }
@@ -281,9 +284,9 @@ export function useMatchManagement() {
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({
           resource: 'clear_teams',
         }),
@@ -325,19 +328,17 @@ export function useMatchManagement() {
     try {
       const response = await fetch(API_URL, {
         method: 'PUT',
-        headers: {
+        headers: adminHeaders({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify({
           resource: 'match',
-          match_id: selectedMatch.id,
-          team1_id: selectedMatch.team1_id,
-          team2_id: selectedMatch.team2_id,
+          id: selectedMatch.id,
           score1: selectedMatch.score1,
           score2: selectedMatch.score2,
-          winner: selectedMatch.winner,
+          winner: selectedMatch.winner || null,
           status: selectedMatch.status,
-          scheduled_time: selectedMatch.scheduled_time,
+          scheduled_time: selectedMatch.scheduled_time || null,
         }),
       });
 
@@ -353,7 +354,7 @@ export function useMatchManagement() {
       } else {
         toast({
           title: 'Ошибка',
-          description: data.message || 'Не удалось обновить матч',
+          description: data.message || data.error || 'Не удалось обновить матч',
           variant: 'destructive',
         });
       }
@@ -223,7 +223,7 @@ export default function ManageTeamSection() {
     if (!team) return;
 
     try {
-      const response = await fetch(`${API_URL}?id=${team.id}`, {
+      const response = await fetch(`${API_URL}?id=${team.id}&auth_code=${encodeURIComponent(captainTelegram)}`, {
         method: 'DELETE'
       });
 
@@ -6,7 +6,7 @@ import Icon from '@/components/ui/icon';
 import { useState, useEffect } from 'react';
 import { useToast } from '@/hooks/use-toast';
 import * as XLSX from 'xlsx';
-import { API_CONFIG } from '@/config/api';
+import { API_CONFIG, adminHeaders } from '@/config/api';
 import TeamCard from '@/components/teams/TeamCard';
 import TeamEditDialog from '@/components/teams/TeamEditDialog';
 import PublicTeamCard from '@/components/teams/PublicTeamCard';
@@ -101,7 +101,7 @@ export default function TeamsSection({ teams, isAdmin, onLoadTeams, onStatusChan
     try {
       const response = await fetch(SETTINGS_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: adminHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({
           is_open: !isRegistrationOpen,
           updated_by: 'admin'
@@ -17,3 +17,19 @@ export const API_CONFIG = {
     ? '/php-backend/api/teams.php'
     : 'https://functions.poehali.dev/770caae7-f99a-46a7-9d02-36b5270e76fe'
 };
+
+
+// Токен сессии администратора, выданный при входе (resource: 'auth').
+// teams-api принимает админские запросы только с ним в заголовке X-Auth-Token
+const ADMIN_TOKEN_KEY = 'admin_token';
+
+export const adminSession = {
+  get: () => sessionStorage.getItem(ADMIN_TOKEN_KEY),
+  set: (token: string) => sessionStorage.setItem(ADMIN_TOKEN_KEY, token),
+  clear: () => sessionStorage.removeItem(ADMIN_TOKEN_KEY),
+};
+
+export const adminHeaders = (headers: Record<string, string> = {}): Record<string, string> => {
+  const token = adminSession.get();
+  return token ? { ...headers, 'X-Auth-Token': token } : headers;
+};
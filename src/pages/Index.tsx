@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useToast } from '@/hooks/use-toast';
-import { API_CONFIG } from '@/config/api';
+import { API_CONFIG, adminHeaders, adminSession } from '@/config/api';
 import Navigation from '@/components/Navigation';
 import Footer from '@/components/Footer';
 import RegisterSection from '@/components/sections/RegisterSection';
@@ -36,6 +36,8 @@ export default function Index() {
   const [teams, setTeams] = useState<Team[]>([]);
   const [isRegistrationOpen, setIsRegistrationOpen] = useState(true);
   const [isLoadingSettings, setIsLoadingSettings] = useState(false);
+  // Повторная отправка той же заявки идёт с тем же ключом: сервер не создаст дубль команды
+  const submission = useRef<{ payload: string; key: string } | null>(null);
   const { toast } = useToast();
 
   useEffect(() => {
@@ -57,7 +59,7 @@ export default function Index() {
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: adminHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({
           resource: 'settings',
           is_open: !isRegistrationOpen,
@@ -137,11 +139,16 @@ export default function Index() {
       members_info: membersInfo
     };
     
+    const payload = JSON.stringify(submissionData);
+    if (submission.current?.payload !== payload) {
+      submission.current = { payload, key: crypto.randomUUID() };
+    }
+    
     try {
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(submissionData)
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': submission.current.key },
+        body: payload
       });
       
       if (response.ok) {
@@ -193,7 +200,10 @@ export default function Index() {
 
   const loadTeams = async () => {
     try {
-      const response = await fetch(API_URL);
+      // Публичная проекция без Telegram капитана и комментария: админке нужен view=admin
+      const response = isAuthenticated
+        ? await fetch(`${API_URL}?view=admin`, { headers: adminHeaders() })
+        : await fetch(API_URL);
       const data = await response.json();
       setTeams(data.teams || []);
       toast({
@@ -213,7 +223,7 @@ export default function Index() {
     try {
       const response = await fetch(API_URL, {
         method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
+        headers: adminHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({ id: teamId, status: newStatus })
       });
       
@@ -240,7 +250,8 @@ export default function Index() {
 
     try {
       const response = await fetch(`${API_URL}?id=${teamId}`, {
-        method: 'DELETE'
+        method: 'DELETE',
+        headers: adminHeaders()
       });
       
       if (response.ok) {
@@ -275,6 +286,9 @@ export default function Index() {
       const data = await response.json();
       
       if (data.success) {
+        if (data.token) {
+          adminSession.set(data.token);
+        }
         setIsAuthenticated(true);
         setIsAdmin(true);
         setAdminUsername(data.username || username);
@@ -300,6 +314,7 @@ export default function Index() {
   };
 
   const handleLogout = () => {
+    adminSession.clear();
     setIsAdmin(false);
     setIsAuthenticated(false);
     setIsSuperAdmin(false);
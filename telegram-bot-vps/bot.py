@@ -1,19 +1,61 @@
 import os
-import json
+import hmac
+import logging
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import random
 import string
 import hashlib
 from flask import Flask, request
 import requests
 
+from broadcast import BroadcastRegistry
+from db_pool import ConnectionPool
+from outbox_worker import OutboxWorker
+from telegram_client import TelegramClient, TelegramError
+from update_queue import UpdateQueue
+from user_writer import TelegramUserWriter
+
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 # Конфигурация из переменных окружения
 BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
 DATABASE_URL = os.environ.get('DATABASE_URL')
 WEBHOOK_URL = os.environ.get('WEBHOOK_URL')  # https://ваш-vps-домен.ru/webhook
+# Обработка обновлений в фоне: число потоков и предел очереди
+UPDATE_WORKERS = int(os.environ.get('UPDATE_WORKERS', '4'))
+UPDATE_QUEUE_SIZE = int(os.environ.get('UPDATE_QUEUE_SIZE', '1000'))
+
+# Рассылки: параллельность отправки и токен для админских эндпоинтов (X-Auth-Token)
+BROADCAST_CONCURRENCY = int(os.environ.get('BROADCAST_CONCURRENCY', '8'))
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN')
+
+# Пул соединений с БД: размер, ожидание свободного соединения, пересоздание простаивающих
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get('DB_POOL_IDLE_TIMEOUT', '300'))
+
+# Отправка notification_outbox из teams-api: выключается OUTBOX_WORKER=0
+OUTBOX_WORKER = os.environ.get('OUTBOX_WORKER', '1') not in ('0', 'false')
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', '2'))
+OUTBOX_LEASE_SECONDS = float(os.environ.get('OUTBOX_LEASE_SECONDS', '120'))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+
+# Склейка записей telegram_users: период сброса буфера и размер пачки
+USER_FLUSH_INTERVAL = float(os.environ.get('USER_FLUSH_INTERVAL', '2'))
+USER_FLUSH_BATCH = int(os.environ.get('USER_FLUSH_BATCH', '100'))
+
+# Одна keep-alive сессия и общие лимиты Telegram на все потоки процесса
+telegram = TelegramClient(BOT_TOKEN or '')
+
+db_pool = ConnectionPool(
+    lambda: psycopg2.connect(DATABASE_URL),
+    size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    idle_timeout=DB_POOL_IDLE_TIMEOUT
+)
 
 def generate_auth_code():
     """Генерирует код регистрации в формате REG-XXXX-XXXX"""
@@ -21,39 +63,43 @@ def generate_auth_code():
     part2 = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
     return f'REG-{part1}-{part2}'
 
-def save_telegram_user(username, chat_id, first_name):
-    """Сохранение или обновление пользователя Telegram"""
-    if not username:
-        return
-    
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
+def flush_telegram_users(rows):
+    """Многострочный upsert накопленных пользователей Telegram"""
+    with db_pool.connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
+            execute_values(cur, """
                 INSERT INTO telegram_users (username, chat_id, first_name)
-                VALUES (%s, %s, %s)
+                VALUES %s
                 ON CONFLICT (username) 
                 DO UPDATE SET chat_id = EXCLUDED.chat_id, 
                               first_name = EXCLUDED.first_name,
                               updated_at = CURRENT_TIMESTAMP
-            """, (username, chat_id, first_name))
+            """, rows)
             conn.commit()
-    finally:
-        conn.close()
 
-def send_message(chat_id, text, parse_mode='HTML', reply_markup=None):
-    """Отправка сообщения в Telegram"""
-    url = f'https://api.telegram.org/bot{BOT_TOKEN}/sendMessage'
-    data = {
-        'chat_id': chat_id,
-        'text': text,
-        'parse_mode': parse_mode
-    }
-    if reply_markup:
-        data['reply_markup'] = json.dumps(reply_markup)
+user_writer = TelegramUserWriter(
+    flush_telegram_users,
+    flush_interval=USER_FLUSH_INTERVAL,
+    max_batch=USER_FLUSH_BATCH
+)
+
+def save_telegram_user(username, chat_id, first_name):
+    """Сохранение или обновление пользователя Telegram (без записи, если ничего не изменилось)"""
+    if not username:
+        return
     
-    response = requests.post(url, json=data)
-    return response.json()
+    user_writer.save(username, chat_id, first_name)
+
+def send_message(chat_id, text, parse_mode='HTML', reply_markup=None):
+    """Отправка сообщения в Telegram через общий клиент с лимитами"""
+    try:
+        return telegram.send_message(chat_id, text, parse_mode=parse_mode, reply_markup=reply_markup)
+    except TelegramError as e:
+        logger.warning('sendMessage to %s failed: %s', chat_id, e)
+        return e.as_response()
+    except requests.RequestException as e:
+        logger.warning('sendMessage to %s failed: %s', chat_id, e)
+        return {'ok': False, 'description': str(e)}
 
 def handle_start(chat_id):
     """Обработка команды /start"""
@@ -83,8 +129,7 @@ def handle_myteam(chat_id, telegram_username):
         )
         return
     
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
+    with db_pool.connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("""
                 SELECT team_name, captain_name, members_info, status, admin_comment, auth_code
@@ -117,8 +162,6 @@ def handle_myteam(chat_id, telegram_username):
                 "❌ У вас нет зарегистрированной команды.\n\n"
                 "Используйте /register для регистрации."
             )
-    finally:
-        conn.close()
 
 def handle_register(chat_id):
     """Начало регистрации команды"""
@@ -131,14 +174,22 @@ def handle_register(chat_id):
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
-    """Обработка webhook от Telegram"""
+    """Приём webhook от Telegram: update ставится в очередь, ответ — сразу"""
     if not BOT_TOKEN or not DATABASE_URL:
         return {'error': 'Configuration error'}, 500
     
-    update = request.get_json()
+    update = request.get_json(silent=True) or {}
+    
+    if not update_queue.submit(update):
+        # Telegram повторит доставку, когда очередь разгрузится
+        return {'ok': False, 'error': 'Update queue is full'}, 503
     
+    return {'ok': True}
+
+def process_update(update):
+    """Обработка update из очереди (в потоке пула)"""
     if 'message' not in update:
-        return {'ok': True}
+        return
     
     message = update['message']
     chat_id = message['chat']['id']
@@ -159,8 +210,27 @@ def webhook():
         handle_myteam(chat_id, telegram_username)
     elif text.startswith('/register'):
         handle_register(chat_id)
-    
-    return {'ok': True}
+
+update_queue = UpdateQueue(
+    process_update,
+    workers=UPDATE_WORKERS,
+    max_size=UPDATE_QUEUE_SIZE
+)
+
+broadcasts = BroadcastRegistry(send_message, concurrency=BROADCAST_CONCURRENCY)
+
+outbox_worker = OutboxWorker(
+    db_pool.connection,
+    telegram,
+    batch_size=OUTBOX_BATCH_SIZE,
+    poll_interval=OUTBOX_POLL_INTERVAL,
+    lease_seconds=OUTBOX_LEASE_SECONDS,
+    max_attempts=OUTBOX_MAX_ATTEMPTS
+)
+# Очередь наполняется без запросов к боту, поэтому поток стартует при импорте:
+# gunicorn без --preload (start.sh) импортирует модуль уже в воркере, после fork
+if OUTBOX_WORKER and BOT_TOKEN and DATABASE_URL:
+    outbox_worker.start()
 
 @app.route('/notify-captain', methods=['POST'])
 def notify_captain():
@@ -173,8 +243,7 @@ def notify_captain():
     if not captain_telegram or not message_text:
         return {'error': 'Missing captain_telegram or message'}, 400
     
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
+    with db_pool.connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("""
                 SELECT chat_id FROM telegram_users 
@@ -187,13 +256,72 @@ def notify_captain():
             return {'success': True, 'sent': True}
         else:
             return {'success': True, 'sent': False, 'reason': 'User not found'}
-    finally:
-        conn.close()
+
+def admin_auth_error():
+    """Ошибка для запроса к админским маршрутам без верного X-Auth-Token; без токена в конфиге они закрыты"""
+    if not ADMIN_API_TOKEN:
+        return {'error': 'ADMIN_API_TOKEN not configured'}, 503
+    provided = request.headers.get('X-Auth-Token', '')
+    if not hmac.compare_digest(provided.encode(), ADMIN_API_TOKEN.encode()):
+        return {'error': 'Unauthorized'}, 401
+    return None
+
+@app.route('/broadcast', methods=['POST'])
+def broadcast():
+    """Рассылка всем капитанам команд с заданным статусом"""
+    error = admin_auth_error()
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    template = data.get('template') or data.get('message')
+    
+    if not template:
+        return {'error': 'Missing template'}, 400
+    
+    # Все получатели одним запросом: капитан -> chat_id через telegram_users
+    query = """
+        SELECT t.id AS team_id, t.team_name, t.captain_name, t.captain_telegram, t.status, tu.chat_id
+        FROM teams t
+        LEFT JOIN telegram_users tu ON tu.username = LTRIM(t.captain_telegram, '@')
+    """
+    params = ()
+    if status:
+        query += " WHERE t.status = %s"
+        params = (status,)
+    query += " ORDER BY t.id"
+    
+    with db_pool.connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, params)
+            recipients = [dict(row) for row in cur.fetchall()]
+    
+    job = broadcasts.start(recipients, template)
+    return {'success': True, **job.to_dict()}, 202
+
+@app.route('/broadcast/<broadcast_id>', methods=['GET'])
+def broadcast_status(broadcast_id):
+    """Прогресс рассылки; ?results=1 — результат по каждому получателю"""
+    error = admin_auth_error()
+    if error:
+        return error
+    job = broadcasts.get(broadcast_id)
+    if not job:
+        return {'error': 'Broadcast not found'}, 404
+    return job.to_dict(include_results=request.args.get('results') in ('1', 'true'))
 
 @app.route('/health', methods=['GET'])
 def health():
     """Проверка здоровья бота"""
-    return {'status': 'ok', 'bot': 'running'}
+    return {
+        'status': 'ok',
+        'bot': 'running',
+        'updates': update_queue.stats(),
+        'db_pool': db_pool.stats(),
+        'telegram_users': user_writer.stats(),
+        'outbox': outbox_worker.stats()
+    }
 
 @app.route('/setup-webhook', methods=['GET'])
 def setup_webhook():
@@ -201,9 +329,10 @@ def setup_webhook():
     if not WEBHOOK_URL:
         return {'error': 'WEBHOOK_URL not configured'}, 400
     
-    url = f'https://api.telegram.org/bot{BOT_TOKEN}/setWebhook'
-    response = requests.post(url, json={'url': f'{WEBHOOK_URL}/webhook'})
-    return response.json()
+    try:
+        return telegram.call('setWebhook', {'url': f'{WEBHOOK_URL}/webhook'})
+    except TelegramError as e:
+        return e.as_response()
 
 if __name__ == '__main__':
     # Для локального тестирования
@@ -0,0 +1,114 @@
+'''
+Массовая рассылка капитанам: получатели выбираются одним JOIN teams ⨝ telegram_users,
+сообщения уходят из пула потоков через общий TelegramClient (он же держит лимиты).
+Прогресс и результат по каждому получателю доступны по id рассылки.
+
+Рассылки хранятся в памяти процесса (бот работает одним процессом, см. start.sh).
+'''
+import re
+import html
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+def render(template: str, values: Dict[str, Any]) -> str:
+    '''
+    Подставляет {team_name}, {captain_name} и т.п.; неизвестные плейсхолдеры остаются как есть.
+    Сообщения уходят с parse_mode=HTML: разметка шаблона сохраняется, а значения экранируются —
+    "<" или "&" в названии команды иначе дают постоянную ошибку 400 от Telegram.
+    '''
+    def replace(match):
+        value = values.get(match.group(1))
+        return match.group(0) if value is None else html.escape(str(value), quote=False)
+    return PLACEHOLDER.sub(replace, template)
+
+
+class Broadcast:
+    def __init__(self, recipients: List[Dict[str, Any]], template: str):
+        self.id = uuid.uuid4().hex
+        self.template = template
+        self.recipients = recipients
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.results: List[Dict[str, Any]] = []
+        self.counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+        self._lock = threading.Lock()
+
+    def record(self, recipient: Dict[str, Any], outcome: str, error: Optional[str] = None) -> None:
+        result = {
+            'team_id': recipient.get('team_id'),
+            'team_name': recipient.get('team_name'),
+            'captain_telegram': recipient.get('captain_telegram'),
+            'result': outcome,
+        }
+        if error:
+            result['error'] = error
+        with self._lock:
+            self.results.append(result)
+            self.counts[outcome] += 1
+
+    def to_dict(self, include_results: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                'broadcast_id': self.id,
+                'status': self.status,
+                'total': len(self.recipients),
+                'processed': len(self.results),
+                **self.counts,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+            }
+            if include_results:
+                data['results'] = list(self.results)
+        return data
+
+
+class BroadcastRegistry:
+    def __init__(self, send: Callable[..., Dict[str, Any]], concurrency: int = 8, keep: int = 100):
+        self.send = send
+        self.concurrency = concurrency
+        self.keep = keep
+        self._broadcasts: 'OrderedDict[str, Broadcast]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, recipients: List[Dict[str, Any]], template: str) -> Broadcast:
+        broadcast = Broadcast(recipients, template)
+        with self._lock:
+            self._broadcasts[broadcast.id] = broadcast
+            while len(self._broadcasts) > self.keep:
+                self._broadcasts.popitem(last=False)
+        threading.Thread(target=self._run, args=(broadcast,), name=f'broadcast-{broadcast.id[:8]}', daemon=True).start()
+        return broadcast
+
+    def get(self, broadcast_id: str) -> Optional[Broadcast]:
+        with self._lock:
+            return self._broadcasts.get(broadcast_id)
+
+    def _run(self, broadcast: Broadcast) -> None:
+        broadcast.status = 'running'
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for recipient in broadcast.recipients:
+                executor.submit(self._deliver, broadcast, recipient)
+        broadcast.status = 'finished'
+        broadcast.finished_at = time.time()
+
+    def _deliver(self, broadcast: Broadcast, recipient: Dict[str, Any]) -> None:
+        if not recipient.get('chat_id'):
+            broadcast.record(recipient, 'skipped', 'User not found')
+            return
+        try:
+            response = self.send(recipient['chat_id'], render(broadcast.template, recipient))
+        except Exception as e:
+            broadcast.record(recipient, 'failed', str(e))
+            return
+        if response.get('ok'):
+            broadcast.record(recipient, 'sent')
+        else:
+            broadcast.record(recipient, 'failed', response.get('description'))
@@ -0,0 +1,145 @@
+'''
+Потокобезопасный пул соединений с БД для бота (общий для PostgreSQL и MySQL версий).
+
+Соединение проверяется перед выдачей (pre-ping), простаивающие и слишком старые
+соединения пересоздаются. Метрики пула отдаются в /health.
+'''
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+
+class PoolTimeout(Exception):
+    '''Не дождались свободного соединения'''
+
+
+def default_ping(conn: Any) -> None:
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class ConnectionPool:
+    def __init__(self, connect: Callable[[], Any], size: int = 5, timeout: float = 5.0,
+                 idle_timeout: float = 300.0, max_age: float = 1800.0, pre_ping: bool = True,
+                 ping: Callable[[Any], None] = default_ping):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.pre_ping = pre_ping
+        self._ping = ping
+
+        # (соединение, время создания, время возврата в пул)
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._created_at: Dict[int, float] = {}
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._metrics = {'waits': 0, 'timeouts': 0, 'created': 0, 'recycled': 0, 'ping_failures': 0}
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        item: Optional[Tuple[Any, float, float]] = None
+        with self._cond:
+            waited = False
+            while True:
+                if self._idle:
+                    # LIFO: самое «тёплое» соединение, старые успевают истечь по idle_timeout
+                    item = self._idle.pop()
+                    break
+                if self._in_use + len(self._idle) < self.size:
+                    break
+                if not waited:
+                    self._metrics['waits'] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection available within {self.timeout}s')
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            conn = self._checkout(item)
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn: Any) -> None:
+        created_at = self._created_at.get(id(conn), time.monotonic())
+        healthy = True
+        try:
+            # Закрываем транзакцию: иначе пул хранил бы чужой снимок данных
+            conn.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+        if not healthy:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._metrics,
+            }
+
+    def _checkout(self, item: Optional[Tuple[Any, float, float]]) -> Any:
+        now = time.monotonic()
+        if item is not None:
+            conn, created_at, returned_at = item
+            if now - returned_at > self.idle_timeout or now - created_at > self.max_age:
+                self._count('recycled')
+                self._close(conn)
+            elif self.pre_ping and not self._is_alive(conn):
+                self._count('ping_failures')
+                self._close(conn)
+            else:
+                return conn
+
+        conn = self._connect()
+        self._created_at[id(conn)] = time.monotonic()
+        self._count('created')
+        return conn
+
+    def _count(self, metric: str) -> None:
+        with self._cond:
+            self._metrics[metric] += 1
+
+    def _is_alive(self, conn: Any) -> bool:
+        try:
+            self._ping(conn)
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn: Any) -> None:
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
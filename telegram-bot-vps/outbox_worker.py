@@ -0,0 +1,187 @@
+'''
+Отправка очереди notification_outbox, которую наполняет teams-api (регистрация, модерация, импорт).
+
+Фоновый поток бота берёт пачку в аренду коротким коммитом (status = 'sending', locked_until),
+отправляет сообщения через общий TelegramClient и записывает исход каждого отдельным запросом:
+транзакция не держится на время вызовов Telegram, а после падения процесса повторно уйдёт
+не больше одного сообщения. SKIP LOCKED и аренда позволяют работать нескольким процессам.
+
+Получатель — telegram_users.chat_id: sendMessage с @username доходит только до публичных
+каналов и групп. Капитан, который ещё не писал боту, сразу помечается failed с причиной.
+Таблица есть только в PostgreSQL, поэтому поток запускает bot.py.
+'''
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+import requests
+from psycopg2.extras import RealDictCursor
+
+from telegram_client import TelegramClient, TelegramError
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_RECIPIENT = 'Captain has not started the bot: no chat_id in telegram_users'
+
+# Аренда пачки: строки помечаются 'sending' и коммитятся до отправки; просроченная аренда
+# (процесс упал) забирается снова. locked_until из RETURNING — токен аренды для записи исхода
+CLAIM_SQL = """
+    WITH claimed AS (
+        UPDATE notification_outbox o
+        SET status = 'sending', locked_until = NOW() + %s * INTERVAL '1 second'
+        FROM (
+            SELECT id FROM notification_outbox
+            WHERE (status = 'pending' AND next_attempt_at <= NOW())
+               OR (status = 'sending' AND locked_until <= NOW())
+            ORDER BY next_attempt_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ) batch
+        WHERE o.id = batch.id
+        RETURNING o.id, o.telegram_username, o.message, o.attempts, o.next_attempt_at, o.locked_until
+    )
+    SELECT claimed.*, u.chat_id
+    FROM claimed
+    LEFT JOIN LATERAL (
+        SELECT chat_id FROM telegram_users
+        WHERE LOWER(username) = LOWER(claimed.telegram_username)
+        ORDER BY updated_at DESC
+        LIMIT 1
+    ) u ON TRUE
+    ORDER BY claimed.next_attempt_at
+"""
+SENT_SQL = """
+    UPDATE notification_outbox
+    SET status = 'sent', attempts = attempts + 1, sent_at = NOW(), last_error = NULL, locked_until = NULL
+    WHERE id = %s AND status = 'sending' AND locked_until = %s
+"""
+RETRY_SQL = """
+    UPDATE notification_outbox
+    SET status = 'pending', attempts = attempts + 1, next_attempt_at = NOW() + make_interval(secs => %s),
+        last_error = %s, locked_until = NULL
+    WHERE id = %s AND status = 'sending' AND locked_until = %s
+"""
+FAILED_SQL = """
+    UPDATE notification_outbox
+    SET status = 'failed', attempts = attempts + 1, last_error = %s, locked_until = NULL
+    WHERE id = %s AND status = 'sending' AND locked_until = %s
+"""
+# Неотправленный остаток аренды (429 или ошибка) возвращается в очередь без траты попытки
+RELEASE_SQL = """
+    UPDATE notification_outbox
+    SET status = 'pending', next_attempt_at = NOW() + make_interval(secs => %s),
+        last_error = COALESCE(%s, last_error), locked_until = NULL
+    WHERE id = ANY(%s) AND status = 'sending' AND locked_until = %s
+"""
+
+
+class OutboxWorker:
+    def __init__(self, connection: Callable[[], ContextManager[Any]], client: TelegramClient,
+                 batch_size: int = 50, poll_interval: float = 2.0, lease_seconds: float = 120.0,
+                 max_attempts: int = 8, backoff_base: float = 5.0, backoff_max: float = 3600.0):
+        # Аренда должна пережить отправку пачки: batch_size вызовов с учётом лимитов клиента
+        self._connection = connection
+        self.client = client
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {'sent': 0, 'retry': 0, 'failed': 0, 'unknown_recipient': 0, 'deferred': 0, 'errors': 0}
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+            self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'running': self._thread is not None, **self._metrics}
+
+    def backoff_delay(self, attempts: int) -> float:
+        delay = min(self.backoff_base * (2 ** max(attempts - 1, 0)), self.backoff_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    def drain(self) -> Dict[str, int]:
+        '''Отправить одну пачку готовых к отправке сообщений; возвращает счётчики по исходам'''
+        counts = {'sent': 0, 'retry': 0, 'failed': 0, 'unknown_recipient': 0, 'deferred': 0}
+        with self._connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                def record(statement: str, params: tuple) -> None:
+                    cur.execute(statement, params)
+                    conn.commit()
+
+                cur.execute(CLAIM_SQL, (self.lease_seconds, self.batch_size))
+                rows: List[Dict[str, Any]] = cur.fetchall()
+                conn.commit()
+                if not rows:
+                    return counts
+                lease = rows[0]['locked_until']
+                done = 0
+                try:
+                    for row in rows:
+                        attempts = row['attempts'] + 1
+                        if row['chat_id'] is None:
+                            record(FAILED_SQL, (UNKNOWN_RECIPIENT, row['id'], lease))
+                            counts['unknown_recipient'] += 1
+                            done += 1
+                            continue
+                        try:
+                            self.client.send_message(row['chat_id'], row['message'])
+                            record(SENT_SQL, (row['id'], lease))
+                            counts['sent'] += 1
+                        except TelegramError as e:
+                            if e.error_code == 429:
+                                # Telegram ограничивает весь бот: остаток пачки откладывается, попытка не тратится
+                                delay = float(e.retry_after or self.backoff_base)
+                                record(RELEASE_SQL, (delay, 'Too Many Requests', [r['id'] for r in rows[done:]], lease))
+                                counts['deferred'] = len(rows) - done
+                                done = len(rows)
+                                break
+                            if e.permanent or attempts >= self.max_attempts:
+                                record(FAILED_SQL, (e.description, row['id'], lease))
+                                counts['failed'] += 1
+                            else:
+                                record(RETRY_SQL, (self.backoff_delay(attempts), e.description, row['id'], lease))
+                                counts['retry'] += 1
+                        except requests.RequestException as e:
+                            if attempts >= self.max_attempts:
+                                record(FAILED_SQL, (str(e), row['id'], lease))
+                                counts['failed'] += 1
+                            else:
+                                record(RETRY_SQL, (self.backoff_delay(attempts), str(e), row['id'], lease))
+                                counts['retry'] += 1
+                        done += 1
+                finally:
+                    if done < len(rows):
+                        # Непредвиденная ошибка: остаток сразу возвращается в очередь, не дожидаясь конца аренды
+                        conn.rollback()
+                        record(RELEASE_SQL, (0, None, [r['id'] for r in rows[done:]], lease))
+        return counts
+
+    def _run(self) -> None:
+        while True:
+            try:
+                counts = self.drain()
+            except Exception:
+                logger.exception('Outbox drain failed')
+                with self._lock:
+                    self._metrics['errors'] += 1
+                counts = {}
+
+            if any(counts.values()):
+                logger.info('Outbox batch: %s', counts)
+                with self._lock:
+                    for key, value in counts.items():
+                        self._metrics[key] += value
+            # Полная пачка — скорее всего есть ещё, забираем сразу
+            if sum(counts.values()) < self.batch_size:
+                time.sleep(self.poll_interval)
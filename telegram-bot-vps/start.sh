@@ -6,4 +6,4 @@ if [ -f .env ]; then
 fi
 
 # Запуск бота через Gunicorn для production
-gunicorn --bind 0.0.0.0:5000 --workers 2 --timeout 60 --access-logfile - --error-logfile - bot:app
\ No newline at end of file
+gunicorn --bind 0.0.0.0:5000 --workers 1 --threads 8 --timeout 60 --access-logfile - --error-logfile - bot:app
\ No newline at end of file
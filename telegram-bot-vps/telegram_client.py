@@ -0,0 +1,146 @@
+'''
+Клиент Telegram Bot API: одна keep-alive сессия на процесс, таймауты,
+token bucket под лимиты Telegram и обработка 429 retry_after.
+
+Файл одинаковый в backend/teams-api и telegram-bot-vps: они деплоятся отдельно,
+поэтому модуль лежит рядом с каждым из них. Правки вносить в оба.
+'''
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ChatId = Union[int, str]
+
+# Лимиты Telegram: ~30 сообщений/с на бота, ~1/с в личный чат, 20/мин в группу
+GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', '30'))
+PRIVATE_CHAT_RATE = float(os.environ.get('TELEGRAM_CHAT_RATE', '1'))
+GROUP_CHAT_RATE = float(os.environ.get('TELEGRAM_GROUP_RATE', str(20 / 60)))
+CONNECT_TIMEOUT = float(os.environ.get('TELEGRAM_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.environ.get('TELEGRAM_READ_TIMEOUT', '10'))
+# Дольше этого на 429 не ждём внутри вызова — отдаём ошибку вызывающему
+MAX_RETRY_WAIT = float(os.environ.get('TELEGRAM_MAX_RETRY_WAIT', '30'))
+
+
+class TelegramError(Exception):
+    def __init__(self, error_code: int, description: str, retry_after: Optional[float] = None):
+        super().__init__(f'{error_code}: {description}')
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+    @property
+    def permanent(self) -> bool:
+        '''Чат не найден, бот заблокирован и т.п. — повтор не поможет'''
+        return self.error_code in (400, 403)
+
+    def as_response(self) -> Dict[str, Any]:
+        response: Dict[str, Any] = {'ok': False, 'error_code': self.error_code, 'description': self.description}
+        if self.retry_after is not None:
+            response['parameters'] = {'retry_after': self.retry_after}
+        return response
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        '''Забрать токен; возвращает, сколько секунд подождать до отправки'''
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class TelegramClient:
+    def __init__(self, token: str, pool_size: int = 10, max_retry_wait: float = MAX_RETRY_WAIT,
+                 max_chat_buckets: int = 10000):
+        self.base_url = f'https://api.telegram.org/bot{token}'
+        self.max_retry_wait = max_retry_wait
+        self.max_chat_buckets = max_chat_buckets
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._chat_buckets: 'OrderedDict[ChatId, TokenBucket]' = OrderedDict()
+        self._chat_lock = threading.Lock()
+        # После 429 весь бот ждёт до этого момента (time.monotonic)
+        self._paused_until = 0.0
+
+    def call(self, method: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        '''Вызов метода Bot API; при 429 ждёт retry_after (не дольше max_retry_wait) и повторяет'''
+        while True:
+            self._wait_for_pause()
+            response = self.session.post(
+                f'{self.base_url}/{method}',
+                json=payload or {},
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            )
+            try:
+                data = response.json()
+            except ValueError:
+                data = {'ok': False, 'error_code': response.status_code, 'description': response.text[:200]}
+
+            if data.get('ok'):
+                return data
+
+            error_code = data.get('error_code', response.status_code)
+            retry_after = (data.get('parameters') or {}).get('retry_after')
+            if error_code == 429 and retry_after is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                if retry_after <= self.max_retry_wait:
+                    continue
+            raise TelegramError(error_code, data.get('description') or f'HTTP {response.status_code}', retry_after)
+
+    def send_message(self, chat_id: ChatId, text: str, parse_mode: Optional[str] = None,
+                     reply_markup: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._chat_bucket(chat_id).acquire()
+        self.global_bucket.acquire()
+
+        payload: Dict[str, Any] = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        if reply_markup:
+            payload['reply_markup'] = reply_markup
+        return self.call('sendMessage', payload)
+
+    def _chat_bucket(self, chat_id: ChatId) -> TokenBucket:
+        with self._chat_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                # Отрицательные id — группы и каналы с более строгим лимитом
+                is_group = isinstance(chat_id, int) and chat_id < 0
+                if is_group:
+                    bucket = TokenBucket(GROUP_CHAT_RATE, 1)
+                else:
+                    # В личный чат Telegram допускает короткие всплески
+                    bucket = TokenBucket(PRIVATE_CHAT_RATE, 3)
+                self._chat_buckets[chat_id] = bucket
+                if len(self._chat_buckets) > self.max_chat_buckets:
+                    self._chat_buckets.popitem(last=False)
+            else:
+                self._chat_buckets.move_to_end(chat_id)
+            return bucket
+
+    def _wait_for_pause(self) -> None:
+        wait = self._paused_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,77 @@
+'''
+Очередь обновлений Telegram: webhook только ставит update в очередь и сразу отвечает,
+а обработку (запросы к БД, отправку сообщений) выполняет ограниченный пул потоков.
+Повторные доставки одного update_id (ретраи Telegram) отбрасываются.
+
+Очередь и дедупликация живут в памяти процесса, поэтому бот запускается
+одним процессом gunicorn с несколькими потоками (см. start.sh).
+'''
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    def __init__(self, handler: Callable[[Dict[str, Any]], None], workers: int = 4,
+                 max_size: int = 1000, dedupe_size: int = 10000):
+        self.handler = handler
+        self.workers = workers
+        self.dedupe_size = dedupe_size
+        self._queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=max_size)
+        self._seen: 'OrderedDict[int, None]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, update: Dict[str, Any]) -> bool:
+        '''
+        Поставить update в очередь. Возвращает False, если очередь переполнена —
+        тогда webhook отвечает ошибкой и Telegram повторит доставку позже.
+        '''
+        self._ensure_started()
+        update_id: Optional[int] = update.get('update_id')
+
+        with self._lock:
+            if update_id is not None:
+                if update_id in self._seen:
+                    self._seen.move_to_end(update_id)
+                    return True
+                self._seen[update_id] = None
+                if len(self._seen) > self.dedupe_size:
+                    self._seen.popitem(last=False)
+
+        try:
+            self._queue.put_nowait(update)
+        except queue.Full:
+            with self._lock:
+                self._seen.pop(update_id, None)
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {'queued': self._queue.qsize(), 'workers': len(self._threads)}
+
+    def _ensure_started(self) -> None:
+        # Потоки стартуют при первом запросе: после fork воркера gunicorn, а не при импорте
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'update-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            update = self._queue.get()
+            try:
+                self.handler(update)
+            except Exception:
+                logger.exception('Failed to process update %s', update.get('update_id'))
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,104 @@
+'''
+Склейка записей в telegram_users: пользователь, чьи username/chat_id/first_name не менялись,
+не пишется в БД повторно (LRU недавно сохранённых), а реальные изменения копятся
+в буфере и сбрасываются одним многострочным upsert по таймеру или по размеру пачки.
+'''
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UserRow = Tuple[str, int, str]
+
+
+class TelegramUserWriter:
+    def __init__(self, flush: Callable[[List[UserRow]], None], cache_size: int = 10000,
+                 flush_interval: float = 2.0, max_batch: int = 100):
+        self._flush = flush
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        # username -> (chat_id, first_name), уже записанные в БД
+        self._saved: 'OrderedDict[str, Tuple[int, str]]' = OrderedDict()
+        self._pending: Dict[str, UserRow] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {'skipped': 0, 'buffered': 0, 'flushed_rows': 0, 'flushes': 0, 'flush_errors': 0}
+
+    def save(self, username: str, chat_id: int, first_name: str) -> None:
+        row = (username, chat_id, first_name or '')
+        with self._lock:
+            # Ключ в буфере (возможно, уже пишется) сравнивается с буфером, а не с записанным:
+            # откат к сохранённому значению во время сброса не должен потеряться
+            if username in self._pending:
+                if self._pending[username] == row:
+                    self._metrics['skipped'] += 1
+                    return
+            elif self._saved.get(username) == row[1:]:
+                self._saved.move_to_end(username)
+                self._metrics['skipped'] += 1
+                return
+            self._pending[username] = row
+            self._metrics['buffered'] += 1
+            batch_full = len(self._pending) >= self.max_batch
+
+        self._ensure_started()
+        if batch_full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        # Один сброс за раз: иначе старая пачка могла бы перезаписать более новую
+        with self._flush_lock:
+            # Пачка остаётся в буфере до конца записи; при ошибке она просто сбрасывается позже
+            with self._lock:
+                if not self._pending:
+                    return
+                batch = list(self._pending.values())
+
+            try:
+                self._flush(batch)
+            except Exception:
+                logger.exception('Failed to flush %d telegram users', len(batch))
+                with self._lock:
+                    self._metrics['flush_errors'] += 1
+                return
+
+            with self._lock:
+                self._metrics['flushes'] += 1
+                self._metrics['flushed_rows'] += len(batch)
+                for row in batch:
+                    username, chat_id, first_name = row
+                    # Изменилось во время записи — новое значение уйдёт следующим сбросом
+                    if self._pending.get(username) == row:
+                        del self._pending[username]
+                    self._saved[username] = (chat_id, first_name)
+                    self._saved.move_to_end(username)
+                while len(self._saved) > self.cache_size:
+                    self._saved.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'pending': len(self._pending), 'cached': len(self._saved), **self._metrics}
+
+    def _ensure_started(self) -> None:
+        # Поток стартует при первой записи — после fork воркера gunicorn
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='telegram-user-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,134 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'teams-api'))
+
+import bracket
+from bracket import BracketError, MemoryMatchStore, plan_bracket, report_result
+
+
+def first_playable(store):
+    return next(m for m in store.matches.values() if m['team1_id'] and m['team2_id'])
+
+
+@pytest.mark.parametrize('count', [2, 3, 4, 5, 8, 13, 16, 33])
+def test_match_counts(count):
+    teams = list(range(1, count + 1))
+    # Каждый матч выбивает одну команду: n - 1 в single, 2n - 2 в double с одним гранд-финалом
+    assert len(plan_bracket(teams, 'single')) == count - 1
+    assert len(plan_bracket(teams, 'double')) == 2 * count - 2
+
+
+def test_seeding_and_byes():
+    single = plan_bracket([101, 102, 103, 104, 105], 'single')
+    first_round = [(m.team1_id, m.team2_id) for m in single if m.round_number == 1]
+    # 8 мест на 5 команд: три верхних сеяных проходят дальше без игры
+    assert first_round == [(104, 105)]
+    final = single[-1]
+    assert final.next_match_number is None
+    assert final.team1_placeholder.startswith('Победитель')
+
+
+def test_double_links_losers_and_grand_final():
+    planned = plan_bracket([1, 2, 3, 4], 'double')
+    by_number = {m.match_number: m for m in planned}
+    for match in planned:
+        if match.bracket_type == 'upper':
+            assert match.loser_next_match_number is not None
+            assert by_number[match.loser_next_match_number].bracket_type == 'lower'
+    assert planned[-1].bracket_type == 'grand_final'
+
+
+@pytest.mark.parametrize('teams, bracket_format, message', [
+    ([1, 2], 'swiss', 'format'),
+    ([1], 'single', 'At least 2'),
+    ([1, 2, 2], 'double', 'Duplicate'),
+])
+def test_plan_rejects_bad_input(teams, bracket_format, message):
+    with pytest.raises(BracketError, match=message):
+        plan_bracket(teams, bracket_format)
+
+
+def test_report_result_advances_winner_and_loser():
+    store = MemoryMatchStore(plan_bracket([1, 2, 3, 4], 'double'))
+    match = first_playable(store)
+
+    touched = report_result(store, match['id'], 2, 1)
+
+    result = store.matches[match['id']]
+    assert (result['winner'], result['status']) == (1, 'finished')
+    winner_next = store.matches[match['next_match_id']]
+    loser_next = store.matches[match['loser_next_match_id']]
+    assert winner_next[f"team{match['next_match_slot']}_id"] == match['team1_id']
+    assert loser_next[f"team{match['loser_next_match_slot']}_id"] == match['team2_id']
+    assert touched == [match['id'], match['next_match_id'], match['loser_next_match_id']]
+
+
+def test_correction_resets_dependent_matches():
+    store = MemoryMatchStore(plan_bracket([1, 2, 3, 4], 'single'))
+    semifinal = first_playable(store)
+    report_result(store, semifinal['id'], 2, 0)
+    other = next(
+        m for m in store.matches.values()
+        if m['id'] != semifinal['id'] and m['next_match_id'] == semifinal['next_match_id']
+    )
+    report_result(store, other['id'], 1, 0)
+    final_id = semifinal['next_match_id']
+    report_result(store, final_id, 3, 1)
+
+    # Исправленный полуфинал меняет состав финала: его результат сбрасывается
+    report_result(store, semifinal['id'], 0, 2)
+
+    final = store.matches[final_id]
+    assert final[f"team{semifinal['next_match_slot']}_id"] == semifinal['team2_id']
+    assert (final['winner'], final['score1'], final['status']) == (None, None, 'upcoming')
+
+
+def test_report_result_same_winner_keeps_next_match():
+    store = MemoryMatchStore(plan_bracket([1, 2, 3, 4], 'single'))
+    match = first_playable(store)
+    report_result(store, match['id'], 2, 1)
+    assert report_result(store, match['id'], 3, 1) == [match['id']]
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'score1': 1, 'score2': 1}, 'winner is required'),
+    ({'score1': -1, 'score2': 0}, 'score1 must be a non-negative integer'),
+    ({'score1': 1.5, 'score2': 0}, 'score1 must be a non-negative integer'),
+    ({'score1': None, 'score2': None, 'winner': 3}, 'winner must be 1 or 2'),
+    ({'score1': None, 'score2': None, 'winner': '1'}, 'winner must be 1 or 2'),
+])
+def test_report_result_rejects_bad_scores(kwargs, message):
+    store = MemoryMatchStore(plan_bracket([1, 2, 3, 4], 'single'))
+    with pytest.raises(BracketError, match=message):
+        report_result(store, first_playable(store)['id'], **kwargs)
+
+
+def test_report_result_rejects_unknown_or_unready_match():
+    store = MemoryMatchStore(plan_bracket([1, 2, 3, 4], 'single'))
+    with pytest.raises(BracketError, match='id must be an integer'):
+        report_result(store, True, 1, 0)
+    with pytest.raises(BracketError, match='Match not found'):
+        report_result(store, 999, 1, 0)
+    final = next(m for m in store.matches.values() if m['next_match_id'] is None)
+    with pytest.raises(BracketError, match='Both teams must be known'):
+        report_result(store, final['id'], 1, 0)
+
+
+def test_update_schedule():
+    store = MemoryMatchStore(plan_bracket([1, 2], 'single'))
+    match_id = first_playable(store)['id']
+
+    bracket.update_schedule(store, match_id, 'live', '2026-11-01T18:00')
+    assert store.matches[match_id]['status'] == 'live'
+
+    with pytest.raises(BracketError, match='status must be one of'):
+        bracket.update_schedule(store, match_id, 'finished', None)
+    with pytest.raises(BracketError, match='scheduled_time'):
+        bracket.update_schedule(store, match_id, 'live', 'tomorrow')
+
+    report_result(store, match_id, 1, 0)
+    with pytest.raises(BracketError, match='already has a result'):
+        bracket.update_schedule(store, match_id, 'upcoming', None)
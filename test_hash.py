@@ -1,6 +1,13 @@
-import hashlib
+import os
+import sys
+import getpass
 
-password = "SmirNova2468"
-hash_result = hashlib.sha256(password.encode()).hexdigest()
-print(f"Password: {SmirNova2468}")
-print(f"Hash: {hash_result}")
\ No newline at end of file
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'teams-api'))
+
+import auth
+
+# Хеш пароля админа для admin_users.password_hash (scrypt с солью, см. backend/teams-api/auth.py)
+password = sys.argv[1] if len(sys.argv) > 1 else getpass.getpass('Password: ')
+hash_result = auth.hash_password(password)
+print(f"Hash: {hash_result}")
+print(f"Verified: {auth.verify_password(password, hash_result)[0]}")
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'teams-api'))
+
+import ratelimit
+from ratelimit import LocalLimiter
+
+KEY = ('test', 'client')
+WINDOW = 100
+
+
+@pytest.fixture(autouse=True)
+def rule(monkeypatch):
+    monkeypatch.setitem(ratelimit.RULES, 'test', (4, WINDOW))
+
+
+def hits(limiter, count, now, key=KEY):
+    return [limiter.hit(key, now) for _ in range(count)]
+
+
+def test_limit_within_window():
+    limiter = LocalLimiter()
+    assert hits(limiter, 4, now=1010) == [None] * 4
+    # Retry-After — до конца текущего окна [1000, 1100)
+    assert limiter.hit(KEY, 1010) == 90
+
+
+def test_previous_window_counts_proportionally():
+    limiter = LocalLimiter()
+    hits(limiter, 4, now=1050)
+
+    # Начало следующего окна: предыдущее весит почти целиком
+    assert limiter.hit(KEY, 1101) == 99
+    # На 3/4 окна от предыдущего остаётся четверть: 4 * 0.25 + 3 новых = 4
+    assert hits(limiter, 3, now=1175) == [None] * 3
+    assert limiter.hit(KEY, 1175) == 25
+
+
+def test_gap_longer_than_window_forgets_previous():
+    limiter = LocalLimiter()
+    hits(limiter, 4, now=1050)
+    assert hits(limiter, 4, now=1201) == [None] * 4
+
+
+def test_keys_are_independent():
+    limiter = LocalLimiter()
+    hits(limiter, 4, now=1010)
+    assert limiter.hit(('test', 'other'), 1010) is None
+
+
+def test_block_until_expiry():
+    limiter = LocalLimiter()
+    limiter.block(KEY, 30, now=1000)
+    assert limiter.hit(KEY, 1010) == 20
+    assert limiter.hit(KEY, 1031) is None
+
+
+def test_least_recent_keys_are_evicted():
+    limiter = LocalLimiter(max_keys=2)
+    hits(limiter, 4, now=1010, key=('test', 'a'))
+    limiter.hit(('test', 'b'), 1010)
+    limiter.hit(('test', 'c'), 1010)
+    # Счётчик 'a' вытеснен — лимит начинается заново
+    assert limiter.hit(('test', 'a'), 1010) is None
+
+
+def test_weighted_hits_and_retry_after():
+    assert ratelimit.weighted_hits(2, 10, 25, 100) == 9.5
+    assert ratelimit.retry_after(1099.5, 1000, 100) == 1
+    assert ratelimit.retry_after(1010, 1000, 100) == 90
+
+
+def test_request_keys(monkeypatch):
+    event = {'requestContext': {'identity': {'sourceIp': '10.0.0.1'}}}
+    assert ratelimit.request_keys(event, 'GET', {'auth_code': 'REG-1'}, None) == [('auth_code_ip', '10.0.0.1')]
+    assert ratelimit.request_keys(event, 'GET', {'auth_code': 'REG-1', 'resource': 'x'}, None) == []
+    assert ratelimit.request_keys(event, 'POST', {}, {'captain_telegram': ' @Captain '}) == [
+        ('register_ip', '10.0.0.1'), ('register_telegram', 'captain'),
+    ]
+    assert ratelimit.request_keys(event, 'POST', {}, {'resource': 'auth'}) == []
+
+    monkeypatch.setattr(ratelimit, 'ENABLED', False)
+    assert ratelimit.request_keys(event, 'POST', {}, {'captain_telegram': 'x'}) == []
+
+
+def test_client_ip_falls_back_to_forwarded_header():
+    assert ratelimit.client_ip({'headers': {'X-Forwarded-For': '1.2.3.4, 10.0.0.1'}}) == '1.2.3.4'
+    assert ratelimit.client_ip({}) == 'unknown'